@@ -7,7 +7,10 @@ utils_path = Path(__file__).parent / "utils"
 if str(utils_path) not in sys.path:
     sys.path.insert(0, str(utils_path))
 
-from data_loader import clear_all_cache_dirs
+from dataset_store import get_dataset_store
+from cache_graph import invalidate_all, sync_raw_files
+from instrumentation import begin_run, end_run, panel_enabled, render_panel, timed
+from profiling import profile_page, render_notice
 
 # Configuración de la página
 st.set_page_config(
@@ -20,7 +23,7 @@ st.set_page_config(
 # Configurar navegación multi-página
 st.sidebar.markdown("---")
 if st.sidebar.button("🧹 Limpiar cachés", use_container_width=True):
-    removed, errors = clear_all_cache_dirs()
+    removed, errors = invalidate_all(get_dataset_store())
     if removed:
         st.sidebar.success(f"Se eliminaron {len(removed)} elementos de caché.")
     else:
@@ -35,8 +38,26 @@ pages = {
         st.Page("pages/3_Pipeline.py", title="Pipeline Fiable", icon="🔄"),
         st.Page("pages/4_Colocacion_Fiable.py", title="Colocación Fiable", icon="📦"),
         st.Page("pages/5_Informe_Cartera_Fiable.py", title="Informe Cartera FIABLE", icon="📋"),
-    ]
+    ],
+    "Administración": [
+        st.Page("pages/6_Caches.py", title="Cachés", icon="🗄️"),
+    ],
 }
 
 page = st.navigation(pages)
-page.run()
+
+# Medición de la ejecución (panel con ?rendimiento=1, log en logs/rendimiento.jsonl)
+begin_run(page.title)
+try:
+    # Libros reemplazados o eliminados: invalidar solo sus cachés dependientes
+    with timed("sincronizar libros"):
+        sync_raw_files(get_dataset_store())
+    # Perfilado bajo demanda (?perfilar=N o DASHBOARD_PROFILE=N), trazas en profiles/
+    with profile_page(page.title):
+        page.run()
+finally:
+    summary = end_run()
+    if panel_enabled():
+        render_panel(summary)
+    render_notice()
+
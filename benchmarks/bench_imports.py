@@ -0,0 +1,200 @@
+"""
+Benchmark del tiempo de importación (arranque en frío del servidor y primer pintado).
+
+Cada objetivo se importa en un intérprete nuevo con `python -X importtime` y se
+suma el tiempo acumulado de sus importaciones de primer nivel:
+- utils/<módulo>: `import <módulo>` de la capa de datos
+- app: las importaciones de primer nivel de app.py
+- pages/<página>: las importaciones de primer nivel de cada página (extraídas con
+  ast, sin ejecutar el script), es decir lo que paga la página antes de dibujar
+
+Cada objetivo reporta el mejor tiempo de `--repeat` ejecuciones y los módulos
+más pesados de esa ejecución, para ver qué dependencia se volvió a cargar en el
+arranque.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_imports.py                       # compara con import_baseline.json
+    python benchmarks/bench_imports.py --update-baseline     # fijar nueva línea base
+    python benchmarks/bench_imports.py --top 10              # más detalle por objetivo
+
+Sale con código 1 si algún objetivo supera la línea base más la tolerancia. Como
+bench_ingest.py, la línea base depende de la máquina.
+"""
+import argparse
+import ast
+import json
+import platform
+import re
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_DIR = BENCH_DIR.parent
+DEFAULT_BASELINE = BENCH_DIR / "import_baseline.json"
+
+# Módulos de utils/ que importan app.py y las páginas
+UTILS_MODULES = [
+    'data_loader',
+    'catalog',
+    'dataset_store',
+    'cache_graph',
+    'instrumentation',
+    'ytd',
+    'fiable_summary',
+    'profiling',
+]
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def top_level_imports(script):
+    """Código con las sentencias import de primer nivel de un script (sin ejecutar el resto)."""
+    tree = ast.parse(script.read_text(encoding='utf-8'))
+    statements = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    return "\n".join(ast.unparse(node) for node in statements)
+
+
+def targets():
+    """{nombre: código a importar} de cada objetivo."""
+    result = {f"utils/{module}": f"import {module}" for module in UTILS_MODULES}
+    result['app'] = top_level_imports(REPO_DIR / "app.py")
+    for page in sorted((REPO_DIR / "pages").glob("*.py")):
+        result[f"pages/{page.stem}"] = top_level_imports(page)
+    return result
+
+
+def parse_importtime(stderr, skip=()):
+    """
+    Suma de los tiempos acumulados de primer nivel (ms) y [(módulo, ms)] de esas
+    importaciones, de la salida de -X importtime. `skip` excluye módulos (los del
+    arranque del intérprete).
+    """
+    modules = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match and len(match.group(3)) == 1 and match.group(4) not in skip:
+            modules.append((match.group(4), int(match.group(2)) / 1000))
+    return sum(ms for _, ms in modules), modules
+
+
+def _importtime(code):
+    prelude = f"import sys; sys.path.insert(0, {str(REPO_DIR / 'utils')!r})\n"
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", prelude + code],
+        cwd=REPO_DIR, capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+    return completed.stderr
+
+
+def interpreter_modules():
+    """Módulos que importa el intérprete antes de ejecutar el código (site, encodings...)."""
+    return {module for module, _ in parse_importtime(_importtime("pass"))[1]}
+
+
+def measure(code, repeat=3, skip=()):
+    """Mejor total (ms) de `repeat` intérpretes nuevos y los módulos de esa ejecución."""
+    best = None
+    for _ in range(repeat):
+        total, modules = parse_importtime(_importtime(code), skip)
+        if best is None or total < best[0]:
+            best = (total, modules)
+    return best
+
+
+def run(selected, repeat, top):
+    results = {}
+    skip = interpreter_modules()
+    for name, code in selected.items():
+        total, modules = measure(code, repeat, skip)
+        heaviest = sorted(modules, key=lambda item: item[1], reverse=True)[:top]
+        results[name] = {'ms': round(total, 1), 'heaviest': [[module, round(ms, 1)] for module, ms in heaviest]}
+        detail = ", ".join(f"{module} {ms:.0f}" for module, ms in heaviest)
+        print(f"{name:<40} {total:>8.1f} ms   {detail}", flush=True)
+    return results
+
+
+def environment():
+    return {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+    }
+
+
+def compare(results, baseline, tolerance, min_ms):
+    """
+    Lista de regresiones frente a la línea base. Solo cuenta si además supera la base
+    por `min_ms`, para no fallar por ruido en objetivos livianos.
+    """
+    regressions = []
+    for key, values in sorted(results.items()):
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if values['ms'] > base['ms'] * (1 + tolerance) and values['ms'] - base['ms'] > min_ms:
+            regressions.append(f"{key}: {values['ms']:.1f} ms (base {base['ms']:.1f} ms)")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--targets', help="Objetivos a medir separados por coma (por defecto todos)")
+    parser.add_argument('--repeat', type=int, default=3, help="Intérpretes nuevos por objetivo")
+    parser.add_argument('--top', type=int, default=3, help="Módulos más pesados a listar por objetivo")
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="Guardar los resultados como nueva línea base en lugar de comparar")
+    parser.add_argument('--tolerance', type=float, default=0.5, help="Tolerancia relativa de tiempo")
+    parser.add_argument('--min-ms', type=float, default=20,
+                        help="Diferencia absoluta mínima (ms) para considerar regresión")
+    parser.add_argument('--output', type=Path, help="Archivo JSON donde guardar los resultados")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    available = targets()
+    names = [name for name in args.targets.split(',') if name] if args.targets else list(available)
+    unknown = sorted(set(names) - set(available))
+    if unknown:
+        print(f"Objetivos desconocidos: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    results = run({name: available[name] for name in names}, args.repeat, args.top)
+    report = {'environment': environment(), 'results': results}
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding='utf-8')
+
+    if args.update_baseline:
+        baseline = {}
+        if args.baseline.exists():
+            baseline = json.loads(args.baseline.read_text(encoding='utf-8')).get('results', {})
+        baseline.update({name: {'ms': values['ms']} for name, values in results.items()})
+        args.baseline.write_text(
+            json.dumps({'environment': report['environment'], 'results': baseline}, indent=2, ensure_ascii=False) + "\n",
+            encoding='utf-8',
+        )
+        print(f"Línea base actualizada: {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"Sin línea base en {args.baseline}; ejecuta con --update-baseline para crearla.")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text(encoding='utf-8')).get('results', {})
+    regressions = compare(results, baseline, args.tolerance, args.min_ms)
+    if regressions:
+        print("\nRegresiones frente a la línea base:")
+        for line in regressions:
+            print(f"  - {line}")
+        return 1
+    print("\nSin regresiones frente a la línea base.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,261 @@
+"""
+Benchmark de la ruta de ingesta de utils/data_loader.py.
+
+Para cada dataset sintético (ver synthetic.py) y cada tamaño mide por separado:
+- parse: pd.read_excel en frío del libro
+- process: la función process_* que usa la app
+- cache_write: _prepare_for_cache + Parquet snappy + Feather, como load_excel_with_cache
+- warm_parquet: lectura completa del caché Parquet (read_parquet_cache)
+- pushdown: read_parquet_cache con un filtro de ~10 % de las filas sobre la columna
+  de fecha por la que se ordena el caché (solo datasets con CACHE_SORT_COLUMNS)
+- warm_load: load_excel_with_cache con caché válido (la ruta de cada recarga de página)
+
+Cada fase reporta el mejor tiempo de `--repeat` ejecuciones y el pico de memoria
+de una ejecución adicional con tracemalloc (solo memoria asignada desde Python/numpy).
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_ingest.py                                # 10k filas vs baseline.json
+    python benchmarks/bench_ingest.py --sizes 10000,100000,1000000   # barrido completo (lento)
+    python benchmarks/bench_ingest.py --update-baseline              # fijar nueva línea base
+
+Sale con código 1 si alguna fase supera la línea base más la tolerancia, así que
+puede usarse como compuerta de regresión en CI. La línea base depende de la
+máquina: en CI conviene generarla una vez en el mismo runner.
+"""
+import argparse
+import gc
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent / "utils"))
+
+import pandas as pd
+import pyarrow as pa
+
+import data_loader
+from data_loader import (
+    CACHE_SORT_COLUMNS,
+    _prepare_for_cache,
+    get_cache_path,
+    get_feather_cache_path,
+    load_excel_with_cache,
+    process_cartera_colocada_fiable,
+    process_cartera_data,
+    process_cartera_financiero_fiable,
+    process_cartera_proyectadas_fiable,
+    process_colocacion_fiable_data,
+    process_fiable_pipeline_data,
+    process_recaudo_data,
+    read_parquet_cache,
+    write_feather_cache,
+    write_parquet_cache,
+)
+from synthetic import DATASETS, read_kwargs, write_workbook
+
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+DEFAULT_WORKDIR = Path(tempfile.gettempdir()) / "dashboard-bench"
+
+# Procesamiento que aplica la app a cada dataset (cartera se carga sin deduplicar)
+PROCESSING = {
+    'cartera': lambda df: process_cartera_data(df, deduplicate=False),
+    'recaudo': process_recaudo_data,
+    'pipeline': process_fiable_pipeline_data,
+    'colocacion': process_colocacion_fiable_data,
+    'fiable_colocada': process_cartera_colocada_fiable,
+    'fiable_financiero': process_cartera_financiero_fiable,
+    'fiable_proyectadas': process_cartera_proyectadas_fiable,
+}
+
+
+def measure(func, setup=None, repeat=3):
+    """
+    Mejor tiempo de `repeat` ejecuciones y pico de memoria (MB) de una ejecución trazada.
+    `setup` prepara el argumento fuera del tiempo medido (p. ej. una copia del DataFrame).
+    Retorna (segundos, pico_mb, resultado).
+    """
+    best = None
+    result = None
+    for _ in range(max(repeat, 1)):
+        arg = setup() if setup else None
+        gc.collect()
+        start = time.perf_counter()
+        result = func(arg) if setup else func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    arg = setup() if setup else None
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func(arg) if setup else func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak / (1024 * 1024), result
+
+
+def pushdown_filters(name, df):
+    """Filtro que conserva ~10 % de las filas sobre la primera columna de orden del caché, o None."""
+    columns = [col for col in CACHE_SORT_COLUMNS.get(name, []) if col in df.columns]
+    if not columns:
+        return None
+    values = df[columns[0]].dropna().sort_values()
+    if values.empty:
+        return None
+    return [(columns[0], '<=', values.iloc[len(values) // 10])]
+
+
+def bench_dataset(name, n_rows, workdir, repeat):
+    """Mide todas las fases para un dataset y tamaño; retorna {fase: {seconds, peak_mb}}."""
+    data_dir = workdir / f"rows-{n_rows}"
+    excel_path = write_workbook(name, data_dir, n_rows)
+    cache_dir = data_dir / "cache"
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    cache_path = get_cache_path(excel_path, cache_dir)
+    feather_path = get_feather_cache_path(excel_path, cache_dir)
+    process = PROCESSING[name]
+    results = {}
+
+    seconds, peak, raw = measure(lambda: pd.read_excel(excel_path, **read_kwargs(name)), repeat=repeat)
+    results['parse'] = (seconds, peak)
+
+    seconds, peak, processed = measure(process, setup=raw.copy, repeat=repeat)
+    results['process'] = (seconds, peak)
+
+    def write_caches():
+        df_for_cache = _prepare_for_cache(processed)
+        write_parquet_cache(df_for_cache, cache_path, CACHE_SORT_COLUMNS.get(name))
+        write_feather_cache(df_for_cache, feather_path)
+
+    seconds, peak, _ = measure(write_caches, repeat=repeat)
+    results['cache_write'] = (seconds, peak)
+
+    seconds, peak, _ = measure(lambda: read_parquet_cache(cache_path), repeat=repeat)
+    results['warm_parquet'] = (seconds, peak)
+
+    filters = pushdown_filters(name, processed)
+    if filters:
+        seconds, peak, _ = measure(lambda: read_parquet_cache(cache_path, filters=filters), repeat=repeat)
+        results['pushdown'] = (seconds, peak)
+
+    seconds, peak, _ = measure(
+        lambda: load_excel_with_cache(excel_path, cache_dir, processing_func=process, **read_kwargs(name)),
+        repeat=repeat,
+    )
+    results['warm_load'] = (seconds, peak)
+
+    return {phase: {'seconds': round(s, 4), 'peak_mb': round(p, 2)} for phase, (s, p) in results.items()}
+
+
+def run(datasets, sizes, workdir, repeat):
+    results = {}
+    for n_rows in sizes:
+        for name in datasets:
+            phases = bench_dataset(name, n_rows, workdir, repeat)
+            for phase, values in phases.items():
+                key = f"{name}/{n_rows}/{phase}"
+                results[key] = values
+                print(f"{key:<42} {values['seconds']:>9.3f} s {values['peak_mb']:>10.1f} MB", flush=True)
+    return results
+
+
+def environment():
+    return {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'pyarrow': pa.__version__,
+        'platform': platform.platform(),
+        'feather_cache': data_loader.USE_FEATHER_CACHE,
+    }
+
+
+def compare(results, baseline, tolerance, memory_tolerance, min_seconds):
+    """
+    Lista de regresiones frente a la línea base. Un tiempo solo cuenta como regresión
+    si además supera la base por `min_seconds`, para no fallar por ruido en fases cortas.
+    """
+    regressions = []
+    for key, values in sorted(results.items()):
+        base = baseline.get(key)
+        if base is None:
+            continue
+        limit = base['seconds'] * (1 + tolerance)
+        if values['seconds'] > limit and values['seconds'] - base['seconds'] > min_seconds:
+            regressions.append(f"{key}: {values['seconds']:.3f} s (base {base['seconds']:.3f} s)")
+        memory_limit = base['peak_mb'] * (1 + memory_tolerance)
+        if values['peak_mb'] > memory_limit and values['peak_mb'] - base['peak_mb'] > 1:
+            regressions.append(f"{key}: {values['peak_mb']:.1f} MB (base {base['peak_mb']:.1f} MB)")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', default='10000',
+                        help="Tamaños en filas separados por coma (p. ej. 10000,100000,1000000)")
+    parser.add_argument('--datasets', default=','.join(DATASETS),
+                        help="Datasets a medir separados por coma")
+    parser.add_argument('--repeat', type=int, default=3, help="Ejecuciones cronometradas por fase")
+    parser.add_argument('--workdir', type=Path, default=DEFAULT_WORKDIR,
+                        help="Directorio para libros sintéticos y cachés (se reutilizan entre corridas)")
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument('--update-baseline', action='store_true',
+                        help="Guardar los resultados como nueva línea base en lugar de comparar")
+    parser.add_argument('--tolerance', type=float, default=0.5, help="Tolerancia relativa de tiempo")
+    parser.add_argument('--memory-tolerance', type=float, default=0.25, help="Tolerancia relativa de memoria")
+    parser.add_argument('--min-seconds', type=float, default=0.05,
+                        help="Diferencia absoluta mínima para considerar regresión de tiempo")
+    parser.add_argument('--output', type=Path, help="Archivo JSON donde guardar los resultados")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sizes = [int(size) for size in args.sizes.split(',') if size]
+    datasets = [name for name in args.datasets.split(',') if name]
+    unknown = sorted(set(datasets) - set(DATASETS))
+    if unknown:
+        print(f"Datasets desconocidos: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    results = run(datasets, sizes, args.workdir, args.repeat)
+    report = {'environment': environment(), 'results': results}
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding='utf-8')
+
+    if args.update_baseline:
+        baseline = {}
+        if args.baseline.exists():
+            baseline = json.loads(args.baseline.read_text(encoding='utf-8')).get('results', {})
+        baseline.update(results)
+        args.baseline.write_text(
+            json.dumps({'environment': report['environment'], 'results': baseline}, indent=2, ensure_ascii=False) + "\n",
+            encoding='utf-8',
+        )
+        print(f"Línea base actualizada: {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"Sin línea base en {args.baseline}; ejecuta con --update-baseline para crearla.")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text(encoding='utf-8')).get('results', {})
+    regressions = compare(results, baseline, args.tolerance, args.memory_tolerance, args.min_seconds)
+    if regressions:
+        print("\nRegresiones frente a la línea base:")
+        for line in regressions:
+            print(f"  - {line}")
+        return 1
+    print("\nSin regresiones frente a la línea base.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,232 @@
+"""
+Benchmark de las páginas completas con `streamlit.testing.v1.AppTest`.
+
+La mayor parte de la latencia está en los scripts de página (filtros, sumas,
+figuras de Plotly, CSV) y se paga en cada rerun. Este harness genera un
+directorio `data/` sintético (ver synthetic.py), ejecuta cada página de
+`pages/` sin navegador y reproduce interacciones comunes: cambiar de mes,
+activar un filtro, cambiar "Agrupar por", comparar periodos. Por cada
+interacción registra el tiempo de ejecución del script.
+
+Antes de medir se hace una pasada de calentamiento para que existan los cachés
+en disco (Parquet/Feather); en cada repetición se vacían los cachés en memoria
+(`st.cache_data` / `st.cache_resource`, incluido el almacén de datasets), de
+modo que "carga" mide la primera visita a la página con el disco caliente y
+las demás interacciones miden reruns.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_pages.py                          # todas las páginas, 10k filas por libro
+    python benchmarks/bench_pages.py --pages 4_Colocacion_Fiable --rows 100000
+    python benchmarks/bench_pages.py --history benchmarks/page_history.jsonl   # acumular corridas
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+PAGES_DIR = BENCH_DIR.parent / "pages"
+
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from synthetic import build_data_tree
+
+DEFAULT_WORKDIR = Path(tempfile.gettempdir()) / "dashboard-bench-pages"
+
+
+def find_widget(at, kind, label):
+    """Widget de tipo `kind` (selectbox, multiselect, ...) con la etiqueta dada."""
+    for widget in getattr(at, kind):
+        if widget.label == label:
+            return widget
+    raise LookupError(f"No se encontró {kind} '{label}'")
+
+
+def select_option(kind, label, index):
+    return lambda at: find_widget(at, kind, label).select_index(index)
+
+
+def set_value(kind, label, value):
+    return lambda at: find_widget(at, kind, label).set_value(value)
+
+
+def pick_first(label):
+    """Selecciona la primera opción de un multiselect (activar un filtro)."""
+    def action(at):
+        widget = find_widget(at, 'multiselect', label)
+        widget.set_value(list(widget.options[:1]))
+    return action
+
+
+# Cada escenario recibe la página ya cargada y genera (interacción, acción).
+# Se consume de forma perezosa, así puede leer opciones del estado actual.
+
+def recaudo_scenario(at):
+    yield 'rerun', None
+    yield 'cambiar mes', select_option('selectbox', 'Seleccionar Mes de Recaudo', 1)
+    yield 'filtrar zona', select_option('selectbox', 'Zona', 1)
+    yield 'quitar filtro', select_option('selectbox', 'Zona', 0)
+    yield 'volver al mes', select_option('selectbox', 'Seleccionar Mes de Recaudo', 0)
+
+
+def cartera_scenario(at):
+    yield 'rerun', None
+    yield 'cambiar mes', select_option('selectbox', 'Seleccionar Mes', 1)
+    yield 'volver al mes', select_option('selectbox', 'Seleccionar Mes', 0)
+    yield 'comparar periodos', lambda at: at.button(key="btn_compare").click()
+
+
+def pipeline_scenario(at):
+    yield 'rerun', None
+    yield 'filtrar estado', pick_first('Estado')
+    yield 'filtrar asesor', pick_first('Asesor')
+    yield 'quitar filtros', lambda at: (find_widget(at, 'multiselect', 'Estado').set_value([]),
+                                        find_widget(at, 'multiselect', 'Asesor').set_value([]))
+    yield 'comparar con otro mes', lambda at: find_widget(at, 'checkbox', 'Comparar con otro mes').check()
+
+
+def colocacion_scenario(at):
+    yield 'rerun', None
+    yield 'filtrar centro de costo', pick_first('Centro de costo')
+    yield 'quitar filtro', set_value('multiselect', 'Centro de costo', [])
+    options = list(find_widget(at, 'selectbox', 'Agrupar por').options)
+    for option in options[1:] + options[:1]:
+        yield f'agrupar por {option}', set_value('selectbox', 'Agrupar por', option)
+
+
+def informe_fiable_scenario(at):
+    yield 'rerun', None
+    yield 'cambiar mes', select_option('selectbox', '📅 Mes del informe', 1)
+    yield 'volver al mes', select_option('selectbox', '📅 Mes del informe', 0)
+
+
+SCENARIOS = {
+    '1_Recaudo': recaudo_scenario,
+    '2_Cartera': cartera_scenario,
+    '3_Pipeline': pipeline_scenario,
+    '4_Colocacion_Fiable': colocacion_scenario,
+    '5_Informe_Cartera_Fiable': informe_fiable_scenario,
+}
+
+
+def _timed_run(at):
+    start = time.perf_counter()
+    at.run()
+    elapsed = time.perf_counter() - start
+    errors = [str(item.value) for item in list(at.exception) + list(at.error)]
+    return elapsed, errors
+
+
+def clear_memory_caches():
+    st.cache_data.clear()
+    st.cache_resource.clear()
+
+
+def run_page(page, timeout):
+    """Ejecuta el escenario de una página y retorna [(interacción, segundos, errores)]."""
+    at = AppTest.from_file(str(PAGES_DIR / f"{page}.py"), default_timeout=timeout)
+    elapsed, errors = _timed_run(at)
+    timings = [('carga', elapsed, errors)]
+    if errors:
+        return timings
+    for name, action in SCENARIOS[page](at):
+        try:
+            if action is not None:
+                action(at)
+        except (LookupError, IndexError) as exc:
+            timings.append((name, None, [f"interacción no disponible: {exc}"]))
+            continue
+        elapsed, errors = _timed_run(at)
+        timings.append((name, elapsed, errors))
+    return timings
+
+
+def run(pages, repeat, timeout):
+    """Mediana por interacción de `repeat` corridas, con los cachés en memoria vacíos en cada una."""
+    for page in pages:
+        clear_memory_caches()
+        run_page(page, timeout)  # calentamiento: deja listos los cachés en disco
+
+    results = {}
+    for page in pages:
+        samples = {}
+        errors = {}
+        for _ in range(max(repeat, 1)):
+            clear_memory_caches()
+            for name, seconds, run_errors in run_page(page, timeout):
+                if seconds is not None:
+                    samples.setdefault(name, []).append(seconds)
+                if run_errors:
+                    errors[name] = run_errors[:3]
+        results[page] = {}
+        for name, values in samples.items():
+            results[page][name] = {'seconds': round(statistics.median(values), 4)}
+            if name in errors:
+                results[page][name]['errors'] = errors[name]
+        for name in errors.keys() - samples.keys():
+            results[page][name] = {'seconds': None, 'errors': errors[name]}
+        for name, values in results[page].items():
+            seconds = values['seconds']
+            status = " ERROR" if values.get('errors') else ""
+            shown = f"{seconds:>8.3f} s" if seconds is not None else "       - "
+            print(f"{page:<26} {name:<40} {shown}{status}", flush=True)
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--pages', default=','.join(SCENARIOS),
+                        help="Páginas a medir separadas por coma (nombre del archivo sin .py)")
+    parser.add_argument('--rows', type=int, default=10000, help="Filas por libro sintético")
+    parser.add_argument('--repeat', type=int, default=3, help="Corridas por página (se reporta la mediana)")
+    parser.add_argument('--timeout', type=float, default=300, help="Tiempo máximo por ejecución de script (s)")
+    parser.add_argument('--workdir', type=Path, default=DEFAULT_WORKDIR,
+                        help="Directorio de trabajo con el data/ sintético (se reutiliza entre corridas)")
+    parser.add_argument('--output', type=Path, help="Archivo JSON donde guardar los resultados")
+    parser.add_argument('--history', type=Path,
+                        help="Archivo JSONL al que se agrega una línea por corrida para seguir la evolución")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    pages = [page for page in args.pages.split(',') if page]
+    unknown = sorted(set(pages) - set(SCENARIOS))
+    if unknown:
+        print(f"Páginas desconocidas: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    root = args.workdir / f"rows-{args.rows}"
+    build_data_tree(root / "data", args.rows)
+    output = args.output.resolve() if args.output else None
+    history = args.history.resolve() if args.history else None
+    # Las páginas resuelven data/ relativo al directorio de trabajo
+    os.chdir(root)
+    results = run(pages, args.repeat, args.timeout)
+
+    report = {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'rows': args.rows,
+        'python': platform.python_version(),
+        'streamlit': st.__version__,
+        'results': results,
+    }
+    if output:
+        output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding='utf-8')
+    if history:
+        with open(history, 'a', encoding='utf-8') as handle:
+            handle.write(json.dumps(report, ensure_ascii=False) + "\n")
+
+    failed = any(values.get('errors') for page in results.values() for values in page.values())
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,247 @@
+"""
+Generadores de libros Excel sintéticos con la forma de los archivos reales.
+
+Cada dataset produce las columnas, tipos y cardinalidades que esperan las
+funciones process_* de utils/data_loader.py (incluidas variantes de texto con
+espacios o mayúsculas), de modo que el benchmark recorra las mismas ramas que
+los archivos de producción. Todo es determinista para una semilla dada y no
+requiere red ni archivos reales.
+"""
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_SEED = 20251001
+# Periodo de los archivos generados (año, mes)
+DEFAULT_PERIOD = (2025, 10)
+
+MESES_MAYUS = ['ENERO', 'FEBRERO', 'MARZO', 'ABRIL', 'MAYO', 'JUNIO',
+               'JULIO', 'AGOSTO', 'SEPTIEMBRE', 'OCTUBRE', 'NOVIEMBRE', 'DICIEMBRE']
+
+CUENTAS_CARTERA = ['137010001', '130505010', '130505011', '130505012',
+                   '130505013', '130505014', '139905001', '138020001']
+ESTADOS_PIPELINE = ['Creado', 'CREADO ', 'Aprobado', ' aprobado', 'Legalizado', 'LEGALIZADO',
+                    'Pre legalizado', 'Rechazado', 'En análisis', 'En Analisis', 'Desistido']
+EDADES_FIABLE = ['PorVencer', 'Por Vencer', '30', '30 Días', '60', '60 Días',
+                 '90', '90 Días', 'Mas90', 'Más de 90']
+
+
+def _pool(prefix, size):
+    """Valores de texto distintos ('PREFIJO 000001', ...) para simular cardinalidad real."""
+    return np.array([f"{prefix} {i:06d}" for i in range(max(int(size), 1))], dtype=object)
+
+
+def _choice(rng, values, n):
+    return rng.choice(np.asarray(values, dtype=object), n)
+
+
+def _dates(rng, year, month, n, first_day=0, days=60):
+    start = pd.Timestamp(year, month, 1)
+    return start + pd.to_timedelta(rng.integers(first_day, first_day + days, n), unit='D')
+
+
+def _money(rng, n, low, high, step=1000):
+    return rng.integers(low, high, n) * float(step)
+
+
+def cartera_frame(n, rng, year, month):
+    """Cartera mensual (`cartera-YYYY-MM.xlsx`), una fila por cuota."""
+    clientes = _pool("CLIENTE", n // 5)
+    placas = np.array([f"{chr(65 + i % 26)}{chr(65 + i // 26 % 26)}X{i % 1000:03d}"
+                       for i in range(max(n // 3, 1))], dtype=object)
+    dias = rng.integers(0, 180, n)
+    return pd.DataFrame({
+        'Cuenta': _choice(rng, CUENTAS_CARTERA, n),
+        'Razon Social': _choice(rng, clientes, n),
+        'Placa': _choice(rng, placas, n),
+        'Vencimiento': _dates(rng, year, month, n, first_day=-120, days=180),
+        'Total Cuota': _money(rng, n, 50, 2000),
+        'Por Vencer': np.where(dias == 0, _money(rng, n, 50, 2000), 0.0),
+        'Dias30': np.where((dias > 0) & (dias <= 30), _money(rng, n, 10, 500), 0.0),
+        'Dias60': np.where((dias > 30) & (dias <= 60), _money(rng, n, 10, 500), 0.0),
+        'Dias90': np.where((dias > 60) & (dias <= 90), _money(rng, n, 10, 500), 0.0),
+        'Dias Mas90': np.where(dias > 90, _money(rng, n, 10, 500), 0.0),
+        'Mora': _money(rng, n, 0, 50, step=100),
+        'Dias Vencidos': dias,
+    })
+
+
+def recaudo_frame(n, rng, year, month):
+    """Recaudo mensual (`recaudo-YYYY-MM.xlsx`)."""
+    return pd.DataFrame({
+        'FUENTE': _choice(rng, ['F01', 'F02', 'F03', 'F04'], n),
+        'NOMBRE_FUENTE': _choice(rng, ['CAJA', 'BANCO', 'PSE', 'CORRESPONSAL'], n),
+        'CLIENTE': _choice(rng, _pool("CLIENTE", n // 5), n),
+        'ZONA': _choice(rng, ['NORTE', 'SUR', 'CENTRO', 'OCCIDENTE'], n),
+        'FECHA_VENCIMIENTO': _dates(rng, year, month, n, first_day=-90, days=120),
+        'FECHA_RECAUDO': _dates(rng, year, month, n, days=28),
+        'DIAS_VENCIDOS': rng.integers(0, 150, n),
+        'POR_VENCER': _money(rng, n, 0, 300, step=100),
+        'TREINTA_DIAS': _money(rng, n, 0, 200, step=100),
+        'SESENTA_DIAS': _money(rng, n, 0, 100, step=100),
+        'NOVENTA_DIAS': _money(rng, n, 0, 100, step=100),
+        'MAS_NOVENTA': _money(rng, n, 0, 100, step=100),
+    })
+
+
+def pipeline_frame(n, rng, year, month):
+    """Pipeline de créditos (`fiable-creditos-YYYY-MM.xls`), con variantes de estado y espacios."""
+    fechas = _dates(rng, year, month, n, first_day=-60, days=90)
+    return pd.DataFrame({
+        'Estado': _choice(rng, ESTADOS_PIPELINE, n),
+        'Fecha': fechas,
+        'Asesor': _choice(rng, [f" ASESOR {i:02d}" if i % 3 else f"ASESOR {i:02d} " for i in range(40)], n),
+        'Consecutivo': rng.integers(1, max(n // 2, 2), n),
+        'Identificacion': rng.integers(10_000_000, 99_999_999, n),
+        'Cliente': _choice(rng, _pool("CLIENTE", n // 3), n),
+        'Estacion': _choice(rng, [f"ESTACION {i:02d}" for i in range(25)], n),
+        'FechAnalisis': fechas + pd.to_timedelta(rng.integers(0, 15, n), unit='D'),
+        'Producto': _choice(rng, ['MOTO', 'CREDITO LIBRE', 'REPUESTOS', 'SEGURO'], n),
+    })
+
+
+def colocacion_frame(n, rng, year, month):
+    """Colocación Fiable anual (`colocacion-YYYY.xlsx`), una fila por artículo facturado."""
+    fechas = pd.Timestamp(year, 1, 1) + pd.to_timedelta(rng.integers(0, 365, n), unit='D')
+    subtotal = _money(rng, n, 200, 20000)
+    devolucion = rng.random(n) < 0.03
+    return pd.DataFrame({
+        'Tipo': np.where(devolucion, 'NC', 'FV'),
+        'Nro Factura': np.arange(1, n + 1),
+        'Fecha Documento': fechas,
+        'Año': fechas.year,
+        'Mes': fechas.month,
+        'Centro Costo': _choice(rng, [f"CC {i:02d}" for i in range(30)], n),
+        'Vendedor': _choice(rng, _pool("VENDEDOR", 120), n),
+        'Modalidadventa': _choice(rng, ['CONTADO', 'CREDITO'], n),
+        'Bodega': _choice(rng, [f"BODEGA {i:02d}" for i in range(20)], n),
+        'Subtotal': subtotal,
+        'IvaFac': subtotal * 0.19,
+        'TotalFac': np.where(devolucion, -1, 1) * subtotal * 1.19,
+        'Cantidad': 1,
+        'Producto': _choice(rng, _pool("MOTO", 80), n),
+        'TipoProducto': _choice(rng, ['MOTOCICLETA', 'REPUESTO', 'ACCESORIO'], n),
+    })
+
+
+def fiable_colocada_frame(n, rng, year, month):
+    """Cartera Colocada FIABLE, una fila por cuota del crédito."""
+    return pd.DataFrame({
+        'NumeroFactura': rng.integers(1, max(n // 4, 2), n),
+        'ValorCuota': _money(rng, n, 100, 1500),
+        'SaldoCapital': _money(rng, n, 500, 15000),
+        'ValorPrestamo': _money(rng, n, 2000, 20000),
+        'Producto': _choice(rng, ['MOTO', 'CREDITO LIBRE', 'REPUESTOS'], n),
+        'NombreCuentaCartera': _choice(rng, [f"CUENTA {i:02d}" for i in range(15)], n),
+    })
+
+
+def fiable_financiero_frame(n, rng, year, month):
+    """Cartera Financiero X edades FIABLE, con las variantes de texto de EDADES."""
+    return pd.DataFrame({
+        'EDADES': _choice(rng, EDADES_FIABLE, n),
+        'Capital': _money(rng, n, 100, 5000),
+        'Cuota': _money(rng, n, 50, 800),
+        'Interes': _money(rng, n, 1, 200, step=100),
+        'Fianza': _money(rng, n, 1, 100, step=100),
+        'abonofianza': _money(rng, n, 0, 50, step=100),
+        'Vencimiento': _dates(rng, year, month, n, first_day=-150, days=200),
+    })
+
+
+def fiable_proyectadas_frame(n, rng, year, month):
+    """Cartera Proyectadas FIABLE, una fila por crédito con sus rangos de edad."""
+    buckets = {col: _money(rng, n, 0, 500) for col in
+               ['PorVencer', 'Treinta_Dias', 'Sesenta_Dias', 'Noventa_Dias', 'Mas_de_Noventa']}
+    return pd.DataFrame({
+        'Total': sum(buckets.values()),
+        **buckets,
+        'Calificacion': _choice(rng, ['A', 'B', 'C', 'D', 'E'], n),
+        'Fecha_Factura': _dates(rng, year, month, n, first_day=-700, days=700),
+        'DiasVencimiento': rng.integers(0, 200, n),
+        'Cuotaspendientes': rng.integers(0, 36, n),
+    })
+
+
+def _fiable_name(kind):
+    return lambda year, month: f"Cartera {kind} FIABLE {MESES_MAYUS[month - 1]} {year}.xlsx"
+
+
+# nombre -> (subdirectorio de data/, nombre de archivo, generador, filas de encabezado previas)
+DATASETS = {
+    'cartera': ('cartera/raw', lambda y, m: f"cartera-{y}-{m:02d}.xlsx", cartera_frame, 7),
+    'recaudo': ('recaudo/raw', lambda y, m: f"recaudo-{y}-{m:02d}.xlsx", recaudo_frame, 0),
+    'pipeline': ('pipeline/raw', lambda y, m: f"fiable-creditos-{y}-{m:02d}.xls", pipeline_frame, 0),
+    'colocacion': ('colocacion/raw', lambda y, m: f"colocacion-{y}.xlsx", colocacion_frame, 0),
+    'fiable_colocada': ('cartera_fiable/raw', _fiable_name("Colocada"), fiable_colocada_frame, 0),
+    'fiable_financiero': ('cartera_fiable/raw', _fiable_name("Financiero X edades"), fiable_financiero_frame, 0),
+    'fiable_proyectadas': ('cartera_fiable/raw', _fiable_name("Proyectadas"), fiable_proyectadas_frame, 0),
+}
+
+
+def generate_frame(name, n_rows, period=DEFAULT_PERIOD, seed=DEFAULT_SEED):
+    """DataFrame sintético del dataset `name` con `n_rows` filas."""
+    _, _, builder, _ = DATASETS[name]
+    year, month = period
+    rng = np.random.default_rng([seed, n_rows, list(DATASETS).index(name), year, month])
+    return builder(int(n_rows), rng, year, month)
+
+
+def write_workbook(name, data_dir, n_rows, period=DEFAULT_PERIOD, seed=DEFAULT_SEED, overwrite=False):
+    """
+    Escribe el libro del dataset bajo `data_dir` con la misma ruta y nombre que los reales
+    (p. ej. data_dir/cartera/raw/cartera-2025-10.xlsx) y retorna su Path.
+
+    El de cartera lleva las 7 filas de encabezado del reporte antes de la tabla.
+    Los `.xls` del pipeline se escriben en formato xlsx (pandas ya no escribe .xls);
+    read_excel detecta el formato por contenido, igual que con los archivos reales.
+    Si el archivo ya existe se reutiliza salvo `overwrite`, porque generar 1M de filas tarda.
+    """
+    subdir, filename, _, header_rows = DATASETS[name]
+    path = Path(data_dir) / subdir / filename(*period)
+    if path.exists() and not overwrite:
+        return path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    df = generate_frame(name, n_rows, period, seed)
+    tmp_path = path.with_name(f".{path.stem}.tmp.xlsx")
+    with pd.ExcelWriter(tmp_path, engine='openpyxl') as writer:
+        if header_rows:
+            preamble = pd.DataFrame([["REPORTE DE CARTERA"], [f"Corte {period[0]}-{period[1]:02d}"]]
+                                    + [[""]] * (header_rows - 2))
+            preamble.to_excel(writer, index=False, header=False)
+        df.to_excel(writer, index=False, startrow=header_rows)
+    tmp_path.replace(path)
+    return path
+
+
+def read_kwargs(name):
+    """Argumentos de pd.read_excel con los que la app lee el dataset."""
+    header_rows = DATASETS[name][3]
+    return {'header': header_rows} if header_rows else {}
+
+
+# Periodos del árbol de datos de ejemplo: varios meses para poder cambiar de mes
+# y comparar, y dos años de colocación para el YTD
+DATA_TREE_PERIODS = {
+    'cartera': [(2025, 10), (2025, 9), (2024, 10)],
+    'recaudo': [(2025, 10), (2025, 9), (2024, 10)],
+    'pipeline': [(2025, 10), (2025, 9)],
+    'colocacion': [(2025, 1), (2024, 1)],
+    'fiable_colocada': [(2025, 10), (2025, 9)],
+    'fiable_financiero': [(2025, 10), (2025, 9)],
+    'fiable_proyectadas': [(2025, 10), (2025, 9)],
+}
+
+
+def build_data_tree(data_dir, n_rows, seed=DEFAULT_SEED, periods=None):
+    """
+    Genera un directorio `data/` completo (todas las páginas tienen datos) con
+    `n_rows` filas por libro. Retorna la lista de archivos escritos o reutilizados.
+    """
+    periods = periods or DATA_TREE_PERIODS
+    return [
+        write_workbook(name, data_dir, n_rows, period, seed)
+        for name, name_periods in periods.items()
+        for period in name_periods
+    ]
@@ -1,10 +1,7 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime, date
-import calendar
-import numpy as np
 import sys
 from pathlib import Path
 
@@ -13,12 +10,10 @@ utils_path = Path(__file__).parent.parent / "utils"
 if str(utils_path) not in sys.path:
     sys.path.insert(0, str(utils_path))
 
-from data_loader import (
-    load_excel_with_cache, 
-    detect_recaudo_files, 
-    process_recaudo_data,
-    RECAUDO_CACHE_DIR
-)
+from data_loader import detect_recaudo_files
+from catalog import get_catalog, date_range_filters, filters_key
+from dataset_store import get_dataset_store, files_signature
+from instrumentation import section, timed
 
 # Título principal
 st.title("💰 Dashboard de Recaudo")
@@ -78,45 +73,71 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
-# Cargar datos
-@st.cache_data
+# Columnas de los filtros de la barra lateral y las que bastan para armar sus opciones
+RECAUDO_FILTER_COLUMNS = ['FUENTE', 'NOMBRE_FUENTE', 'ZONA', 'CLIENTE']
+RECAUDO_OPTION_COLUMNS = RECAUDO_FILTER_COLUMNS + ['FECHA_VENCIMIENTO', 'FECHA_RECAUDO']
+
+
+# Cargar datos (compartidos entre sesiones a través del almacén de datasets)
 def load_data(mes_selected=None, año=None, mes_num=None):
     """
-    Carga datos de recaudo para un mes específico.
+    Carga las columnas de filtros y fechas de recaudo para un mes específico
+    (el detalle se lee ya filtrado con `load_filtered`).
     Si no se especifica mes, carga el más reciente disponible.
+    
+    Returns:
+        (periodo, DataFrame con RECAUDO_OPTION_COLUMNS) o (None, None) si no hay archivos
     """
-    # Detectar archivos disponibles
-    available_files = detect_recaudo_files()
+    catalog = get_catalog("recaudo")
+    periods = catalog.list_periods()
     
-    if not available_files:
+    if not periods:
         st.error("No se encontraron archivos de recaudo. Por favor, coloca archivos con formato 'recaudo-YYYY-MM.xlsx' en data/recaudo/raw/ o en el directorio raíz.")
-        return None
+        return None, None
     
-    # Si se especifica mes, buscar ese archivo
+    # Si se especifica mes, buscar ese periodo
+    period = periods[0]
     if mes_selected and año and mes_num:
-        selected_file = None
-        for mes_str, año_file, mes_file, file_path in available_files:
-            if año_file == año and mes_file == mes_num:
-                selected_file = file_path
-                break
-        
-        if selected_file is None:
+        if (año, mes_num) in periods:
+            period = (año, mes_num)
+        else:
             st.warning(f"No se encontró archivo para {mes_selected}. Usando el más reciente disponible.")
-            selected_file = available_files[0][3]
-    else:
-        # Usar el archivo más reciente
-        selected_file = available_files[0][3]
-    
-    # Cargar con caché
-    df = load_excel_with_cache(
-        selected_file,
-        RECAUDO_CACHE_DIR,
-        processing_func=process_recaudo_data
+    
+    # Cargar con caché: solo se decodifican las columnas de las opciones
+    sources = catalog.sources(period)
+    df = get_dataset_store().acquire(
+        "recaudo",
+        (files_signature(sources), "opciones"),
+        lambda: catalog.load(period, columns=RECAUDO_OPTION_COLUMNS),
+        sources=sources
     )
     
-    return df
+    return period, df
+
+
+def load_filtered(period, filters):
+    """
+    Filas del periodo que cumplen los filtros de la barra lateral, leídas con los
+    filtros empujados al caché Parquet (solo se decodifican los row groups que pueden cumplirlos).
+    """
+    catalog = get_catalog("recaudo")
+    sources = catalog.sources(period)
+    return get_dataset_store().acquire(
+        "recaudo",
+        (files_signature(sources), filters_key(filters)),
+        lambda: catalog.load(period, filters=filters),
+        slot="recaudo_filtrado",
+        sources=sources
+    )
+
+
+def text_filter(df, column, selected):
+    """Filtro de igualdad sobre el texto mostrado en el selector (los valores pueden no ser str en el libro)."""
+    values = [value for value in df[column].dropna().unique() if str(value) == selected]
+    return (column, 'in', values)
 
 # Detectar archivos disponibles primero
+section("carga de datos")
 available_files = detect_recaudo_files()
 
 if available_files:
@@ -140,7 +161,8 @@ if available_files:
         mes_selected = st.sidebar.selectbox(
             "Seleccionar Mes de Recaudo", 
             meses_opciones,
-            index=current_index
+            index=current_index,
+            key="recaudo_mes"
         )
         
         # Obtener año y mes del archivo seleccionado
@@ -158,17 +180,17 @@ if available_files:
             st.session_state.recaudo_selected_month = mes_selected
             st.session_state.recaudo_selected_year = año_selected
             st.session_state.recaudo_selected_month_num = mes_num_selected
-            df = load_data(mes_selected, año_selected, mes_num_selected)
+            period, df = load_data(mes_selected, año_selected, mes_num_selected)
         else:
-            df = load_data(mes_selected, año_selected, mes_num_selected)
+            period, df = load_data(mes_selected, año_selected, mes_num_selected)
     else:
         mes_selected = meses_opciones[0]
         año_selected = available_files[0][1]
         mes_num_selected = available_files[0][2]
-        df = load_data(mes_selected, año_selected, mes_num_selected)
+        period, df = load_data(mes_selected, año_selected, mes_num_selected)
 else:
     st.sidebar.header("🔍 Filtros")
-    df = load_data()
+    period, df = load_data()
     mes_selected = "Sin datos disponibles"
 
 if df is not None and not df.empty:
@@ -196,30 +218,31 @@ if df is not None and not df.empty:
         st.markdown("---")
     
     # Filtro por FUENTE
+    section("filtros")
     if 'FUENTE' in df.columns:
         fuentes = ['Todas'] + sorted([str(x) for x in df['FUENTE'].dropna().unique()])
-        fuente_selected = st.sidebar.selectbox("Fuente", fuentes)
+        fuente_selected = st.sidebar.selectbox("Fuente", fuentes, key="recaudo_fuente")
     else:
         fuente_selected = 'Todas'
     
     # Filtro por NOMBRE_FUENTE
     if 'NOMBRE_FUENTE' in df.columns:
         nombres_fuentes = ['Todas'] + sorted([str(x) for x in df['NOMBRE_FUENTE'].dropna().unique()])
-        nombre_fuente_selected = st.sidebar.selectbox("Nombre Fuente", nombres_fuentes)
+        nombre_fuente_selected = st.sidebar.selectbox("Nombre Fuente", nombres_fuentes, key="recaudo_nombre_fuente")
     else:
         nombre_fuente_selected = 'Todas'
     
     # Filtro por zona
     if 'ZONA' in df.columns:
         zonas = ['Todas'] + sorted([str(x) for x in df['ZONA'].dropna().unique()])
-        zona_selected = st.sidebar.selectbox("Zona", zonas)
+        zona_selected = st.sidebar.selectbox("Zona", zonas, key="recaudo_zona")
     else:
         zona_selected = 'Todas'
     
     # Filtro por cliente
     if 'CLIENTE' in df.columns:
         clientes = ['Todos'] + sorted([str(x) for x in df['CLIENTE'].dropna().unique()])
-        cliente_selected = st.sidebar.selectbox("Cliente", clientes)
+        cliente_selected = st.sidebar.selectbox("Cliente", clientes, key="recaudo_cliente")
     else:
         cliente_selected = 'Todos'
     
@@ -251,33 +274,33 @@ if df is not None and not df.empty:
                 "Rango de Fechas de Recaudo",
                 value=(fecha_default_min, fecha_default_max),
                 min_value=fecha_min_date,
-                max_value=fecha_max_date
+                max_value=fecha_max_date,
+                key="recaudo_fechas"
             )
         else:
             fecha_range = None
     else:
         fecha_range = None
     
-    # Aplicar filtros
-    df_filtered = df.copy()
+    # Aplicar filtros: se empujan a la lectura del periodo en lugar de filtrar el detalle completo
+    filters = []
+    
+    if fuente_selected != 'Todas' and 'FUENTE' in df.columns:
+        filters.append(text_filter(df, 'FUENTE', fuente_selected))
     
-    if fuente_selected != 'Todas' and 'FUENTE' in df_filtered.columns:
-        df_filtered = df_filtered[df_filtered['FUENTE'].astype(str) == fuente_selected]
+    if nombre_fuente_selected != 'Todas' and 'NOMBRE_FUENTE' in df.columns:
+        filters.append(text_filter(df, 'NOMBRE_FUENTE', nombre_fuente_selected))
     
-    if nombre_fuente_selected != 'Todas' and 'NOMBRE_FUENTE' in df_filtered.columns:
-        df_filtered = df_filtered[df_filtered['NOMBRE_FUENTE'].astype(str) == nombre_fuente_selected]
+    if zona_selected != 'Todas' and 'ZONA' in df.columns:
+        filters.append(text_filter(df, 'ZONA', zona_selected))
     
-    if zona_selected != 'Todas' and 'ZONA' in df_filtered.columns:
-        df_filtered = df_filtered[df_filtered['ZONA'].astype(str) == zona_selected]
+    if cliente_selected != 'Todos' and 'CLIENTE' in df.columns:
+        filters.append(text_filter(df, 'CLIENTE', cliente_selected))
     
-    if cliente_selected != 'Todos' and 'CLIENTE' in df_filtered.columns:
-        df_filtered = df_filtered[df_filtered['CLIENTE'].astype(str) == cliente_selected]
+    if fecha_range and len(fecha_range) == 2 and 'FECHA_RECAUDO' in df.columns:
+        filters += date_range_filters('FECHA_RECAUDO', fecha_range[0], fecha_range[1])
     
-    if fecha_range and len(fecha_range) == 2 and 'FECHA_RECAUDO' in df_filtered.columns:
-        df_filtered = df_filtered[
-            (df_filtered['FECHA_RECAUDO'].dt.date >= fecha_range[0]) &
-            (df_filtered['FECHA_RECAUDO'].dt.date <= fecha_range[1])
-        ]
+    df_filtered = load_filtered(period, filters)
     
     # Función auxiliar para sumar columnas numéricas
     def sumar_columna(df, columna):
@@ -323,6 +346,7 @@ if df is not None and not df.empty:
                 st.write("---")
     
     # KPIs principales
+    section("KPIs")
     st.header("📊 Indicadores Clave (KPIs)")
     
     # Calcular totales individuales primero
@@ -372,6 +396,7 @@ if df is not None and not df.empty:
     st.markdown("---")
     
     # Gráficos principales
+    section("gráficos principales")
     col1, col2 = st.columns(2)
     
     with col1:
@@ -446,6 +471,7 @@ if df is not None and not df.empty:
             st.info("Columna FUENTE no encontrada")
     
     # Análisis por zona y cliente
+    section("zona y cliente")
     st.markdown("---")
     st.subheader("📍 Distribución por Zona")
     
@@ -508,6 +534,7 @@ if df is not None and not df.empty:
                     st.plotly_chart(fig_dias, use_container_width=True)
     
     # Análisis temporal
+    section("análisis temporal")
     st.markdown("---")
     st.subheader("📅 Análisis Temporal")
     
@@ -547,6 +574,7 @@ if df is not None and not df.empty:
                 st.plotly_chart(fig_recaudo, use_container_width=True)
     
     # Distribución de días vencidos
+    section("días vencidos")
     st.markdown("---")
     st.subheader("⏱️ Análisis de Días Vencidos")
     
@@ -575,6 +603,7 @@ if df is not None and not df.empty:
             st.plotly_chart(fig_box, use_container_width=True)
     
     # Tabla de datos
+    section("tabla de datos")
     st.markdown("---")
     st.subheader("📋 Tabla de Datos")
     
@@ -592,7 +621,7 @@ if df is not None and not df.empty:
         # Paginación
         page_size = st.selectbox("Registros por página", [10, 25, 50, 100], index=1)
         
-        total_pages = (len(df_display) - 1) // page_size + 1
+        total_pages = max((len(df_display) - 1) // page_size + 1, 1)
         page = st.number_input("Página", min_value=1, max_value=total_pages, value=1)
         
         start_idx = (page - 1) * page_size
@@ -607,7 +636,8 @@ if df is not None and not df.empty:
         st.info(f"Mostrando registros {start_idx + 1} a {min(end_idx, len(df_display))} de {len(df_display)} totales")
         
         # Botón de descarga
-        csv = df_filtered.to_csv(index=False).encode('utf-8-sig')
+        with timed("exportar CSV", rows_in=df_filtered):
+            csv = df_filtered.to_csv(index=False).encode('utf-8-sig')
         st.download_button(
             label="📥 Descargar datos filtrados como CSV",
             data=csv,
@@ -616,6 +646,7 @@ if df is not None and not df.empty:
         )
     
     # Estadísticas descriptivas
+    section("estadísticas y resumen por fuente")
     st.markdown("---")
     st.subheader("📈 Estadísticas Descriptivas")
     
@@ -2,7 +2,6 @@ import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
 from datetime import datetime
-from fpdf import FPDF
 import sys
 from pathlib import Path
 
@@ -12,14 +11,14 @@ if str(utils_path) not in sys.path:
     sys.path.insert(0, str(utils_path))
 
 from data_loader import (
-    load_excel_with_cache, 
     detect_cartera_files, 
-    process_cartera_data,
-    CARTERA_CACHE_DIR,
     CARTERA_RAW_DIR,
-    load_cartera_for_comparison,
     compare_cartera_periods
 )
+from catalog import get_catalog
+from dataset_store import get_dataset_store, file_digest
+from prefetch import get_prefetch_scheduler, comparison_periods
+from instrumentation import section, timed
 
 # Título principal
 st.title("📊 Informe de Cartera")
@@ -184,6 +183,8 @@ def format_currency(value):
 
 
 def generar_pdf(resumen_data, mes):
+    from fpdf import FPDF
+
     pdf = FPDF()
     pdf.set_auto_page_break(auto=True, margin=18)
     pdf.add_page()
@@ -249,50 +250,80 @@ def generar_pdf(resumen_data, mes):
     return pdf.output(dest="S").encode("latin-1")
 
 # Cargar datos
-@st.cache_data
-def load_cartera_data(año=None, mes_num=None):
+def _cartera_key(año, mes_num, file_path):
+    """Clave del almacén: (año, mes, digest del archivo). Un Excel reemplazado genera otra entrada."""
+    return (año, mes_num, file_digest(file_path))
+
+
+def _cartera_loader(año, mes_num):
+    """Construye la función de carga de un mes de cartera para el almacén compartido."""
+    def _load():
+        # El catálogo carga con caché y sin deduplicación para mantener totales como antes
+        df = get_catalog("cartera").load((año, mes_num))
+        
+        # Agregar columna de empresa si no existe
+        if df is not None and 'Cuenta' in df.columns and 'Empresa' not in df.columns:
+            df['Empresa'] = df['Cuenta'].apply(clasificar_empresa)
+        return df
+    return _load
+
+
+def load_cartera_data(año=None, mes_num=None, slot=None):
     """
     Carga datos de cartera para un mes específico.
     Si no se especifica mes, carga el más reciente disponible.
-    Nota: Los parámetros año y mes_num se usan como clave de caché.
+    `slot` permite sostener varios meses a la vez en la sesión (p. ej. la comparación).
+    Nota: (año, mes, digest del archivo) se usa como clave en el almacén compartido,
+    por lo que los meses ya visitados no se vuelven a leer.
     """
-    # Detectar archivos disponibles
-    available_files = detect_cartera_files()
+    catalog = get_catalog("cartera")
+    periods = catalog.list_periods()
     
-    if not available_files:
+    if not periods:
         st.error("No se encontraron archivos de cartera. Por favor, coloca archivos con formato 'cartera-YYYY-MM.xlsx' en data/cartera/raw/ o en el directorio raíz.")
         return None
     
-    # Si se especifica mes, buscar ese archivo
+    # Si se especifica mes, buscar ese periodo; si no, usar el más reciente
+    period = periods[0]
     if año and mes_num:
-        selected_file = None
-        for mes_str, año_file, mes_file, file_path in available_files:
-            if año_file == año and mes_file == mes_num:
-                selected_file = file_path
-                break
-        
-        if selected_file is None:
+        if (año, mes_num) in periods:
+            period = (año, mes_num)
+        else:
             st.warning(f"No se encontró archivo para {año}-{mes_num:02d}. Usando el más reciente disponible.")
-            selected_file = available_files[0][3]
-    else:
-        # Usar el archivo más reciente
-        selected_file = available_files[0][3]
     
-    # Cargar con caché (sin deduplicación para mantener totales como antes)
-    df = load_excel_with_cache(
-        selected_file,
-        CARTERA_CACHE_DIR,
-        processing_func=lambda df: process_cartera_data(df, deduplicate=False),
-        header=7
+    año_file, mes_file = period
+    file_path = catalog.sources(period)[0]
+    return get_dataset_store().acquire(
+        "cartera",
+        _cartera_key(año_file, mes_file, file_path),
+        _cartera_loader(año_file, mes_file),
+        slot=slot,
+        sources=[file_path]
     )
+
+
+def prefetch_related_months(available_files, año, mes_num):
+    """
+    Encola en segundo plano los meses que probablemente se abrirán después:
+    los vecinos en el selector, el mes anterior y el mismo mes del año anterior
+    (los que se usan en la comparación temporal).
+    """
+    posiciones = [i for i, (_, a, m, _) in enumerate(available_files) if a == año and m == mes_num]
+    if not posiciones:
+        return
+    pos = posiciones[0]
+    objetivos = set(comparison_periods(año, mes_num))
+    for vecino in (pos - 1, pos + 1):
+        if 0 <= vecino < len(available_files):
+            objetivos.add((available_files[vecino][1], available_files[vecino][2]))
     
-    # Agregar columna de empresa si no existe
-    if df is not None and 'Cuenta' in df.columns and 'Empresa' not in df.columns:
-        df['Empresa'] = df['Cuenta'].apply(clasificar_empresa)
-    
-    return df
+    scheduler = get_prefetch_scheduler()
+    for _, año_f, mes_f, file_f in available_files:
+        if (año_f, mes_f) in objetivos:
+            scheduler.schedule("cartera", _cartera_key(año_f, mes_f, file_f), _cartera_loader(año_f, mes_f), sources=[file_f])
 
 # Detectar archivos disponibles primero
+section("carga de datos")
 available_files = detect_cartera_files()
 
 # Información de depuración (solo en modo desarrollo)
@@ -347,20 +378,14 @@ if available_files:
                 mes_num_selected = mes_num
                 break
         
-        # Verificar si cambió el mes y recargar si es necesario
-        if (st.session_state.cartera_selected_month != mes_selected or 
-            st.session_state.cartera_selected_year != año_selected):
-            # Actualizar session state
-            st.session_state.cartera_selected_month = mes_selected
-            st.session_state.cartera_selected_year = año_selected
-            st.session_state.cartera_selected_month_num = mes_num_selected
-            # Limpiar caché de la función para forzar recarga
-            load_cartera_data.clear()
-            # Recargar página para aplicar cambios
-            st.rerun()
+        # Actualizar session state (sin limpiar cachés ni forzar un segundo rerun)
+        st.session_state.cartera_selected_month = mes_selected
+        st.session_state.cartera_selected_year = año_selected
+        st.session_state.cartera_selected_month_num = mes_num_selected
         
-        # Cargar datos (el caché se invalida automáticamente con año y mes_num)
+        # Cargar datos (los meses usados recientemente siguen en el almacén LRU)
         df = load_cartera_data(año_selected, mes_num_selected)
+        prefetch_related_months(available_files, año_selected, mes_num_selected)
     else:
         mes_selected = meses_opciones[0]
         año_selected = available_files[0][1]
@@ -393,6 +418,7 @@ if df is not None and not df.empty:
         df_filtered = df_filtered[df_filtered['Empresa'] != 'Sin Clasificar'].copy()
     
     # Calcular métricas por empresa en el orden solicitado
+    section("métricas por empresa")
     empresas = df_filtered['Empresa'].unique() if 'Empresa' in df_filtered.columns else []
     orden_preferido = [
         "Soluciones Integrales",
@@ -503,6 +529,7 @@ if df is not None and not df.empty:
         st.markdown("---")
         
         # Resumen general en tabla
+        section("resumen general")
         st.subheader("📋 Resumen General por Empresa")
         
         resumen_data = []
@@ -548,7 +575,8 @@ if df is not None and not df.empty:
             st.dataframe(df_resumen, use_container_width=True)
             
             # Botón de descarga
-            csv = df_resumen.to_csv(index=False).encode('utf-8-sig')
+            with timed("exportar CSV", rows_in=df_resumen):
+                csv = df_resumen.to_csv(index=False).encode('utf-8-sig')
             st.download_button(
                 label="📥 Descargar resumen como CSV",
                 data=csv,
@@ -565,6 +593,7 @@ if df is not None and not df.empty:
             )
         
         # Gráfico comparativo
+        section("gráfico comparativo")
         st.markdown("---")
         st.subheader("📊 Comparación de Índices por Empresa")
         
@@ -622,6 +651,7 @@ if df is not None and not df.empty:
             st.plotly_chart(fig, use_container_width=True)
         
         # Sección de Comparación Temporal
+        section("comparación temporal")
         st.markdown("---")
         st.subheader("📊 Comparación Temporal de Cartera")
         
@@ -674,7 +704,10 @@ if df is not None and not df.empty:
                 
                 if st.button("🔄 Comparar Períodos", type="primary", key="btn_compare"):
                     with st.spinner("Cargando y comparando períodos..."):
-                        df1, df2, periodo1_str, periodo2_str = load_cartera_for_comparison(año1, mes1, año2, mes2)
+                        # Ambos periodos salen del almacén compartido (normalmente ya precargados)
+                        df1 = load_cartera_data(año1, mes1, slot="cartera_periodo1")
+                        df2 = load_cartera_data(año2, mes2, slot="cartera_periodo2")
+                        periodo1_str, periodo2_str = periodo1_selected, periodo2_selected
                         
                         if df1 is not None and df2 is not None:
                             comparison_df = compare_cartera_periods(df1, df2, periodo1_str, periodo2_str, clasificar_empresa_func=clasificar_empresa)
@@ -786,7 +819,8 @@ if df is not None and not df.empty:
                         st.plotly_chart(fig_indices_comp, use_container_width=True)
                         
                         # Botón de descarga
-                        csv_comparison = comparison_df.to_csv(index=False).encode('utf-8-sig')
+                        with timed("exportar CSV comparación", rows_in=comparison_df):
+                            csv_comparison = comparison_df.to_csv(index=False).encode('utf-8-sig')
                         st.download_button(
                             label="📥 Descargar comparación como CSV",
                             data=csv_comparison,
@@ -10,7 +10,17 @@ utils_path = Path(__file__).parent.parent / "utils"
 if str(utils_path) not in sys.path:
     sys.path.insert(0, str(utils_path))
 
-from data_loader import load_all_fiable_pipeline
+from data_loader import (
+    load_pipeline_state_counts,
+    count_pipeline_states,
+    PIPELINE_COUNT_DIMENSIONS,
+    periodo_label,
+)
+from catalog import get_catalog, date_range_filters, filters_key
+from dataset_store import get_dataset_store, files_signature
+from ytd import YTDEngine, ytd_comparison
+from pipeline_lifecycle import compute_lifecycle, LIFECYCLE_COLUMNS
+from instrumentation import section, timed
 
 PIPELINE_STATES = [
     "CREADO",
@@ -21,6 +31,9 @@ PIPELINE_STATES = [
 
 EXCLUDED_STATES = {"SOLICITADO", "EN ANALISIS", "EXCEPCIONADO", "REPROCESO", "PRE-LEGALIZADO"}
 
+# Columnas de los últimos registros que bastan para armar las opciones de los filtros
+PIPELINE_OPTION_COLUMNS = ['ESTADO_NORMALIZADO', 'ASESOR', 'ESTACION', 'PRODUCTO', 'FECHA']
+
 STATE_COLORS = [
     "#3498db",
     "#2ecc71",
@@ -29,9 +42,10 @@ STATE_COLORS = [
 ]
 
 
-def summarize_states(df):
-    total_registros = len(df)
-    counts_raw = df['ESTADO_NORMALIZADO'].value_counts()
+def summarize_states(counts):
+    """Resumen por estado a partir de un subconjunto de la tabla de conteos."""
+    total_registros = int(counts['REGISTROS'].sum())
+    counts_raw = counts.groupby('ESTADO_NORMALIZADO')['REGISTROS'].sum()
     cantidades = []
     porcentajes = []
 
@@ -40,7 +54,7 @@ def summarize_states(df):
             valor = total_registros
             porcentaje = 100.0 if total_registros else 0.0
         else:
-            valor = counts_raw.get(estado, 0)
+            valor = int(counts_raw.get(estado, 0))
             porcentaje = (valor / total_registros * 100) if total_registros else 0.0
         cantidades.append(valor)
         porcentajes.append(round(porcentaje, 1))
@@ -53,27 +67,85 @@ def summarize_states(df):
     return summary, total_registros
 
 
+def filter_counts(counts, filters):
+    """Aplica {dimensión: valores} sobre la tabla de conteos (las listas vacías no filtran)."""
+    for col, values in filters.items():
+        if values and col in counts.columns:
+            counts = counts[counts[col].isin(values)]
+    return counts
+
+
+def build_ytd_engine(counts):
+    """Motor de acumulados con registros y legalizados sobre la tabla de conteos por estado."""
+    counts = counts.assign(
+        LEGALIZADOS=counts['REGISTROS'].where(counts['ESTADO_NORMALIZADO'] == 'LEGALIZADO', 0)
+    )
+    return YTDEngine(counts, 'AÑO', 'MES', ['REGISTROS', 'LEGALIZADOS'], PIPELINE_COUNT_DIMENSIONS)
+
+
+def load_pipeline_data():
+    """
+    Carga las columnas de filtros de los últimos registros del pipeline, la tabla de
+    conteos por estado y el motor de acumulados, compartidos entre sesiones (clave:
+    archivos fuente). El detalle se lee ya filtrado con `load_filtered`.
+    """
+    catalog = get_catalog("pipeline")
+    files = catalog.sources()
+    signature = files_signature(files)
+    store = get_dataset_store()
+    df = store.acquire(
+        "pipeline",
+        (signature, "opciones"),
+        lambda: catalog.load_latest(columns=PIPELINE_OPTION_COLUMNS),
+        sources=files
+    )
+    if df is None or df.empty:
+        return df, None, None
+    counts = store.acquire("pipeline_counts", signature, load_pipeline_state_counts, sources=files)
+    if counts is None:
+        counts = count_pipeline_states(
+            catalog.load_latest(columns=['MES_PERIODO', 'AÑO', 'MES'] + PIPELINE_COUNT_DIMENSIONS)
+        )
+    ytd_engine = store.acquire("pipeline_ytd", signature, lambda: build_ytd_engine(counts), sources=files)
+    return df, counts, ytd_engine
+
+
+def load_filtered(filters):
+    """Últimos registros que cumplen los filtros, leídos con los filtros empujados al Parquet."""
+    catalog = get_catalog("pipeline")
+    files = catalog.sources()
+    return get_dataset_store().acquire(
+        "pipeline",
+        (files_signature(files), filters_key(filters)),
+        lambda: catalog.load_latest(filters=filters),
+        slot="pipeline_filtrado",
+        sources=files
+    )
+
+
 st.title("🔄 Pipeline Créditos Fiable")
 st.markdown("Análisis de estados de crédito, comparaciones mensuales y acumulados YTD.")
 
-df = load_all_fiable_pipeline()
+section("carga de datos")
+df, counts, ytd_engine = load_pipeline_data()
 if df is None or df.empty:
     st.error("No se encontraron datos de Fiable en caché. Verifica `data/pipeline/raw`.")
     st.stop()
 
 # Filtros básicos
+section("filtros")
 st.sidebar.header("🔍 Filtros")
 estado_options = [estado for estado in PIPELINE_STATES if estado in df['ESTADO_NORMALIZADO'].unique()]
-estado_filter = st.sidebar.multiselect("Estado", estado_options, default=None)
+estado_filter = st.sidebar.multiselect("Estado", estado_options, default=None, key="pipeline_estado")
 
 asesores = sorted([x for x in df['ASESOR'].dropna().unique()]) if 'ASESOR' in df.columns else []
-asesor_filter = st.sidebar.multiselect("Asesor", asesores) if asesores else []
+asesor_filter = st.sidebar.multiselect("Asesor", asesores, key="pipeline_asesor") if asesores else []
 
 estaciones = sorted([x for x in df['ESTACION'].dropna().unique()]) if 'ESTACION' in df.columns else []
-estacion_filter = st.sidebar.multiselect("Estación", estaciones) if estaciones else []
+estacion_filter = st.sidebar.multiselect("Estación", estaciones, key="pipeline_estacion") if estaciones else []
 
 productos = sorted([x for x in df['PRODUCTO'].dropna().unique()]) if 'PRODUCTO' in df.columns else []
-producto_filter = st.sidebar.multiselect("Producto", productos) if productos else []
+producto_filter = st.sidebar.multiselect("Producto", productos, key="pipeline_producto") if productos else []
 
 if 'FECHA' in df.columns and df['FECHA'].notna().any():
     min_date = df['FECHA'].min().date()
@@ -82,39 +154,57 @@ if 'FECHA' in df.columns and df['FECHA'].notna().any():
         "Rango de fechas (FECHA)",
         value=(min_date, max_date),
         min_value=min_date,
-        max_value=max_date
+        max_value=max_date,
+        key="pipeline_fechas"
     )
 else:
     fecha_rango = None
 
-df_filtered = df.copy()
-df_filtered = df_filtered[~df_filtered['ESTADO_NORMALIZADO'].isin(EXCLUDED_STATES)]
+# Los filtros se empujan a la lectura de los últimos registros
+filters = [('ESTADO_NORMALIZADO', 'not in', sorted(EXCLUDED_STATES))]
 
 if estado_filter:
-    df_filtered = df_filtered[df_filtered['ESTADO_NORMALIZADO'].isin(estado_filter)]
+    filters.append(('ESTADO_NORMALIZADO', 'in', estado_filter))
 
-if asesor_filter and 'ASESOR' in df_filtered.columns:
-    df_filtered = df_filtered[df_filtered['ASESOR'].isin(asesor_filter)]
+if asesor_filter and 'ASESOR' in df.columns:
+    filters.append(('ASESOR', 'in', asesor_filter))
 
-if estacion_filter and 'ESTACION' in df_filtered.columns:
-    df_filtered = df_filtered[df_filtered['ESTACION'].isin(estacion_filter)]
+if estacion_filter and 'ESTACION' in df.columns:
+    filters.append(('ESTACION', 'in', estacion_filter))
 
-if producto_filter and 'PRODUCTO' in df_filtered.columns:
-    df_filtered = df_filtered[df_filtered['PRODUCTO'].isin(producto_filter)]
+if producto_filter and 'PRODUCTO' in df.columns:
+    filters.append(('PRODUCTO', 'in', producto_filter))
 
-if fecha_rango and len(fecha_rango) == 2 and 'FECHA' in df_filtered.columns:
+partial_range = False
+if fecha_rango and len(fecha_rango) == 2 and 'FECHA' in df.columns:
     start_date, end_date = fecha_rango
     if isinstance(start_date, date) and isinstance(end_date, date):
-        df_filtered = df_filtered[
-            (df_filtered['FECHA'].dt.date >= start_date) &
-            (df_filtered['FECHA'].dt.date <= end_date)
-        ]
+        filters += date_range_filters('FECHA', start_date, end_date)
+        partial_range = (start_date, end_date) != (min_date, max_date)
+
+df_filtered = load_filtered(filters)
+
+if partial_range:
+    # Los conteos compartidos son mensuales; un rango parcial se cuenta desde las filas filtradas
+    counts = count_pipeline_states(df_filtered)
+    ytd_engine = build_ytd_engine(counts)
+
+# Los mismos filtros expresados sobre las dimensiones de la tabla de conteos
+count_filters = {
+    'ESTADO_NORMALIZADO': estado_filter or [
+        estado for estado in df['ESTADO_NORMALIZADO'].unique() if estado not in EXCLUDED_STATES
+    ],
+    'ASESOR': asesor_filter,
+    'ESTACION': estacion_filter,
+    'PRODUCTO': producto_filter,
+}
 
 if df_filtered.empty:
     st.warning("No hay registros que coincidan con los filtros seleccionados.")
     st.stop()
 
-periodos_disponibles = sorted(df_filtered['MES_PERIODO'].dropna().unique(), reverse=True)
+counts_filtered = filter_counts(counts, count_filters)
+periodos_disponibles = sorted(counts_filtered['MES_PERIODO'].dropna().unique(), reverse=True)
 
 if 'FECHA' in df_filtered.columns and df_filtered['FECHA'].notna().any():
     min_fecha = df_filtered['FECHA'].min().date()
@@ -128,7 +218,8 @@ selected_date = st.sidebar.date_input(
     "Mes de análisis",
     value=max_fecha,
     min_value=min_fecha,
-    max_value=max_fecha
+    max_value=max_fecha,
+    key="pipeline_mes"
 )
 if isinstance(selected_date, tuple):
     selected_date = selected_date[0]
@@ -140,11 +231,12 @@ if periodos_disponibles and periodo_actual not in periodos_disponibles:
     periodo_actual = periodos_disponibles[0]
     selected_date = periodo_actual.to_timestamp().date()
 
-periodo_actual_label = periodo_actual.strftime('%B %Y') if periodo_actual is not None else "Todos los registros"
+periodo_actual_label = periodo_label(periodo_actual) if periodo_actual is not None else "Todos los registros"
 
 comparar_toggle = st.sidebar.checkbox(
     "Comparar con otro mes",
-    value=True if len(periodos_disponibles) > 1 else False
+    value=True if len(periodos_disponibles) > 1 else False,
+    key="pipeline_comparar"
 )
 periodo_comparacion = None
 periodo_comparacion_label = None
@@ -156,7 +248,8 @@ if comparar_toggle and len(periodos_disponibles) > 1:
         "Mes a comparar",
         value=prev_month_date,
         min_value=min_fecha,
-        max_value=max_fecha
+        max_value=max_fecha,
+        key="pipeline_mes_comparar"
     )
     if isinstance(compare_date, tuple):
         compare_date = compare_date[0]
@@ -166,26 +259,26 @@ if comparar_toggle and len(periodos_disponibles) > 1:
             st.warning("El mes de comparación no tiene registros; se omitirá.")
             periodo_comparacion = None
         else:
-            periodo_comparacion_label = periodo_comparacion.strftime('%B %Y')
+            periodo_comparacion_label = periodo_label(periodo_comparacion)
 
 if periodo_actual:
-    df_periodo = df_filtered[df_filtered['MES_PERIODO'] == periodo_actual]
+    counts_periodo = counts_filtered[counts_filtered['MES_PERIODO'] == periodo_actual]
 else:
-    df_periodo = df_filtered.copy()
+    counts_periodo = counts_filtered
 
 if periodo_comparacion:
-    df_comparacion = df_filtered[df_filtered['MES_PERIODO'] == periodo_comparacion]
+    counts_comparacion = counts_filtered[counts_filtered['MES_PERIODO'] == periodo_comparacion]
 else:
-    df_comparacion = pd.DataFrame(columns=df_filtered.columns)
+    counts_comparacion = counts_filtered.iloc[0:0]
 
 st.info(f"Analizando periodo: **{periodo_actual_label}**"
         f"{'' if not periodo_comparacion_label else f' vs {periodo_comparacion_label}'}")
 
-summary_actual, total_actual = summarize_states(df_periodo)
+summary_actual, total_actual = summarize_states(counts_periodo)
 summary_actual = summary_actual.set_index('Estado')
 
-if not df_comparacion.empty:
-    summary_comp, total_comp = summarize_states(df_comparacion)
+if not counts_comparacion.empty:
+    summary_comp, total_comp = summarize_states(counts_comparacion)
     summary_comp = summary_comp.set_index('Estado')
     summary_actual['Comparación'] = summary_comp['Cantidad']
     summary_actual['Variación'] = summary_actual['Cantidad'] - summary_actual['Comparación']
@@ -196,7 +289,7 @@ else:
 st.subheader("📊 Distribución por estado")
 col_total, col_delta = st.columns(2)
 col_total.metric("Total registros periodo", f"{int(total_actual):,}")
-if not df_comparacion.empty:
+if not counts_comparacion.empty:
     delta_total = total_actual - total_comp
     col_delta.metric("Variación total", f"{delta_total:+,}", f"{(delta_total / total_comp * 100):+.1f}%" if total_comp else None)
 else:
@@ -205,8 +298,9 @@ else:
 st.dataframe(summary_actual, use_container_width=True)
 
 # Métrica de legalizados vs creados en el mes
-legalizados_periodo = (df_periodo['ESTADO_NORMALIZADO'] == 'LEGALIZADO').sum()
-pct_legalizado_periodo = (legalizados_periodo / len(df_periodo) * 100) if len(df_periodo) else 0
+section("métricas del mes")
+legalizados_periodo = int(summary_actual.loc['LEGALIZADO', 'Cantidad'])
+pct_legalizado_periodo = (legalizados_periodo / total_actual * 100) if total_actual else 0
 col_leg_mes_1, col_leg_mes_2 = st.columns(2)
 col_leg_mes_1.metric("Legalizados (mes)", f"{legalizados_periodo:,}")
 col_leg_mes_2.metric("% Legalizados vs creados (mes)", f"{pct_legalizado_periodo:.1f}%")
@@ -222,25 +316,19 @@ fig_estados = px.bar(
 st.plotly_chart(fig_estados, use_container_width=True)
 
 # YTD vs YTD previo
+section("YTD")
 if periodo_actual:
     selected_year = periodo_actual.year
     selected_month = periodo_actual.month
 else:
-    selected_year = df_filtered['AÑO'].dropna().max()
-    selected_month = df_filtered['MES'].dropna().max()
+    selected_year = counts_filtered['AÑO'].dropna().max()
+    selected_month = counts_filtered['MES'].dropna().max()
 
 if pd.notna(selected_year) and pd.notna(selected_month):
-    df_ytd = df_filtered[
-        (df_filtered['AÑO'] == selected_year) &
-        (df_filtered['MES'] <= selected_month)
-    ]
-    df_ytd_prev = df_filtered[
-        (df_filtered['AÑO'] == selected_year - 1) &
-        (df_filtered['MES'] <= selected_month)
-    ]
-
-    ytd_actual = len(df_ytd)
-    ytd_prev = len(df_ytd_prev)
+    ytd_current, ytd_previous = ytd_comparison(ytd_engine, selected_year, selected_month, count_filters)
+
+    ytd_actual = int(ytd_current['REGISTROS'])
+    ytd_prev = int(ytd_previous['REGISTROS'])
 
     st.markdown("---")
     st.subheader("📆 Año corrido vs año anterior")
@@ -251,8 +339,8 @@ if pd.notna(selected_year) and pd.notna(selected_month):
     col_ytd2.metric(f"YTD {int(selected_year - 1)}", f"{ytd_prev:,}")
     col_ytd3.metric("Δ % YTD", f"{delta_pct_total:+.1f}{'%' if ytd_prev else ''}")
 
-    legalizados_ytd = (df_ytd['ESTADO_NORMALIZADO'] == 'LEGALIZADO').sum()
-    legalizados_ytd_prev = (df_ytd_prev['ESTADO_NORMALIZADO'] == 'LEGALIZADO').sum()
+    legalizados_ytd = int(ytd_current['LEGALIZADOS'])
+    legalizados_ytd_prev = int(ytd_previous['LEGALIZADOS'])
     pct_legalizado_ytd = (legalizados_ytd / ytd_actual * 100) if ytd_actual else 0
     pct_legalizado_ytd_prev = (legalizados_ytd_prev / ytd_prev * 100) if ytd_prev else 0
     delta_legalizados = legalizados_ytd - legalizados_ytd_prev
@@ -278,20 +366,19 @@ if pd.notna(selected_year) and pd.notna(selected_month):
     col_pct3.metric("Δ puntos porcentuales", f"{delta_pct_legalizados:+.1f} pp")
 
 # Evolución mensual
+section("evolución mensual")
 st.markdown("---")
 st.subheader("📈 Evolución mensual de créditos")
 monthly = (
-    df_filtered.dropna(subset=['MES_PERIODO'])
-    .groupby(['MES_PERIODO', 'ESTADO_NORMALIZADO'])
-    .size()
+    counts_filtered.groupby(['MES_PERIODO', 'ESTADO_NORMALIZADO'])['REGISTROS']
+    .sum()
     .reset_index(name='Cantidad')
 )
 if not monthly.empty:
     # Reemplazar serie de CREADO por el total de créditos del mes
     monthly_totals = (
-        df_filtered.dropna(subset=['MES_PERIODO'])
-        .groupby('MES_PERIODO')
-        .size()
+        counts_filtered.groupby('MES_PERIODO')['REGISTROS']
+        .sum()
         .reset_index(name='Cantidad')
         .assign(ESTADO_NORMALIZADO='CREADO')
     )
@@ -310,14 +397,61 @@ if not monthly.empty:
     fig_monthly.update_layout(xaxis={'categoryorder': 'category ascending'})
     st.plotly_chart(fig_monthly, use_container_width=True)
 
+# Ciclo de vida
+section("ciclo de vida")
+st.markdown("---")
+st.subheader("🔁 Ciclo de vida de créditos")
+pipeline_catalog = get_catalog("pipeline")
+history_files = pipeline_catalog.sources()
+lifecycle = get_dataset_store().acquire(
+    "pipeline_lifecycle",
+    files_signature(history_files),
+    lambda: compute_lifecycle(pipeline_catalog.load_range(columns=LIFECYCLE_COLUMNS)),
+    sources=history_files
+)
+if not lifecycle:
+    st.info("Los archivos no incluyen `CONSECUTIVO`; no es posible seguir los créditos entre cortes.")
+else:
+    transitions, matrix_counts, matrix_pct, tiempos_estado, cohortes = lifecycle
+    st.caption(
+        "Calculado sobre el historial completo de archivos (cada crédito en cada corte), "
+        "sin aplicar los filtros de la barra lateral."
+    )
+    if transitions.empty:
+        st.info("Ningún crédito cambia de estado entre los archivos cargados.")
+    else:
+        fig_matrix = px.imshow(
+            matrix_pct,
+            text_auto=True,
+            color_continuous_scale="Blues",
+            labels={'x': 'Hacia', 'y': 'Desde', 'color': '%'},
+            title="Transiciones entre estados (% por estado de origen)"
+        )
+        st.plotly_chart(fig_matrix, use_container_width=True)
+        st.dataframe(
+            transitions.rename(columns={'Mediana_dias': 'Mediana días entre análisis'}),
+            use_container_width=True,
+            hide_index=True
+        )
+
+    col_tiempos, col_cohortes = st.columns(2)
+    with col_tiempos:
+        st.markdown("**Días de FECHA a FECHA_ANALISIS por estado**")
+        st.dataframe(tiempos_estado, use_container_width=True, hide_index=True)
+    with col_cohortes:
+        st.markdown("**Conversión por cohorte de creación**")
+        st.dataframe(cohortes, use_container_width=True, hide_index=True)
+
 # Tabla detallada
+section("tabla detallada")
 st.markdown("---")
 st.subheader("📋 Registros filtrados")
 cols_display = ['FECHA', 'ESTADO_NORMALIZADO', 'CLIENTE', 'ASESOR', 'PRODUCTO', 'ESTACION', 'CONSECUTIVO', 'IDENTIFICACION']
 cols_existing = [col for col in cols_display if col in df_filtered.columns]
 st.dataframe(df_filtered[cols_existing], use_container_width=True, height=400)
 
-csv_download = df_filtered.to_csv(index=False).encode('utf-8-sig')
+with timed("exportar CSV", rows_in=df_filtered):
+    csv_download = df_filtered.to_csv(index=False).encode('utf-8-sig')
 st.download_button(
     label="📥 Descargar CSV filtrado",
     data=csv_download,
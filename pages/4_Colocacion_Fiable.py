@@ -9,7 +9,19 @@ utils_path = Path(__file__).parent.parent / "utils"
 if str(utils_path) not in sys.path:
     sys.path.insert(0, str(utils_path))
 
-from data_loader import load_all_colocacion_fiable
+from data_loader import (
+    build_colocacion_aggregates,
+    COLOCACION_AGG_DIMENSIONS,
+    COLOCACION_AGG_LABELS,
+)
+from catalog import get_catalog, date_range_filters, filters_key
+from dataset_store import get_dataset_store, files_signature
+from ytd import YTDEngine, ytd_comparison
+from instrumentation import section, timed
+
+# Columnas que se mantienen en memoria: las de la tabla agregada y la fecha del documento.
+# El detalle completo solo se lee (ya filtrado) para la descarga.
+COLOCACION_BASE_COLUMNS = ["ANIO", "MES", "FECHA_DOCUMENTO", "TOTALFAC"] + COLOCACION_AGG_DIMENSIONS + COLOCACION_AGG_LABELS
 
 MONTH_NAMES = {
     1: "Enero",
@@ -35,13 +47,14 @@ def format_currency(value, decimals=2):
     return f"${formatted}"
 
 
-def build_summary(df: pd.DataFrame, group_col: str) -> pd.DataFrame:
-    if group_col not in df.columns:
+def build_summary(agg: pd.DataFrame, group_col: str) -> pd.DataFrame:
+    """Resume la tabla agregada por una dimensión (UNIDADES ya descuenta 2 por cada devolución)."""
+    if group_col not in agg.columns:
         return pd.DataFrame(columns=[group_col, "Unidades", "Total COP"])
     summary = (
-        df.groupby(group_col)
+        agg.groupby(group_col, observed=True)
         .agg(
-            Unidades=("TOTALFAC", lambda x: len(x) - (x < 0).sum() * 2),  # Restar 2 por cada negativo
+            Unidades=("UNIDADES", "sum"),
             Total_COP=("TOTALFAC", "sum"),  # Sumar todos (los negativos ya reducen el total)
         )
         .reset_index()
@@ -51,13 +64,46 @@ def build_summary(df: pd.DataFrame, group_col: str) -> pd.DataFrame:
     return summary
 
 
+def totals(measures: dict):
+    """Unidades y Total COP de un resultado del motor YTD."""
+    return int(round(measures["UNIDADES"])), float(measures["TOTALFAC"])
+
+
+def build_ytd_engine(agg: pd.DataFrame) -> YTDEngine:
+    return YTDEngine(agg, "ANIO", "MES", ["REGISTROS", "UNIDADES", "TOTALFAC"], COLOCACION_AGG_DIMENSIONS)
+
+
+def load_colocacion_data():
+    """
+    Carga las columnas base de colocación (COLOCACION_BASE_COLUMNS) de todos los
+    libros, su tabla agregada por (ANIO, MES, dimensiones) y el motor de acumulados,
+    todos compartidos entre sesiones (clave: archivos fuente).
+    """
+    store = get_dataset_store()
+    catalog = get_catalog("colocacion")
+    files = catalog.sources()
+    signature = files_signature(files)
+    df = store.acquire(
+        "colocacion",
+        (signature, "base"),
+        lambda: catalog.load_range(columns=COLOCACION_BASE_COLUMNS),
+        sources=files,
+    )
+    if df is None or df.empty:
+        return df, None, None
+    agg = store.acquire("colocacion_agg", signature, lambda: build_colocacion_aggregates(df), sources=files)
+    ytd_engine = store.acquire("colocacion_ytd", signature, lambda: build_ytd_engine(agg), sources=files)
+    return df, agg, ytd_engine
+
+
 st.title("📦 Colocación Fiable")
 st.markdown(
     "Comparativo de unidades vendidas (registros) y valor facturado (`TOTALFAC`) "
     "a partir de los archivos consolidados por año."
 )
 
-df = load_all_colocacion_fiable()
+section("carga de datos")
+df, agg, ytd_engine = load_colocacion_data()
 if df is None or df.empty:
     st.error(
         "No se encontraron archivos en `data/colocacion/raw`. "
@@ -69,13 +115,14 @@ if "TOTALFAC" not in df.columns:
     st.error("La columna `TotalFac` es obligatoria para calcular los montos.")
     st.stop()
 
+section("filtros")
 st.sidebar.header("🔍 Filtros")
 
 if "ANIO" not in df.columns or "MES" not in df.columns:
     st.error("El dataset debe incluir las columnas `AÑO` y `MES` para calcular el YTD.")
     st.stop()
 
-years_available = sorted([int(x) for x in df["ANIO"].dropna().unique().tolist()])
+years_available = sorted([int(x) for x in agg["ANIO"].dropna().unique().tolist()])
 if not years_available:
     st.error("No se detectaron años disponibles en los datos de colocación.")
     st.stop()
@@ -84,10 +131,11 @@ selected_year = st.sidebar.selectbox(
     "Año objetivo (YTD)",
     years_available,
     index=len(years_available) - 1,
+    key="colocacion_anio",
 )
 
 months_in_year = (
-    df[df["ANIO"] == selected_year]["MES"]
+    agg[agg["ANIO"] == selected_year]["MES"]
     .dropna()
     .astype(int)
     .unique()
@@ -104,34 +152,30 @@ selected_month = st.sidebar.select_slider(
     options=months_in_year,
     format_func=lambda x: MONTH_NAMES.get(int(x), str(x)),
     value=months_in_year[-1],
+    key="colocacion_mes",
 )
 
-df_filtered = df.copy()
+# Las selecciones se aplican sobre la tabla agregada; el detalle solo se filtra para la descarga
+filter_selections = {}
 
-if "CENTRO_COSTO" in df.columns:
-    centro_options = sorted(df["CENTRO_COSTO"].dropna().unique().tolist())
-    centro_filter = st.sidebar.multiselect("Centro de costo", centro_options)
-    if centro_filter:
-        df_filtered = df_filtered[df_filtered["CENTRO_COSTO"].isin(centro_filter)]
+if "CENTRO_COSTO" in agg.columns:
+    centro_options = sorted(agg["CENTRO_COSTO"].dropna().unique().tolist())
+    filter_selections["CENTRO_COSTO"] = st.sidebar.multiselect("Centro de costo", centro_options, key="colocacion_centro_costo")
 
-if "VENDEDOR" in df.columns:
-    vendedor_options = sorted(df["VENDEDOR"].dropna().unique().tolist())
-    vendedor_filter = st.sidebar.multiselect("Vendedor", vendedor_options)
-    if vendedor_filter:
-        df_filtered = df_filtered[df_filtered["VENDEDOR"].isin(vendedor_filter)]
+if "VENDEDOR" in agg.columns:
+    vendedor_options = sorted(agg["VENDEDOR"].dropna().unique().tolist())
+    filter_selections["VENDEDOR"] = st.sidebar.multiselect("Vendedor", vendedor_options, key="colocacion_vendedor")
 
-if "MODALIDAD_VENTA" in df.columns:
-    modalidad_options = sorted(df["MODALIDAD_VENTA"].dropna().unique().tolist())
-    modalidad_filter = st.sidebar.multiselect("Modalidad de venta", modalidad_options)
-    if modalidad_filter:
-        df_filtered = df_filtered[df_filtered["MODALIDAD_VENTA"].isin(modalidad_filter)]
+if "MODALIDAD_VENTA" in agg.columns:
+    modalidad_options = sorted(agg["MODALIDAD_VENTA"].dropna().unique().tolist())
+    filter_selections["MODALIDAD_VENTA"] = st.sidebar.multiselect("Modalidad de venta", modalidad_options, key="colocacion_modalidad")
 
-if "BODEGA" in df.columns:
-    bodega_options = sorted(df["BODEGA"].dropna().unique().tolist())
-    bodega_filter = st.sidebar.multiselect("Bodega", bodega_options)
-    if bodega_filter:
-        df_filtered = df_filtered[df_filtered["BODEGA"].isin(bodega_filter)]
+if "BODEGA" in agg.columns:
+    bodega_options = sorted(agg["BODEGA"].dropna().unique().tolist())
+    filter_selections["BODEGA"] = st.sidebar.multiselect("Bodega", bodega_options, key="colocacion_bodega")
 
+date_range = None
+agg_base = agg
 if "FECHA_DOCUMENTO" in df.columns and df["FECHA_DOCUMENTO"].notna().any():
     min_date = df["FECHA_DOCUMENTO"].min().date()
     max_date = df["FECHA_DOCUMENTO"].max().date()
@@ -140,33 +184,42 @@ if "FECHA_DOCUMENTO" in df.columns and df["FECHA_DOCUMENTO"].notna().any():
         value=(min_date, max_date),
         min_value=min_date,
         max_value=max_date,
+        key="colocacion_fechas",
     )
-    if date_range and len(date_range) == 2:
+    if date_range and len(date_range) == 2 and tuple(date_range) != (min_date, max_date):
+        # Rango parcial: la tabla agregada es mensual, se re-agrega solo el rango pedido
         start_date, end_date = date_range
-        df_filtered = df_filtered[
-            (df_filtered["FECHA_DOCUMENTO"].dt.date >= start_date)
-            & (df_filtered["FECHA_DOCUMENTO"].dt.date <= end_date)
-        ]
+        fechas = df["FECHA_DOCUMENTO"].dt.date
+        agg_base = build_colocacion_aggregates(df[(fechas >= start_date) & (fechas <= end_date)])
+        if agg_base is not None:
+            ytd_engine = build_ytd_engine(agg_base)
+    else:
+        date_range = None
+
+agg_filtered = agg_base if agg_base is not None else agg.iloc[0:0]
+for col, selected_values in filter_selections.items():
+    if selected_values:
+        agg_filtered = agg_filtered[agg_filtered[col].isin(selected_values)]
 
 years_to_keep = {selected_year, selected_year - 1}
-df_filtered = df_filtered[df_filtered["ANIO"].isin(years_to_keep)]
+agg_filtered = agg_filtered[agg_filtered["ANIO"].isin(years_to_keep)]
 
-if df_filtered.empty:
+if agg_filtered.empty:
     st.warning("No hay registros con los filtros actualizados.")
     st.stop()
 
-df_ytd_current = df_filtered[
-    (df_filtered["ANIO"] == selected_year)
-    & df_filtered["MES"].notna()
-    & (df_filtered["MES"] <= selected_month)
+agg_ytd_current = agg_filtered[
+    (agg_filtered["ANIO"] == selected_year)
+    & agg_filtered["MES"].notna()
+    & (agg_filtered["MES"] <= selected_month)
 ]
-df_ytd_prev = df_filtered[
-    (df_filtered["ANIO"] == selected_year - 1)
-    & df_filtered["MES"].notna()
-    & (df_filtered["MES"] <= selected_month)
+agg_ytd_prev = agg_filtered[
+    (agg_filtered["ANIO"] == selected_year - 1)
+    & agg_filtered["MES"].notna()
+    & (agg_filtered["MES"] <= selected_month)
 ]
 
-if df_ytd_current.empty:
+if agg_ytd_current.empty:
     st.warning(
         f"No hay datos para {MONTH_NAMES.get(selected_month, selected_month)} {selected_year} con los filtros aplicados."
     )
@@ -178,12 +231,11 @@ st.info(
     f"Se contrasta con el mismo periodo de {selected_year - 1}."
 )
 
-# Contar todos los registros menos 2 por cada TotalFac negativo (devoluciones)
-total_unidades = len(df_ytd_current) - (df_ytd_current["TOTALFAC"] < 0).sum() * 2
-total_cop = df_ytd_current["TOTALFAC"].sum(skipna=True)  # Incluir todos (los negativos reducen el total)
+# Unidades = registros menos 2 por cada TotalFac negativo (devoluciones), precalculado en la tabla agregada
+ytd_current, ytd_prev = ytd_comparison(ytd_engine, selected_year, selected_month, filter_selections)
+total_unidades, total_cop = totals(ytd_current)
 ticket_promedio = total_cop / total_unidades if total_unidades else 0
-total_unidades_prev = len(df_ytd_prev) - (df_ytd_prev["TOTALFAC"] < 0).sum() * 2
-total_cop_prev = df_ytd_prev["TOTALFAC"].sum(skipna=True)  # Incluir todos
+total_unidades_prev, total_cop_prev = totals(ytd_prev)
 
 col1, col2, col3 = st.columns(3)
 col1.metric("Unidades (registros)", f"{total_unidades:,}")
@@ -191,15 +243,11 @@ col2.metric("Total COP", format_currency(total_cop, decimals=2))
 col3.metric("Ticket promedio", format_currency(ticket_promedio, decimals=2))
 
 st.markdown("---")
+section("comparativos mensuales")
 st.subheader("📅 Mes seleccionado vs mes anterior")
 
 # Primero calcular los valores del mes actual
-df_month_current = df_filtered[
-    (df_filtered["ANIO"] == selected_year) & (df_filtered["MES"] == selected_month)
-]
-# Contar todos los registros menos 2 por cada TotalFac negativo (devoluciones)
-month_units = len(df_month_current) - (df_month_current["TOTALFAC"] < 0).sum() * 2
-month_total = df_month_current["TOTALFAC"].sum(skipna=True)  # Incluir todos (los negativos reducen el total)
+month_units, month_total = totals(ytd_engine.month(selected_year, selected_month, filter_selections))
 month_ticket = month_total / month_units if month_units else 0
 
 # Comparar con el mes anterior del mismo año
@@ -209,12 +257,8 @@ if prev_month < 1:
     prev_month = 12
     prev_month_year = selected_year - 1
 
-df_month_prev_same_year = df_filtered[
-    (df_filtered["ANIO"] == prev_month_year) & (df_filtered["MES"] == prev_month)
-]
-
-month_prev_units = len(df_month_prev_same_year) - (df_month_prev_same_year["TOTALFAC"] < 0).sum() * 2 if not df_month_prev_same_year.empty else 0
-month_prev_total = df_month_prev_same_year["TOTALFAC"].sum(skipna=True) if not df_month_prev_same_year.empty else 0
+month_prev_measures = ytd_engine.month(prev_month_year, prev_month, filter_selections)
+month_prev_units, month_prev_total = totals(month_prev_measures)
 month_prev_ticket = month_prev_total / month_prev_units if month_prev_units else 0
 
 prev_month_label = f"{MONTH_NAMES.get(prev_month, prev_month)} {prev_month_year}"
@@ -243,7 +287,7 @@ col_prev3.metric(
     f"{format_currency(delta_prev_ticket, decimals=2)} ({pct_prev_ticket:+.1f}%)" if month_prev_ticket else None,
 )
 
-if not df_month_prev_same_year.empty:
+if month_prev_measures["REGISTROS"]:
     compare_prev_df = pd.DataFrame(
         {
             "Mes": [period_label, prev_month_label],
@@ -282,12 +326,8 @@ else:
 st.markdown("---")
 st.subheader("📅 Mes seleccionado vs mismo mes año anterior")
 
-df_month_prev = df_filtered[
-    (df_filtered["ANIO"] == selected_year - 1) & (df_filtered["MES"] == selected_month)
-]
-# Contar todos los registros menos 2 por cada TotalFac negativo (devoluciones)
-month_units_prev = len(df_month_prev) - (df_month_prev["TOTALFAC"] < 0).sum() * 2
-month_total_prev = df_month_prev["TOTALFAC"].sum(skipna=True)  # Incluir todos (los negativos reducen el total)
+month_last_year_measures = ytd_engine.month(selected_year - 1, selected_month, filter_selections)
+month_units_prev, month_total_prev = totals(month_last_year_measures)
 month_ticket_prev = month_total_prev / month_units_prev if month_units_prev else 0
 
 delta_month_units = month_units - month_units_prev
@@ -314,7 +354,7 @@ col_m3.metric(
     f"{format_currency(delta_ticket, decimals=2)} ({pct_ticket:+.1f}%)" if month_ticket_prev else None,
 )
 
-if not df_month_prev.empty:
+if month_last_year_measures["REGISTROS"]:
     compare_df = pd.DataFrame(
         {
             "Año": [selected_year, selected_year - 1],
@@ -353,27 +393,28 @@ else:
 
 st.markdown("---")
 
-df_analysis = df_ytd_current.copy()
+agg_analysis = agg_ytd_current
 
 # Comparación configurable
+section("comparación configurable")
 dimension_options = []
-if "ANIO" in df_analysis.columns:
+if "ANIO" in agg_analysis.columns:
     dimension_options.append(("Año", "ANIO"))
-if "MES_NOMBRE" in df_analysis.columns and df_analysis["MES_NOMBRE"].notna().any():
+if "MES_NOMBRE" in agg_analysis.columns and agg_analysis["MES_NOMBRE"].notna().any():
     dimension_options.append(("Mes", "MES_NOMBRE"))
-if "PERIODO_LABEL" in df_analysis.columns and df_analysis["PERIODO_LABEL"].notna().any():
+if "PERIODO_LABEL" in agg_analysis.columns and agg_analysis["PERIODO_LABEL"].notna().any():
     dimension_options.append(("Periodo (YYYY-MM)", "PERIODO_LABEL"))
-if "CENTRO_COSTO" in df_analysis.columns:
+if "CENTRO_COSTO" in agg_analysis.columns:
     dimension_options.append(("Centro de costo", "CENTRO_COSTO"))
-if "VENDEDOR" in df_analysis.columns:
+if "VENDEDOR" in agg_analysis.columns:
     dimension_options.append(("Vendedor", "VENDEDOR"))
-if "MODALIDAD_VENTA" in df_analysis.columns:
+if "MODALIDAD_VENTA" in agg_analysis.columns:
     dimension_options.append(("Modalidad de venta", "MODALIDAD_VENTA"))
-if "BODEGA" in df_analysis.columns:
+if "BODEGA" in agg_analysis.columns:
     dimension_options.append(("Bodega", "BODEGA"))
-if "PRODUCTO" in df_analysis.columns:
+if "PRODUCTO" in agg_analysis.columns:
     dimension_options.append(("Producto", "PRODUCTO"))
-if "TIPO_PRODUCTO" in df_analysis.columns:
+if "TIPO_PRODUCTO" in agg_analysis.columns:
     dimension_options.append(("Tipo de producto", "TIPO_PRODUCTO"))
 
 if not dimension_options:
@@ -381,25 +422,25 @@ if not dimension_options:
     st.stop()
 
 dimension_labels = [label for label, _ in dimension_options]
-selected_dimension_label = st.selectbox("Agrupar por", dimension_labels, index=0)
+selected_dimension_label = st.selectbox("Agrupar por", dimension_labels, index=0, key="colocacion_agrupar")
 group_col = dict(dimension_options)[selected_dimension_label]
 
 # Si se agrupa por año, construir resumen con ambos años
-if group_col == "ANIO" and not df_ytd_prev.empty:
+if group_col == "ANIO" and not agg_ytd_prev.empty:
     # Combinar datos de ambos años para el resumen
-    df_both_years = pd.concat([df_analysis, df_ytd_prev], ignore_index=True)
-    summary_current = build_summary(df_both_years, group_col)
+    agg_both_years = pd.concat([agg_analysis, agg_ytd_prev], ignore_index=True)
+    summary_current = build_summary(agg_both_years, group_col)
     summary_prev = None  # Ya está incluido en summary_current
     include_prev_month = True
 else:
-    summary_current = build_summary(df_analysis, group_col)
+    summary_current = build_summary(agg_analysis, group_col)
     # Incluir año anterior cuando se agrupa por mes/período
     should_include_prev = (
-        not df_ytd_prev.empty 
+        not agg_ytd_prev.empty 
         and group_col in {"MES_NOMBRE", "PERIODO_LABEL"}
     )
     summary_prev = (
-        build_summary(df_ytd_prev, group_col)
+        build_summary(agg_ytd_prev, group_col)
         if should_include_prev
         else None
     )
@@ -559,17 +600,11 @@ else:
 st.plotly_chart(fig_money, use_container_width=True)
 
 st.markdown("---")
+section("centros de costo")
 st.subheader("🏢 Centros de costo destacados")
 
-if "CENTRO_COSTO" in df_analysis.columns:
-    centro_summary = (
-        df_analysis.groupby("CENTRO_COSTO")
-        .agg(
-            Unidades=("TOTALFAC", lambda x: len(x) - (x < 0).sum() * 2),  # Restar 2 por cada negativo
-            Total_COP=("TOTALFAC", "sum"),  # Incluir todos (los negativos reducen el total)
-        )
-        .reset_index()
-    )
+if "CENTRO_COSTO" in agg_analysis.columns:
+    centro_summary = build_summary(agg_analysis, "CENTRO_COSTO")
     top_centro_unidades = centro_summary.sort_values("Unidades", ascending=False).head(10)
     top_centro_cop = centro_summary.sort_values("Total_COP", ascending=False).head(10)
 
@@ -594,9 +629,32 @@ else:
     st.info("El archivo no incluye `Centro Costo`, por lo que no es posible ranquearlo.")
 
 st.markdown("---")
+section("descarga")
 st.subheader("📥 Descarga")
 
-csv_bytes = df_analysis.to_csv(index=False).encode("utf-8-sig")
+# Solo la descarga necesita el detalle de facturas: se leen las filas YTD del año objetivo
+# con los filtros empujados a los cachés Parquet de cada libro
+detail_filters = [("ANIO", "==", selected_year), ("MES", "<=", selected_month)]
+for col, selected_values in filter_selections.items():
+    if selected_values:
+        detail_filters.append((col, "in", selected_values))
+if "FECHA_DOCUMENTO" in df.columns and df["FECHA_DOCUMENTO"].notna().any():
+    start_date, end_date = date_range if date_range else (min_date, max_date)
+    detail_filters += date_range_filters("FECHA_DOCUMENTO", start_date, end_date)
+colocacion_catalog = get_catalog("colocacion")
+colocacion_files = colocacion_catalog.sources()
+df_analysis = get_dataset_store().acquire(
+    "colocacion",
+    (files_signature(colocacion_files), filters_key(detail_filters)),
+    lambda: colocacion_catalog.load_range(filters=detail_filters),
+    slot="colocacion_detalle",
+    sources=colocacion_files,
+)
+if df_analysis is None:
+    df_analysis = pd.DataFrame()
+
+with timed("exportar CSV", rows_in=df_analysis):
+    csv_bytes = df_analysis.to_csv(index=False).encode("utf-8-sig")
 st.download_button(
     "Descargar registros filtrados",
     data=csv_bytes,
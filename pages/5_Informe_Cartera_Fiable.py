@@ -1,9 +1,7 @@
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-import plotly.express as px
 from datetime import datetime
-from fpdf import FPDF
 import sys
 from pathlib import Path
 
@@ -12,7 +10,14 @@ utils_path = Path(__file__).parent.parent / "utils"
 if str(utils_path) not in sys.path:
     sys.path.insert(0, str(utils_path))
 
-from data_loader import load_cartera_fiable_files
+from data_loader import (
+    index_cartera_fiable_files,
+    sorted_fiable_periods,
+    periodo_label,
+)
+from dataset_store import get_dataset_store, files_signature
+from fiable_summary import load_fiable_summary, summary_table
+from instrumentation import section, timed
 
 # Título principal
 st.title("📊 Informe Integrado de Cartera FIABLE")
@@ -65,18 +70,45 @@ def format_percentage(value):
     except (TypeError, ValueError):
         return "0.00%"
 
+def fiable_period_label(periodo):
+    return periodo_label(datetime(periodo[0], periodo[1], 1)) if periodo else "Sin mes en el nombre"
+
 # Cargar datos
-@st.cache_data
-def load_fiable_data():
-    """Carga los 3 archivos de cartera FIABLE"""
-    return load_cartera_fiable_files()
+def load_fiable_data(periodo, files):
+    """Resumen de los 3 archivos de cartera FIABLE de un periodo (compartido entre sesiones)"""
+    return get_dataset_store().acquire(
+        "cartera_fiable_resumen",
+        (periodo, files_signature(files.values())),
+        lambda: load_fiable_summary(files),
+        sources=files.values()
+    )
+
+# Índice de archivos por mes y tipo (un solo recorrido de directorios)
+fiable_index = index_cartera_fiable_files()
+fiable_periods = sorted_fiable_periods(fiable_index)
+selected_period = None
+if len(fiable_periods) > 1:
+    selected_period = st.sidebar.selectbox(
+        "📅 Mes del informe",
+        fiable_periods,
+        format_func=fiable_period_label,
+        key="fiable_periodo",
+    )
+elif fiable_periods:
+    selected_period = fiable_periods[0]
 
 # Cargar datos
+section("carga de datos")
 with st.spinner("Cargando archivos de cartera FIABLE..."):
-    df_colocada, df_financiero, df_proyectadas = load_fiable_data()
+    resumen = load_fiable_data(selected_period, fiable_index[selected_period]) if fiable_periods else None
+    resumen = resumen or {}
+    # Secciones del resumen (None si el libro no está disponible)
+    colocada = resumen.get('colocada')
+    financiero = resumen.get('financiero')
+    proyectadas = resumen.get('proyectadas')
 
 # Verificar que se cargaron los archivos
-if df_colocada is None and df_financiero is None and df_proyectadas is None:
+if colocada is None and financiero is None and proyectadas is None:
     st.error("❌ No se encontraron los archivos de cartera FIABLE. Por favor, asegúrate de que los siguientes archivos estén en el directorio:")
     st.write("📁 **Ubicación:** `data/cartera_fiable/raw/`")
     st.write("- Cartera Colocada FIABLE OCTUBRE 2025.xlsx")
@@ -86,52 +118,47 @@ if df_colocada is None and df_financiero is None and df_proyectadas is None:
     st.stop()
 
 # Mostrar información de archivos cargados
-st.info("📁 **Archivos cargados:**")
+st.info(f"📁 **Archivos cargados ({fiable_period_label(selected_period)}):**")
 cols_info = st.columns(3)
-if df_colocada is not None:
-    cols_info[0].success(f"✅ Colocada: {len(df_colocada):,} registros")
+if colocada is not None:
+    cols_info[0].success(f"✅ Colocada: {colocada['registros']:,} registros")
 else:
     cols_info[0].warning("⚠️ Colocada: No disponible")
     
-if df_financiero is not None:
-    cols_info[1].success(f"✅ Financiero X edades: {len(df_financiero):,} registros")
+if financiero is not None:
+    cols_info[1].success(f"✅ Financiero X edades: {financiero['registros']:,} registros")
 else:
     cols_info[1].warning("⚠️ Financiero X edades: No disponible")
     
-if df_proyectadas is not None:
-    cols_info[2].success(f"✅ Proyectadas: {len(df_proyectadas):,} registros")
+if proyectadas is not None:
+    cols_info[2].success(f"✅ Proyectadas: {proyectadas['registros']:,} registros")
 else:
     cols_info[2].warning("⚠️ Proyectadas: No disponible")
 
 st.markdown("---")
 
 # ========== RESUMEN EJECUTIVO ==========
+section("resumen ejecutivo")
 st.subheader("📈 Resumen Ejecutivo")
 
 # Calcular métricas principales
-if df_financiero is not None:
-    total_capital = df_financiero['Capital'].sum() if 'Capital' in df_financiero.columns else 0
-    total_cuota = df_financiero['Cuota'].sum() if 'Cuota' in df_financiero.columns else 0
-    total_interes = df_financiero['Interes'].sum() if 'Interes' in df_financiero.columns else 0
-    total_fianza = df_financiero['Fianza'].sum() if 'Fianza' in df_financiero.columns else 0
+# (todas las cifras salen del resumen precalculado, sin tocar las filas de detalle)
+edades_data = summary_table(financiero['edades']) if financiero is not None else None
+if financiero is not None:
+    totales_financiero = financiero['totales']
+    total_capital = totales_financiero.get('Capital', 0)
+    total_cuota = totales_financiero.get('Cuota', 0)
+    total_interes = totales_financiero.get('Interes', 0)
+    total_fianza = totales_financiero.get('Fianza', 0)
     
-    # Análisis por edades
-    if 'EDADES' in df_financiero.columns:
-        # Función auxiliar para buscar valores de edad con variaciones
-        def get_capital_by_edad(pattern_list):
-            total = 0
-            for pattern in pattern_list:
-                mask = df_financiero['EDADES'].astype(str).str.contains(pattern, case=False, na=False)
-                if mask.any():
-                    total = df_financiero[mask]['Capital'].sum()
-                    break
-            return total
-        
-        por_vencer = get_capital_by_edad(['PorVencer', 'Por Vencer', 'PorVencer', 'por vencer'])
-        dias_30 = get_capital_by_edad(['^30$', '30 Días', '30 dias'])
-        dias_60 = get_capital_by_edad(['^60$', '60 Días', '60 dias'])
-        dias_90 = get_capital_by_edad(['^90$', '90 Días', '90 dias'])
-        mas_90 = get_capital_by_edad(['Mas90', 'Mas 90', 'Más 90', 'Mas de 90', 'Más de 90'])
+    # Análisis por edades: capital por rango normalizado (EDADES_NORM)
+    if edades_data is not None:
+        capital_por_edad = edades_data.set_index('EDADES')['Capital']
+        por_vencer = capital_por_edad.get('PorVencer', 0)
+        dias_30 = capital_por_edad.get('30', 0)
+        dias_60 = capital_por_edad.get('60', 0)
+        dias_90 = capital_por_edad.get('90', 0)
+        mas_90 = capital_por_edad.get('Mas90', 0)
     else:
         por_vencer = dias_30 = dias_60 = dias_90 = mas_90 = 0
     
@@ -145,23 +172,25 @@ else:
     indice_corriente = indice_mora = 0
 
 # Métricas de Cartera Proyectadas
-if df_proyectadas is not None:
-    total_proyectadas = df_proyectadas['Total'].sum() if 'Total' in df_proyectadas.columns else 0
-    por_vencer_proy = df_proyectadas['PorVencer'].sum() if 'PorVencer' in df_proyectadas.columns else 0
-    treinta_proy = df_proyectadas['Treinta_Dias'].sum() if 'Treinta_Dias' in df_proyectadas.columns else 0
-    sesenta_proy = df_proyectadas['Sesenta_Dias'].sum() if 'Sesenta_Dias' in df_proyectadas.columns else 0
-    noventa_proy = df_proyectadas['Noventa_Dias'].sum() if 'Noventa_Dias' in df_proyectadas.columns else 0
-    mas_noventa_proy = df_proyectadas['Mas_de_Noventa'].sum() if 'Mas_de_Noventa' in df_proyectadas.columns else 0
+if proyectadas is not None:
+    totales_proyectadas = proyectadas['totales']
+    total_proyectadas = totales_proyectadas.get('Total', 0)
+    por_vencer_proy = totales_proyectadas.get('PorVencer', 0)
+    treinta_proy = totales_proyectadas.get('Treinta_Dias', 0)
+    sesenta_proy = totales_proyectadas.get('Sesenta_Dias', 0)
+    noventa_proy = totales_proyectadas.get('Noventa_Dias', 0)
+    mas_noventa_proy = totales_proyectadas.get('Mas_de_Noventa', 0)
     total_mora_proy = treinta_proy + sesenta_proy + noventa_proy + mas_noventa_proy
 else:
     total_proyectadas = por_vencer_proy = treinta_proy = sesenta_proy = noventa_proy = mas_noventa_proy = total_mora_proy = 0
 
 # Métricas de Cartera Colocada
-if df_colocada is not None:
-    total_colocada = df_colocada['ValorCuota'].sum() if 'ValorCuota' in df_colocada.columns else 0
-    total_saldo_capital = df_colocada['SaldoCapital'].sum() if 'SaldoCapital' in df_colocada.columns else 0
-    total_prestamo = df_colocada['ValorPrestamo'].sum() if 'ValorPrestamo' in df_colocada.columns else 0
-    num_creditos = df_colocada['NumeroFactura'].nunique() if 'NumeroFactura' in df_colocada.columns else 0
+if colocada is not None:
+    totales_colocada = colocada['totales']
+    total_colocada = totales_colocada.get('ValorCuota', 0)
+    total_saldo_capital = totales_colocada.get('SaldoCapital', 0)
+    total_prestamo = totales_colocada.get('ValorPrestamo', 0)
+    num_creditos = totales_colocada.get('NumeroCreditos', 0)
 else:
     total_colocada = total_saldo_capital = total_prestamo = num_creditos = 0
 
@@ -199,49 +228,11 @@ with col4:
 st.markdown("---")
 
 # ========== ANÁLISIS POR EDADES ==========
+section("análisis por edades")
 st.subheader("📊 Análisis por Edades de Vencimiento")
 
-if df_financiero is not None and 'EDADES' in df_financiero.columns:
-    # Gráfico de barras por edades
-    edades_data = df_financiero.groupby('EDADES').agg({
-        'Capital': 'sum',
-        'Cuota': 'sum',
-        'Interes': 'sum'
-    }).reset_index()
-    
-    # Función para normalizar nombres de edades
-    def normalize_edad(edad_str):
-        edad_str = str(edad_str).strip()
-        if 'PorVencer' in edad_str or 'Por Vencer' in edad_str or 'por vencer' in edad_str.lower():
-            return 'PorVencer'
-        elif edad_str == '30' or '30' in edad_str:
-            return '30'
-        elif edad_str == '60' or '60' in edad_str:
-            return '60'
-        elif edad_str == '90' or '90' in edad_str:
-            return '90'
-        elif 'Mas90' in edad_str or 'Mas 90' in edad_str or 'Más 90' in edad_str or 'Mas de 90' in edad_str:
-            return 'Mas90'
-        return edad_str
-    
-    # Normalizar edades
-    edades_data['EDADES_NORM'] = edades_data['EDADES'].apply(normalize_edad)
-    
-    # Agrupar por edades normalizadas
-    edades_data = edades_data.groupby('EDADES_NORM').agg({
-        'Capital': 'sum',
-        'Cuota': 'sum',
-        'Interes': 'sum'
-    }).reset_index()
-    edades_data.columns = ['EDADES', 'Capital', 'Cuota', 'Interes']
-    
-    # Ordenar edades
-    orden_edades = ['PorVencer', '30', '60', '90', 'Mas90']
-    edades_data['EDADES_ORDER'] = edades_data['EDADES'].apply(
-        lambda x: orden_edades.index(x) if x in orden_edades else 999
-    )
-    edades_data = edades_data.sort_values('EDADES_ORDER')
-    
+if edades_data is not None:
+    # Rangos ya ordenados por la categórica (PorVencer, 30, 60, 90, Mas90, otros)
     col1, col2 = st.columns(2)
     
     with col1:
@@ -290,7 +281,8 @@ if df_financiero is not None and 'EDADES' in df_financiero.columns:
     st.dataframe(resumen_edades, use_container_width=True, hide_index=True)
 
 # ========== ANÁLISIS DE CARTERA PROYECTADAS ==========
-if df_proyectadas is not None:
+section("cartera proyectadas")
+if proyectadas is not None:
     st.markdown("---")
     st.subheader("📈 Análisis de Cartera Proyectadas")
     
@@ -307,7 +299,7 @@ if df_proyectadas is not None:
         st.metric("60+ Días", format_currency(sesenta_proy + noventa_proy + mas_noventa_proy))
     
     # Gráfico de distribución por edades (Proyectadas)
-    if 'Total' in df_proyectadas.columns:
+    if 'Total' in totales_proyectadas:
         fig_proy = go.Figure()
         edades_proy = ['PorVencer', 'Treinta_Dias', 'Sesenta_Dias', 'Noventa_Dias', 'Mas_de_Noventa']
         valores_proy = [por_vencer_proy, treinta_proy, sesenta_proy, noventa_proy, mas_noventa_proy]
@@ -329,16 +321,9 @@ if df_proyectadas is not None:
         st.plotly_chart(fig_proy, use_container_width=True)
     
     # Análisis por calificación
-    if 'Calificacion' in df_proyectadas.columns:
+    if proyectadas['calificacion'] is not None:
         st.markdown("### 📊 Análisis por Calificación")
-        calif_data = df_proyectadas.groupby('Calificacion').agg({
-            'Total': 'sum',
-            'PorVencer': 'sum',
-            'Treinta_Dias': 'sum',
-            'Sesenta_Dias': 'sum',
-            'Noventa_Dias': 'sum',
-            'Mas_de_Noventa': 'sum'
-        }).reset_index()
+        calif_data = summary_table(proyectadas['calificacion'])
         
         fig_calif = go.Figure()
         fig_calif.add_trace(go.Bar(
@@ -356,7 +341,8 @@ if df_proyectadas is not None:
         st.plotly_chart(fig_calif, use_container_width=True)
 
 # ========== ANÁLISIS DE CARTERA COLOCADA ==========
-if df_colocada is not None:
+section("cartera colocada")
+if colocada is not None:
     st.markdown("---")
     st.subheader("💼 Análisis de Cartera Colocada")
     
@@ -373,14 +359,9 @@ if df_colocada is not None:
         st.metric("📝 Número de Créditos", f"{num_creditos:,}")
     
     # Análisis por producto
-    if 'Producto' in df_colocada.columns:
+    if colocada['producto'] is not None:
         st.markdown("### 📦 Análisis por Producto")
-        producto_data = df_colocada.groupby('Producto').agg({
-            'ValorCuota': 'sum',
-            'SaldoCapital': 'sum',
-            'ValorPrestamo': 'sum',
-            'NumeroFactura': 'nunique'
-        }).reset_index()
+        producto_data = summary_table(colocada['producto'])
         producto_data.columns = ['Producto', 'Valor Cuotas', 'Saldo Capital', 'Valor Préstamo', 'Número Créditos']
         
         fig_producto = go.Figure()
@@ -402,14 +383,9 @@ if df_colocada is not None:
         st.dataframe(producto_data, use_container_width=True, hide_index=True)
     
     # Análisis por cuenta
-    if 'NombreCuentaCartera' in df_colocada.columns:
+    if colocada['cuenta'] is not None:
         st.markdown("### 🏢 Análisis por Cuenta")
-        cuenta_data = df_colocada.groupby('NombreCuentaCartera').agg({
-            'ValorCuota': 'sum',
-            'SaldoCapital': 'sum',
-            'NumeroFactura': 'nunique'
-        }).reset_index()
-        cuenta_data = cuenta_data.sort_values('ValorCuota', ascending=False)
+        cuenta_data = summary_table(colocada['cuenta'])
         cuenta_data.columns = ['Cuenta', 'Valor Cuotas', 'Saldo Capital', 'Número Créditos']
         
         fig_cuenta = go.Figure()
@@ -429,6 +405,7 @@ if df_colocada is not None:
         st.plotly_chart(fig_cuenta, use_container_width=True)
 
 # ========== TABLA COMPARATIVA ==========
+section("tabla comparativa")
 st.markdown("---")
 st.subheader("📊 Tabla Comparativa General")
 
@@ -482,7 +459,8 @@ df_comparison = pd.DataFrame(comparison_data)
 st.dataframe(df_comparison, use_container_width=True, hide_index=True)
 
 # Botón de descarga
-csv = df_comparison.to_csv(index=False).encode('utf-8-sig')
+with timed("exportar CSV", rows_in=df_comparison):
+    csv = df_comparison.to_csv(index=False).encode('utf-8-sig')
 st.download_button(
     label="📥 Descargar tabla comparativa como CSV",
     data=csv,
@@ -0,0 +1,198 @@
+import streamlit as st
+import pandas as pd
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Agregar el directorio utils al path
+utils_path = Path(__file__).parent.parent / "utils"
+if str(utils_path) not in sys.path:
+    sys.path.insert(0, str(utils_path))
+
+from data_loader import CACHE_DOMAINS
+from dataset_store import get_dataset_store
+from cache_metrics import snapshot, started_at, LOAD_TIERS
+from cache_inventory import disk_cache_entries, memory_cache_entries
+from cache_graph import RAW_FILE_LISTERS, dependents, invalidate_raw, invalidate_domain
+
+st.title("🗄️ Administración de cachés")
+st.caption(
+    "Estado de los cachés en disco (`data/**/cache/`) y del almacén en memoria compartido entre sesiones. "
+    "Invalida solo el libro o dominio que cambió en lugar de limpiar todo: se borran sus cachés, "
+    "los consolidados y resúmenes que lo incluyen y los datasets en memoria construidos a partir de él."
+)
+
+store = get_dataset_store()
+
+
+def format_bytes(value):
+    value = float(value or 0)
+    for unit in ("B", "KB", "MB", "GB"):
+        if value < 1024 or unit == "GB":
+            return f"{value:,.0f} {unit}" if unit == "B" else f"{value:,.1f} {unit}"
+        value /= 1024
+
+
+def format_age(seconds):
+    if seconds is None:
+        return "-"
+    if seconds < 60:
+        return f"{seconds:.0f} s"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f} min"
+    if seconds < 86400:
+        return f"{seconds / 3600:.1f} h"
+    return f"{seconds / 86400:.1f} d"
+
+
+def format_seconds(value):
+    return f"{value:.3f} s" if value is not None else "-"
+
+
+# Pendiente de mostrar tras una invalidación (sobrevive al st.rerun)
+if "cache_admin_message" in st.session_state:
+    level, message = st.session_state.pop("cache_admin_message")
+    getattr(st, level)(message)
+
+now = time.time()
+disk_entries = disk_cache_entries(now)
+memory_entries = memory_cache_entries(store, now)
+load_metrics = snapshot()
+store_stats = store.stats()
+
+# ========== RESUMEN ==========
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Archivos en disco", f"{len(disk_entries):,}")
+col2.metric("Tamaño en disco", format_bytes(sum(entry['bytes'] for entry in disk_entries)))
+col3.metric("Entradas en memoria", f"{len(memory_entries):,}")
+col4.metric("Tamaño en memoria", format_bytes(store.total_bytes()))
+
+# ========== CARGAS DESDE DISCO ==========
+st.markdown("---")
+st.subheader("📥 Cargas por dominio")
+st.caption(
+    "Acierto = carga servida desde Feather o Parquet; fallo = parseo del Excel en frío. "
+    f"Acumulado desde {datetime.fromtimestamp(started_at()).strftime('%d/%m/%Y %H:%M:%S')}."
+)
+if load_metrics:
+    rows = []
+    for domain, values in load_metrics.items():
+        row = {
+            "Dominio": domain,
+            "Aciertos": values['hits'],
+            "Fallos": values['misses'],
+            "% aciertos": f"{values['hit_rate'] * 100:.1f}%" if values['hit_rate'] is not None else "-",
+        }
+        for tier in LOAD_TIERS:
+            tier_values = values['tiers'].get(tier)
+            row[f"{tier.capitalize()} (cargas)"] = tier_values['loads'] if tier_values else 0
+            row[f"{tier.capitalize()} (prom.)"] = format_seconds(tier_values['mean_seconds'] if tier_values else None)
+        rows.append(row)
+    st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+else:
+    st.info("Aún no se han cargado libros en este proceso.")
+
+# ========== ALMACÉN EN MEMORIA ==========
+st.markdown("---")
+st.subheader("🧠 Almacén en memoria")
+if store_stats:
+    st.dataframe(
+        pd.DataFrame([
+            {
+                "Dominio": domain,
+                "Entradas": values['entries'],
+                "Tamaño": format_bytes(values['bytes']),
+                "Aciertos": values['hits'],
+                "Fallos": values['misses'],
+                "Expulsiones": values['evictions'],
+                "Expiraciones": values['expirations'],
+            }
+            for domain, values in sorted(store_stats.items())
+        ]),
+        use_container_width=True,
+        hide_index=True,
+    )
+if memory_entries:
+    st.dataframe(
+        pd.DataFrame([
+            {
+                "Dominio": entry['dominio'],
+                "Clave": str(entry['clave'])[:120],
+                "Tamaño": format_bytes(entry['bytes']),
+                "Sesiones": entry['sesiones'],
+                "Edad": format_age(entry['edad_s']),
+                "Sin uso": format_age(entry['inactiva_s']),
+                "Libros fuente": len(entry['fuentes']),
+            }
+            for entry in memory_entries
+        ]),
+        use_container_width=True,
+        hide_index=True,
+    )
+else:
+    st.info("No hay datasets residentes en memoria.")
+
+# ========== CACHÉ EN DISCO ==========
+st.markdown("---")
+st.subheader("💾 Caché en disco")
+if disk_entries:
+    st.dataframe(
+        pd.DataFrame([
+            {
+                "Dominio": entry['dominio'],
+                "Archivo": entry['archivo'],
+                "Nivel": entry['nivel'],
+                "Fuente": entry['fuente'].name if entry['fuente'] is not None else "(derivado)",
+                "Tamaño": format_bytes(entry['bytes']),
+                "Edad": format_age(entry['edad_s']),
+                "Vigente": {True: "✅", False: "⚠️ desactualizado", None: "-"}[entry['vigente']],
+            }
+            for entry in disk_entries
+        ]),
+        use_container_width=True,
+        hide_index=True,
+    )
+else:
+    st.info("No hay archivos en las carpetas de caché.")
+
+# ========== INVALIDACIÓN ==========
+st.markdown("---")
+st.subheader("🧹 Invalidación selectiva")
+domain = st.selectbox("Dominio", list(CACHE_DOMAINS))
+sources = {str(path): path for path in RAW_FILE_LISTERS[domain]()}
+
+
+def _report(removed, errors, evicted, target):
+    message = f"{target}: se eliminaron {len(removed)} archivos y se expulsaron {len(evicted)} datasets de memoria."
+    if errors:
+        st.session_state["cache_admin_message"] = ("warning", f"{message} {len(errors)} no se pudieron borrar.")
+    else:
+        st.session_state["cache_admin_message"] = ("success", message)
+    st.rerun()
+
+
+col_files, col_domain = st.columns([3, 1])
+with col_files:
+    selected_sources = st.multiselect(
+        "Libros", list(sources), format_func=lambda path: sources[path].name,
+        placeholder="Selecciona uno o más libros"
+    )
+    if selected_sources:
+        afectados = sorted({
+            str(path) for source in selected_sources for path in dependents(domain, sources[source])
+        })
+        st.caption("Archivos dependientes en disco: " + (", ".join(f"`{path}`" for path in afectados) or "ninguno"))
+    if st.button("Invalidar libros seleccionados", disabled=not selected_sources):
+        removed, errors, evicted = [], [], []
+        for source in selected_sources:
+            source_removed, source_errors, source_evicted = invalidate_raw(domain, sources[source], store)
+            removed += source_removed
+            errors += source_errors
+            evicted += source_evicted
+        _report(removed, errors, evicted, f"{len(selected_sources)} libro(s) de {domain}")
+with col_domain:
+    st.write("")
+    if st.button(f"Invalidar todo {domain}", type="secondary"):
+        removed, errors, evicted = invalidate_domain(domain, store)
+        _report(removed, errors, evicted, f"Dominio {domain}")
@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# Los módulos de utils se importan por nombre, igual que desde las páginas
+utils_path = Path(__file__).resolve().parent.parent / "utils"
+if str(utils_path) not in sys.path:
+    sys.path.insert(0, str(utils_path))
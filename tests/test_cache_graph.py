@@ -0,0 +1,105 @@
+import os
+
+import pandas as pd
+import pytest
+
+import cache_graph
+from cache_graph import sync_raw_files
+from dataset_store import DatasetStore
+
+
+@pytest.fixture
+def raw_tree(tmp_path, monkeypatch):
+    """Dos libros de recaudo y uno de pipeline con sus cachés por archivo y un consolidado."""
+    books = {'recaudo': [], 'pipeline': []}
+    cache_domains = {}
+    for domain in books:
+        raw_dir, cache_dir = tmp_path / domain, tmp_path / domain / 'cache'
+        cache_dir.mkdir(parents=True)
+        cache_domains[domain] = (raw_dir, cache_dir)
+    for domain, name in [('recaudo', 'Recaudo_Enero_2025'), ('recaudo', 'Recaudo_Febrero_2025'), ('pipeline', 'Pipeline_2025')]:
+        book = tmp_path / domain / f'{name}.xlsx'
+        book.write_bytes(b'v1')
+        books[domain].append(book)
+        for suffix in ('.feather', '.parquet'):
+            (cache_domains[domain][1] / f'{name}{suffix}').write_bytes(b'')
+    latest = tmp_path / 'pipeline' / 'cache' / 'pipeline_latest.parquet'
+    latest.write_bytes(b'')
+
+    monkeypatch.setattr(cache_graph, 'RAW_FILE_LISTERS', {domain: (lambda files=files: list(files)) for domain, files in books.items()})
+    monkeypatch.setattr(cache_graph, 'CACHE_DOMAINS', cache_domains)
+    monkeypatch.setattr(cache_graph, 'DOMAIN_DERIVED_FILES', {'pipeline': [latest]})
+    monkeypatch.setattr(cache_graph, '_seen', None)
+    return books, cache_domains, latest
+
+
+def rewrite(path, content):
+    stat = path.stat()
+    path.write_bytes(content)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def frame():
+    return pd.DataFrame({'VALOR': [1]})
+
+
+def test_first_sync_only_records_state(raw_tree):
+    assert sync_raw_files(DatasetStore()) == []
+
+
+def test_modified_book_invalidates_only_its_dependents(raw_tree):
+    books, cache_domains, latest = raw_tree
+    enero, febrero = books['recaudo']
+    store = DatasetStore()
+    store.acquire('recaudo', 'enero', frame, sources=[enero])
+    store.acquire('recaudo', 'febrero', frame, sources=[febrero])
+    sync_raw_files(store)
+
+    rewrite(enero, b'v2 con mas filas')
+    changes = sync_raw_files(store)
+
+    assert changes == [('recaudo', str(enero), 'modificado')]
+    recaudo_cache = cache_domains['recaudo'][1]
+    assert not (recaudo_cache / f'{enero.stem}.parquet').exists()
+    assert not (recaudo_cache / f'{enero.stem}.feather').exists()
+    assert (recaudo_cache / f'{febrero.stem}.parquet').exists()
+    assert latest.exists()
+    assert not store.contains('recaudo', 'enero')
+    assert store.contains('recaudo', 'febrero')
+    # Sin cambios nuevos, la siguiente revisión no invalida nada
+    assert sync_raw_files(store) == []
+
+
+def test_removed_book_drops_consolidated_files(raw_tree):
+    books, cache_domains, latest = raw_tree
+    pipeline_book = books['pipeline'][0]
+    store = DatasetStore()
+    store.acquire('pipeline', 'ultimos', frame, sources=[pipeline_book])
+    sync_raw_files(store)
+
+    books['pipeline'].clear()
+    changes = sync_raw_files(store)
+
+    assert changes == [('pipeline', str(pipeline_book), 'eliminado')]
+    assert not latest.exists()
+    assert not store.contains('pipeline', 'ultimos')
+
+
+def test_new_book_evicts_consolidated_datasets_but_keeps_disk_caches(raw_tree, tmp_path):
+    books, cache_domains, latest = raw_tree
+    pipeline_book = books['pipeline'][0]
+    store = DatasetStore()
+    store.acquire('pipeline', 'ultimos', frame, sources=[pipeline_book])
+    store.acquire('recaudo', 'enero', frame, sources=[books['recaudo'][0]])
+    sync_raw_files(store)
+
+    new_book = tmp_path / 'pipeline' / 'Pipeline_Julio_2025.xlsx'
+    new_book.write_bytes(b'v1')
+    books['pipeline'].append(new_book)
+    changes = sync_raw_files(store)
+
+    assert changes == [('pipeline', str(new_book), 'nuevo')]
+    assert latest.exists()
+    assert (cache_domains['pipeline'][1] / f'{pipeline_book.stem}.parquet').exists()
+    assert not store.contains('pipeline', 'ultimos')
+    assert store.contains('recaudo', 'enero')
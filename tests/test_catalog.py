@@ -0,0 +1,39 @@
+from datetime import date
+
+import pandas as pd
+
+import data_loader
+from catalog import apply_filters, date_range_filters
+from data_loader import read_parquet_cache, write_parquet_cache
+
+
+def recaudo_frame(rows=2000):
+    return pd.DataFrame({
+        'FECHA_RECAUDO': pd.Timestamp('2025-07-01') + pd.to_timedelta([i % 31 for i in range(rows)], unit='D'),
+        'ZONA': [['NORTE', 'SUR', 'CENTRO'][i % 3] for i in range(rows)],
+        'VALOR': range(rows),
+    })
+
+
+def test_pushdown_matches_in_memory_filter(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_loader, 'PARQUET_ROW_GROUP_SIZE', 100)
+    df = recaudo_frame()
+    path = tmp_path / 'recaudo.parquet'
+    write_parquet_cache(df, path, sort_columns=['FECHA_RECAUDO', 'ZONA'])
+
+    filters = [('ZONA', 'in', ['SUR', 'CENTRO'])] + date_range_filters(
+        'FECHA_RECAUDO', date(2025, 7, 10), date(2025, 7, 12)
+    )
+    pushed = read_parquet_cache(path, columns=['VALOR', 'ZONA', 'NO_EXISTE'], filters=filters)
+    expected = apply_filters(df, filters)[['VALOR', 'ZONA']].reset_index(drop=True)
+
+    # Mismas filas y en el orden del Excel, aunque el archivo esté ordenado por fecha
+    pd.testing.assert_frame_equal(pushed, expected)
+
+
+def test_sorted_cache_reads_back_in_original_order(tmp_path):
+    df = recaudo_frame(50).sample(frac=1, random_state=0).reset_index(drop=True)
+    path = tmp_path / 'recaudo.parquet'
+    write_parquet_cache(df, path, sort_columns=['FECHA_RECAUDO'])
+
+    pd.testing.assert_frame_equal(read_parquet_cache(path), df)
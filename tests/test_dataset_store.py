@@ -0,0 +1,77 @@
+import pandas as pd
+
+import dataset_store
+from dataset_store import DatasetStore, estimate_nbytes
+
+
+def frame(rows=100):
+    return pd.DataFrame({'VALOR': range(rows)})
+
+
+def load(value):
+    return lambda: value
+
+
+def test_least_recently_used_entry_is_evicted_over_budget():
+    size = estimate_nbytes(frame())
+    store = DatasetStore(max_bytes=2 * size, domain_max_bytes={})
+    store.acquire('recaudo', 'enero', load(frame()))
+    store.acquire('recaudo', 'febrero', load(frame()))
+    store.acquire('recaudo', 'enero', load(frame()))  # enero pasa a ser el más reciente
+    store.acquire('recaudo', 'marzo', load(frame()))
+
+    assert store.contains('recaudo', 'enero')
+    assert not store.contains('recaudo', 'febrero')
+    assert store.contains('recaudo', 'marzo')
+    assert store.total_bytes() <= store.max_bytes
+    assert store.stats()['recaudo']['evictions'] == 1
+
+
+def test_domain_budget_only_evicts_its_own_domain():
+    size = estimate_nbytes(frame())
+    store = DatasetStore(max_bytes=10 * size, domain_max_bytes={'pipeline': size})
+    store.acquire('cartera', 'enero', load(frame()))
+    store.acquire('pipeline', 'enero', load(frame()))
+    store.acquire('pipeline', 'febrero', load(frame()))
+
+    assert store.contains('cartera', 'enero')
+    assert not store.contains('pipeline', 'enero')
+    assert store.contains('pipeline', 'febrero')
+
+
+def test_held_entries_are_not_evicted_until_released(monkeypatch):
+    monkeypatch.setattr(dataset_store, '_current_session_id', lambda: 'sesion-a')
+    size = estimate_nbytes(frame())
+    store = DatasetStore(max_bytes=size, domain_max_bytes={})
+    store.acquire('recaudo', 'enero', load(frame()), slot='mes')
+    store.acquire('cartera', 'enero', load(frame()), slot='mes_cartera')
+
+    # Ambas están referenciadas: el consumo supera el presupuesto sin expulsar
+    assert store.contains('recaudo', 'enero') and store.contains('cartera', 'enero')
+
+    # Cambiar de mes en la misma ranura suelta enero, que ya se puede expulsar
+    store.acquire('recaudo', 'febrero', load(frame()), slot='mes')
+    assert not store.contains('recaudo', 'enero')
+    assert store.contains('cartera', 'enero')
+
+
+def test_expired_entries_are_reloaded(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(dataset_store.time, 'time', lambda: now[0])
+    store = DatasetStore(ttl=60)
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return frame()
+
+    store.acquire('recaudo', 'enero', loader)
+    now[0] += 59
+    store.acquire('recaudo', 'enero', loader)
+    assert len(calls) == 1
+
+    now[0] += 2
+    store.acquire('recaudo', 'enero', loader)
+    assert len(calls) == 2
+    assert store.stats()['recaudo']['expirations'] == 1
+    assert store.contains('recaudo', 'enero')
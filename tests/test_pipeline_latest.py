@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+from data_loader import (
+    count_pipeline_states,
+    merge_state_counts,
+    pipeline_file_rank,
+    process_fiable_pipeline_data,
+    upsert_latest_records,
+)
+
+
+def pipeline_file(año, mes, consecutivos, estados, fechas):
+    raw = pd.DataFrame({
+        'consecutivo': consecutivos,
+        'identificacion': pd.Series(consecutivos) * 10,
+        'estado': estados,
+        'fecha': pd.to_datetime(fechas),
+        'fechanalisis': pd.to_datetime(fechas),
+        'asesor': 'ANA',
+        'estacion': 'NORTE',
+        'producto': 'LIBRE',
+    })
+    df = process_fiable_pipeline_data(raw)
+    df['RANGO_ARCHIVO'] = pipeline_file_rank(año, mes)
+    return df
+
+
+def sorted_counts(counts):
+    keys = [col for col in counts.columns if col != 'REGISTROS']
+    counts = counts[counts['REGISTROS'] != 0]
+    return counts.astype({'MES_PERIODO': str}).sort_values(keys).reset_index(drop=True)
+
+
+def test_float_and_int_keys_deduplicate_across_files():
+    # Una celda vacía hace que el libro mensual lea CONSECUTIVO como float (1.0, 3.0)
+    anual = pipeline_file(2025, None, [1, 2, 3], ['Creado'] * 3, ['2025-01-10'] * 3)
+    mensual = pipeline_file(
+        2025, 7, [1.0, np.nan, 3.0], ['Legalizado', 'Creado', 'Negado'], ['2025-07-05'] * 3
+    )
+    assert mensual['CONSECUTIVO'].tolist()[0] == '1'
+
+    latest, _, _ = upsert_latest_records(None, anual)
+    latest, _, removed = upsert_latest_records(latest, mensual)
+
+    estados = latest.set_index('CONSECUTIVO')['ESTADO_NORMALIZADO']
+    assert estados.loc['1'] == 'LEGALIZADO'
+    assert estados.loc['3'] == 'NEGADO'
+    assert latest['CONSECUTIVO'].value_counts().loc[['1', '2', '3']].tolist() == [1, 1, 1]
+    assert len(removed) == 2
+
+
+def test_incremental_counts_match_full_recount():
+    files = [
+        pipeline_file(2025, None, [1, 2, 3, 4], ['Creado'] * 4, ['2025-02-01'] * 4),
+        pipeline_file(2025, 6, [2, 3, 5], ['Aprobado', 'Negado', 'Creado'], ['2025-06-01'] * 3),
+        pipeline_file(2025, 7, [3.0, 5.0, np.nan], ['Desistido', 'Legalizado', 'Creado'], ['2025-07-01'] * 3),
+    ]
+
+    latest = None
+    counts = count_pipeline_states(None)
+    for rows in files:
+        latest, inserted, removed = upsert_latest_records(latest, rows)
+        removed_counts = count_pipeline_states(removed)
+        removed_counts['REGISTROS'] = -removed_counts['REGISTROS']
+        counts = merge_state_counts([counts, count_pipeline_states(inserted), removed_counts])
+
+    pd.testing.assert_frame_equal(sorted_counts(counts), sorted_counts(count_pipeline_states(latest)))
+    assert int(counts['REGISTROS'].sum()) == len(latest) == 6
@@ -0,0 +1,55 @@
+import pandas as pd
+
+from pipeline_lifecycle import credit_sequences, transition_table
+
+
+def history_rows(rows):
+    history = pd.DataFrame(rows, columns=['CONSECUTIVO', 'IDENTIFICACION', 'ESTADO_NORMALIZADO', 'FECHA_ANALISIS', 'RANGO_ARCHIVO'])
+    history['FECHA_ANALISIS'] = pd.to_datetime(history['FECHA_ANALISIS'])
+    return history
+
+
+def test_repeated_states_collapse_to_first_observation():
+    history = history_rows([
+        # Filas desordenadas a propósito: la secuencia se arma por crédito y archivo
+        ('2', '20', 'APROBADO', '2025-03-01', 2),
+        ('1', '10', 'CREADO', '2025-01-01', 0),
+        ('1', '10', 'CREADO', '2025-02-01', 1),
+        ('2', '20', 'CREADO', '2025-01-15', 0),
+        ('1', '10', 'LEGALIZADO', '2025-03-01', 2),
+        ('', '30', 'CREADO', '2025-01-01', 0),
+    ])
+    seq = credit_sequences(history)
+
+    assert seq[['CONSECUTIVO', 'ESTADO_NORMALIZADO']].values.tolist() == [
+        ['1', 'CREADO'], ['1', 'LEGALIZADO'], ['2', 'CREADO'], ['2', 'APROBADO'],
+    ]
+    # La primera observación de CREADO es la que se conserva
+    assert seq.loc[0, 'FECHA_ANALISIS'] == pd.Timestamp('2025-01-01')
+    assert seq['CREDITO'].tolist() == [0, 0, 1, 1]
+
+
+def test_same_state_in_different_credits_is_not_collapsed():
+    history = history_rows([
+        ('1', '10', 'CREADO', '2025-01-01', 0),
+        ('2', '20', 'CREADO', '2025-01-01', 0),
+    ])
+    assert len(credit_sequences(history)) == 2
+
+
+def test_transitions_do_not_cross_credits():
+    history = history_rows([
+        ('1', '10', 'CREADO', '2025-01-01', 0),
+        ('1', '10', 'LEGALIZADO', '2025-01-11', 1),
+        ('2', '20', 'CREADO', '2025-01-01', 0),
+        ('2', '20', 'LEGALIZADO', '2025-01-21', 1),
+        ('3', '30', 'RECHAZADO', '2025-01-01', 0),
+    ])
+    transitions = transition_table(credit_sequences(history))
+
+    assert transitions[['Desde', 'Hacia', 'Cantidad']].values.tolist() == [['CREADO', 'LEGALIZADO', 2]]
+    assert transitions['Mediana_dias'].tolist() == [15.0]
+
+
+def test_history_without_consecutivo_has_no_sequences():
+    assert credit_sequences(pd.DataFrame({'ESTADO_NORMALIZADO': ['CREADO']})) is None
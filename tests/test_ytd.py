@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ytd import YTDEngine, ytd_comparison
+
+
+@pytest.fixture
+def aggregates():
+    rng = np.random.default_rng(7)
+    rows = 400
+    detail = pd.DataFrame({
+        'ANIO': rng.integers(2023, 2026, rows),
+        'MES': rng.integers(1, 13, rows),
+        'CENTRO': rng.choice(['NORTE', 'SUR', 'CENTRO'], rows),
+        'VENDEDOR': rng.choice(['ANA', 'LUIS'], rows),
+        'UNIDADES': rng.integers(1, 5, rows),
+        'TOTALFAC': rng.uniform(1e5, 1e7, rows).round(2),
+    })
+    return detail.groupby(['ANIO', 'MES', 'CENTRO', 'VENDEDOR'], as_index=False)[['UNIDADES', 'TOTALFAC']].sum()
+
+
+def expected(aggregates, first, last, filters=None):
+    """Suma con un filtro booleano plano, como hacían las páginas."""
+    index = aggregates['ANIO'] * 12 + aggregates['MES'] - 1
+    mask = (index >= first[0] * 12 + first[1] - 1) & (index <= last[0] * 12 + last[1] - 1)
+    for col, values in (filters or {}).items():
+        if values:
+            mask &= aggregates[col].isin(values)
+    return aggregates.loc[mask, ['UNIDADES', 'TOTALFAC']].sum().to_dict()
+
+
+def assert_measures(actual, wanted):
+    assert actual['UNIDADES'] == pytest.approx(wanted['UNIDADES'])
+    assert actual['TOTALFAC'] == pytest.approx(wanted['TOTALFAC'])
+
+
+@pytest.mark.parametrize('filters', [None, {'CENTRO': ['SUR']}, {'CENTRO': ['NORTE', 'SUR'], 'VENDEDOR': ['ANA']}, {'CENTRO': []}])
+def test_windows_match_groupby(aggregates, filters):
+    engine = YTDEngine(aggregates, 'ANIO', 'MES', ['UNIDADES', 'TOTALFAC'], ['CENTRO', 'VENDEDOR'])
+    for year in (2023, 2024, 2025):
+        for month in (1, 3, 7, 12):
+            assert_measures(engine.month(year, month, filters), expected(aggregates, (year, month), (year, month), filters))
+            assert_measures(engine.ytd(year, month, filters), expected(aggregates, (year, 1), (year, month), filters))
+            quarter_start = (month - 1) // 3 * 3 + 1
+            assert_measures(engine.qtd(year, month, filters), expected(aggregates, (year, quarter_start), (year, month), filters))
+            start = (year - 1, month + 1) if month < 12 else (year, 1)
+            assert_measures(engine.rolling_12(year, month, filters), expected(aggregates, start, (year, month), filters))
+
+
+def test_periods_outside_data_are_zero(aggregates):
+    engine = YTDEngine(aggregates, 'ANIO', 'MES', ['UNIDADES', 'TOTALFAC'], ['CENTRO'])
+    current, previous = ytd_comparison(engine, 2023, 6)
+    assert previous == {'UNIDADES': 0.0, 'TOTALFAC': 0.0}
+    assert_measures(current, expected(aggregates, (2023, 1), (2023, 6)))
+    assert engine.ytd(2030, 12, {'CENTRO': ['NO EXISTE']}) == {'UNIDADES': 0.0, 'TOTALFAC': 0.0}
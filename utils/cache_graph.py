@@ -0,0 +1,183 @@
+"""
+Grafo de invalidación de los cachés.
+
+Cada libro Excel alimenta una cadena de cachés:
+
+    libro raw -> Feather/Parquet por archivo -> consolidados (pipeline_latest,
+    conteos por estado) -> agregados y resúmenes (resumen FIABLE, cubos YTD)
+    -> datasets en el almacén en memoria
+
+Al reemplazar o eliminar un libro solo se borran sus dependientes: sus cachés
+por archivo, los consolidados y resúmenes en disco que lo incluyen y las
+entradas del almacén construidas a partir de él (DatasetStore registra los
+archivos fuente de cada entrada). Los demás libros conservan sus cachés.
+
+`sync_raw_files` se ejecuta en cada rerun desde app.py: compara tamaño y mtime
+de los libros con la revisión anterior del proceso y aplica la invalidación a
+los que cambiaron (y descarta el catálogo de archivos de data_loader, que solo
+vigila el mtime de los directorios y no ve un libro reescrito en su lugar). Un libro nuevo no borra nada en disco (pipeline_latest lo
+incorpora de forma incremental), pero sí expulsa los datasets en memoria que
+consolidan todos los libros de su dominio.
+"""
+import shutil
+import threading
+from pathlib import Path
+
+from data_loader import (
+    CACHE_DOMAINS,
+    PIPELINE_COUNTS_PATH,
+    PIPELINE_LATEST_PATH,
+    clear_all_cache_dirs,
+    detect_cartera_files,
+    detect_colocacion_fiable_files,
+    detect_fiable_pipeline_files,
+    detect_recaudo_files,
+    index_cartera_fiable_files,
+    reset_file_catalog,
+)
+from fiable_summary import summaries_for_source
+
+# Libros raw de cada dominio (las mismas reglas de detección que usan las páginas)
+RAW_FILE_LISTERS = {
+    'cartera': lambda: [file_path for _, _, _, file_path in detect_cartera_files()],
+    'recaudo': lambda: [file_path for _, _, _, file_path in detect_recaudo_files()],
+    'pipeline': lambda: [file_path for _, _, _, file_path in detect_fiable_pipeline_files()],
+    'colocacion': detect_colocacion_fiable_files,
+    'cartera_fiable': lambda: [
+        file_path for files in index_cartera_fiable_files().values() for file_path in files.values()
+    ],
+}
+
+# Dominios del almacén en memoria (DatasetStore) construidos desde cada dominio en disco
+MEMORY_DOMAINS = {
+    'cartera': ['cartera'],
+    'recaudo': ['recaudo'],
+    'pipeline': ['pipeline', 'pipeline_counts', 'pipeline_ytd', 'pipeline_lifecycle'],
+    'colocacion': ['colocacion', 'colocacion_agg', 'colocacion_ytd'],
+    'cartera_fiable': ['cartera_fiable_resumen'],
+}
+
+# Consolidados en disco que dependen de todos los libros del dominio
+DOMAIN_DERIVED_FILES = {
+    'pipeline': [PIPELINE_LATEST_PATH, PIPELINE_COUNTS_PATH],
+}
+
+# Dominios cuyos datasets en memoria combinan todos sus libros: un libro nuevo los reemplaza
+CONSOLIDATED_DOMAINS = {'pipeline', 'colocacion'}
+
+
+def file_cache_paths(domain, raw_file):
+    """Cachés por archivo (Feather y Parquet) de un libro."""
+    _, cache_dir = CACHE_DOMAINS[domain]
+    stem = Path(raw_file).stem
+    return [cache_dir / f"{stem}.feather", cache_dir / f"{stem}.parquet"]
+
+
+def dependents(domain, raw_file):
+    """Archivos en disco que dependen del libro: sus cachés, consolidados y resúmenes."""
+    paths = file_cache_paths(domain, raw_file) + DOMAIN_DERIVED_FILES.get(domain, [])
+    if domain == 'cartera_fiable':
+        paths += summaries_for_source(raw_file)
+    return [path for path in paths if path.exists()]
+
+
+def _remove_paths(paths):
+    removed, errors = [], []
+    for path in paths:
+        try:
+            if path.is_dir():
+                shutil.rmtree(path)
+            else:
+                path.unlink()
+            removed.append(str(path))
+        except FileNotFoundError:
+            continue
+        except Exception as exc:
+            errors.append((str(path), str(exc)))
+    return removed, errors
+
+
+def invalidate_raw(domain, raw_file, store=None):
+    """
+    Invalida todo lo que depende de un libro, en disco y en memoria.
+    Retorna (eliminados, errores, expulsados) donde expulsados son (dominio, clave) del almacén.
+    """
+    removed, errors = _remove_paths(dependents(domain, raw_file))
+    evicted = store.invalidate_sources([raw_file], MEMORY_DOMAINS[domain]) if store is not None else []
+    return removed, errors, evicted
+
+
+def invalidate_domain(domain, store=None):
+    """Borra todo el caché en disco de un dominio y sus datasets en memoria. Retorna (eliminados, errores, expulsados)."""
+    _, cache_dir = CACHE_DOMAINS[domain]
+    removed, errors = _remove_paths(list(cache_dir.iterdir()) if cache_dir.exists() else [])
+    evicted = []
+    if store is not None:
+        for memory_domain in MEMORY_DOMAINS[domain]:
+            evicted += [entry[:2] for entry in store.entries() if entry[0] == memory_domain]
+            store.invalidate(memory_domain)
+    return removed, errors, evicted
+
+
+def invalidate_all(store=None):
+    """
+    Borra todos los cachés en disco y vacía los cachés en memoria (almacén de
+    datasets y st.cache_data), para que disco y memoria no queden desalineados.
+    Retorna (eliminados, errores).
+    """
+    removed, errors = clear_all_cache_dirs()
+    if store is not None:
+        store.clear()
+    import streamlit as st
+    st.cache_data.clear()
+    return removed, errors
+
+
+def raw_file_signatures():
+    """{(dominio, ruta): (tamaño, mtime_ns)} de todos los libros detectados."""
+    signatures = {}
+    for domain, lister in RAW_FILE_LISTERS.items():
+        for path in lister():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            signatures[(domain, str(path))] = (stat.st_size, stat.st_mtime_ns)
+    return signatures
+
+
+_seen = None
+_seen_lock = threading.Lock()
+
+
+def sync_raw_files(store=None):
+    """
+    Invalida los dependientes de los libros modificados o eliminados desde la
+    revisión anterior. La primera llamada del proceso solo registra el estado
+    (los cachés en disco ya se validan por mtime y versión de esquema).
+    Retorna [(dominio, ruta, 'modificado' | 'eliminado' | 'nuevo')].
+    """
+    global _seen
+    with _seen_lock:
+        current = raw_file_signatures()
+        previous, _seen = _seen, current
+        if previous is None:
+            return []
+
+        changes = []
+        for (domain, path), signature in previous.items():
+            if (domain, path) not in current:
+                changes.append((domain, path, 'eliminado'))
+            elif current[(domain, path)] != signature:
+                changes.append((domain, path, 'modificado'))
+        changes += [(domain, path, 'nuevo') for domain, path in sorted(current.keys() - previous.keys())]
+        if changes:
+            reset_file_catalog()
+
+        for domain, path, change in changes:
+            if change != 'nuevo':
+                invalidate_raw(domain, Path(path), store)
+            elif domain in CONSOLIDATED_DOMAINS and store is not None:
+                previous_files = [known for known_domain, known in previous if known_domain == domain]
+                store.invalidate_sources(previous_files, MEMORY_DOMAINS[domain])
+        return changes
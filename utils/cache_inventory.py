@@ -0,0 +1,80 @@
+"""
+Inventario de los cachés del dashboard.
+
+Lista cada archivo de `data/**/cache/` con su dominio, nivel (Feather, Parquet,
+resumen JSON), libro de origen, tamaño, antigüedad y vigencia, y las entradas
+del almacén en memoria. La invalidación selectiva está en cache_graph.py.
+"""
+import time
+from pathlib import Path
+
+from data_loader import CACHE_DOMAINS, is_cache_valid
+
+# Nivel de un archivo de caché según su extensión
+CACHE_TIERS = {
+    '.feather': 'feather',
+    '.parquet': 'parquet',
+    '.json': 'resumen',
+}
+RAW_SUFFIXES = ('.xlsx', '.xls')
+
+
+def find_source(domain, stem):
+    """Libro Excel de un dominio con el nombre base `stem` (en raw/ o en la raíz), o None."""
+    raw_dir, _ = CACHE_DOMAINS[domain]
+    for directory in (raw_dir, Path(".")):
+        for suffix in RAW_SUFFIXES:
+            candidate = directory / f"{stem}{suffix}"
+            if candidate.exists():
+                return candidate
+    return None
+
+
+def disk_cache_entries(now=None):
+    """
+    Archivos de caché en disco, uno por dict:
+    dominio, archivo, ruta, nivel, fuente (Path o None si es derivado), bytes, edad_s, vigente.
+    `vigente` es None cuando no aplica la comparación con un libro de origen.
+    """
+    now = now or time.time()
+    entries = []
+    for domain, (_, cache_dir) in CACHE_DOMAINS.items():
+        if not cache_dir.exists():
+            continue
+        for path in sorted(cache_dir.rglob("*")):
+            if not path.is_file():
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            tier = CACHE_TIERS.get(path.suffix, 'otro')
+            source = find_source(domain, path.stem) if tier in ('feather', 'parquet') else None
+            entries.append({
+                'dominio': domain,
+                'archivo': str(path.relative_to(cache_dir)),
+                'ruta': path,
+                'nivel': tier,
+                'fuente': source,
+                'bytes': stat.st_size,
+                'edad_s': now - stat.st_mtime,
+                'vigente': is_cache_valid(source, path) if source is not None else None,
+            })
+    return entries
+
+
+def memory_cache_entries(store, now=None):
+    """Entradas residentes del almacén en memoria: dominio, clave, bytes, sesiones, edad_s, inactiva_s, fuentes."""
+    now = now or time.time()
+    return [
+        {
+            'dominio': domain,
+            'clave': key,
+            'bytes': nbytes,
+            'sesiones': holders,
+            'edad_s': now - loaded_at,
+            'inactiva_s': now - last_access,
+            'fuentes': sorted(sources),
+        }
+        for domain, key, nbytes, holders, loaded_at, last_access, sources in store.entries()
+    ]
@@ -0,0 +1,66 @@
+"""
+Métricas del caché en disco de la capa de carga.
+
+`load_excel_with_cache` registra aquí cada carga con el nivel del que salió
+(Feather, Parquet o Excel en frío) y su duración. Un acierto es una carga
+servida desde Feather o Parquet; un fallo es un parseo del Excel. Los
+contadores son del proceso (compartidos por todas las sesiones) y viven hasta
+que se reinicia el servidor o se llama a `reset()`.
+
+Las métricas del almacén en memoria están en `DatasetStore.stats()`.
+"""
+import threading
+import time
+
+# Niveles desde los que puede servirse una carga, del más rápido al más lento
+LOAD_TIERS = ('feather', 'parquet', 'excel')
+HIT_TIERS = ('feather', 'parquet')
+
+_lock = threading.Lock()
+_loads = {}  # (dominio, nivel) -> [cargas, segundos, filas]
+_started = time.time()
+
+
+def record_load(domain, tier, seconds, rows=None):
+    """Registra una carga de `domain` servida desde `tier` ('feather', 'parquet' o 'excel')."""
+    with _lock:
+        values = _loads.setdefault((domain, tier), [0, 0.0, 0])
+        values[0] += 1
+        values[1] += seconds
+        values[2] += rows or 0
+
+
+def snapshot():
+    """
+    Métricas por dominio:
+        {dominio: {'hits', 'misses', 'hit_rate',
+                   'tiers': {nivel: {'loads', 'seconds', 'mean_seconds', 'rows'}}}}
+    """
+    with _lock:
+        loads = {key: list(values) for key, values in _loads.items()}
+    result = {}
+    for (domain, tier), (count, seconds, rows) in sorted(loads.items()):
+        domain_result = result.setdefault(domain, {'hits': 0, 'misses': 0, 'tiers': {}})
+        domain_result['tiers'][tier] = {
+            'loads': count,
+            'seconds': seconds,
+            'mean_seconds': seconds / count if count else None,
+            'rows': rows,
+        }
+        domain_result['hits' if tier in HIT_TIERS else 'misses'] += count
+    for domain_result in result.values():
+        total = domain_result['hits'] + domain_result['misses']
+        domain_result['hit_rate'] = domain_result['hits'] / total if total else None
+    return result
+
+
+def started_at():
+    """Momento (epoch) desde el que se acumulan las métricas."""
+    return _started
+
+
+def reset():
+    global _started
+    with _lock:
+        _loads.clear()
+        _started = time.time()
@@ -0,0 +1,413 @@
+"""
+Catálogo de datasets con la misma interfaz para los cinco dominios.
+
+    catalog = get_catalog('recaudo')
+    catalog.list_periods()                  # [(2025, 10), (2025, 9), ...] del más reciente al más antiguo
+    catalog.load((2025, 10), columns=['ZONA', 'VALOR'], filters=[('ZONA', 'in', ['NORTE'])])
+    catalog.load_range((2025, 1), (2025, 10))
+    get_catalog('pipeline').load_latest(filters=[('ASESOR', 'in', ['ANA'])])
+
+Un periodo es (año, mes); los libros anuales (pipeline, colocación) usan
+(año, None) y los que no traen año en el nombre quedan en el periodo None.
+`load_range` incluye un libro anual si su año se cruza con el rango y, si el
+dominio tiene columnas de año y mes, recorta sus filas al rango.
+
+Detrás del catálogo: la detección de libros (catálogo de archivos de
+data_loader), el caché en disco por libro (Feather/Parquet), la proyección de
+columnas, los filtros y la carga en paralelo de varios libros. Los filtros son
+una lista de (columna, operador, valor) que se cumplen todos, con los operadores
+'==', '!=', '<', '<=', '>', '>=', 'in' y 'not in' (la forma de pyarrow).
+
+Poda, de lo más grueso a lo más fino:
+- libros: cada libro es una partición por año/mes; `load` y `load_range` solo
+  abren los del periodo o rango pedido
+- row groups: con columnas o filtros se lee el caché Parquet con
+  pyarrow.dataset; el Parquet se guarda ordenado por fecha y dimensiones
+  (CACHE_SORT_COLUMNS) y los row groups cuyas estadísticas min/max no cumplen
+  los filtros no se decodifican. En los libros anuales el rango de años de
+  `load_range` también se empuja a la lectura
+- columnas: solo se decodifican las de `columns` (las que el libro no tenga se omiten)
+Sin columnas ni filtros se usa la ruta habitual (Feather mapeado en memoria).
+
+Las filas de cada libro llevan además las columnas de `annotate` (p. ej.
+ARCHIVO_ORIGEN); los filtros solo se evalúan sobre las columnas del libro.
+pipeline tiene también `load_latest`: el último registro de cada crédito en
+todos los libros (pipeline_latest.parquet, guardado ordenado igual que los
+cachés por libro), con la misma proyección y filtros.
+
+cartera_fiable tiene tres libros por periodo (colocada, financiero,
+proyectadas): `load` y `load_range` retornan {tipo: DataFrame} en lugar de un
+DataFrame. El almacén en memoria compartido (DatasetStore) sigue en las páginas,
+que deciden la clave y la vida de cada dataset.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+
+import pandas as pd
+
+from cache_metrics import record_load
+from data_loader import (
+    CARTERA_CACHE_DIR,
+    CARTERA_FIABLE_CACHE_DIR,
+    CARTERA_FIABLE_TYPES,
+    COLOCACION_CACHE_DIR,
+    PIPELINE_CACHE_DIR,
+    PIPELINE_LATEST_PATH,
+    RECAUDO_CACHE_DIR,
+    _pipeline_period,
+    detect_cartera_files,
+    detect_colocacion_fiable_files,
+    detect_fiable_pipeline_files,
+    detect_recaudo_files,
+    get_cache_path,
+    index_cartera_fiable_files,
+    is_cache_valid,
+    load_all_fiable_pipeline,
+    load_excel_with_cache,
+    normalize_filters,
+    pipeline_file_rank,
+    pipeline_latest_is_current,
+    process_cartera_data,
+    process_colocacion_fiable_data,
+    process_fiable_pipeline_data,
+    process_recaudo_data,
+    read_parquet_cache,
+    sorted_fiable_periods,
+)
+from instrumentation import instrumented
+
+# Libros que se cargan a la vez en load_range
+MAX_WORKERS = 4
+
+_OPERATORS = {
+    '==': lambda series, value: series == value,
+    '=': lambda series, value: series == value,
+    '!=': lambda series, value: series != value,
+    '<': lambda series, value: series < value,
+    '<=': lambda series, value: series <= value,
+    '>': lambda series, value: series > value,
+    '>=': lambda series, value: series >= value,
+    'in': lambda series, value: series.isin(list(value)),
+    'not in': lambda series, value: ~series.isin(list(value)),
+}
+
+
+def apply_filters(df, filters):
+    """Filas de `df` que cumplen todos los filtros [(columna, operador, valor)]."""
+    if df is None or not filters:
+        return df
+    mask = pd.Series(True, index=df.index)
+    for column, op, value in normalize_filters(filters):
+        if op not in _OPERATORS:
+            raise ValueError(f"Operador de filtro no soportado: {op}")
+        mask &= _OPERATORS[op](df[column], value).fillna(False).astype(bool)
+    return df[mask]
+
+
+def _project(df, columns):
+    """Columnas de `columns` presentes en `df`, en ese orden (las que falten se omiten)."""
+    if df is None or columns is None:
+        return df
+    return df[[col for col in columns if col in df.columns]]
+
+
+def date_range_filters(column, start, end):
+    """Filtros de un rango de fechas inclusive (como los de st.date_input) sobre una columna datetime."""
+    return [(column, '>=', start), (column, '<', end + timedelta(days=1))]
+
+
+def filters_key(filters):
+    """Forma hashable de una lista de filtros, para usarla en la clave del almacén."""
+    return tuple(
+        (column, op, tuple(value) if isinstance(value, (list, set)) else value)
+        for column, op, value in filters or []
+    )
+
+
+def period_key(period):
+    """Orden de un periodo: (año, mes) con los anuales antes de enero y None al final."""
+    if period is None:
+        return (0, 0)
+    año, mes = period
+    return (año, mes or 0)
+
+
+def _in_range(period, start, end):
+    """Si el libro del periodo puede tener filas en [start, end] (límites None = abiertos)."""
+    if period is None:
+        return start is None and end is None
+    año, mes = period
+    first, last = (año, mes or 1), (año, mes or 12)
+    return (start is None or last >= tuple(start)) and (end is None or first <= tuple(end))
+
+
+def _run_parallel(func, items):
+    """Aplica `func` a cada item en hilos que heredan el contexto de la sesión de Streamlit."""
+    if len(items) <= 1:
+        return [func(item) for item in items]
+    from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+    ctx = get_script_run_ctx(suppress_warning=True)
+
+    def _call(item):
+        if ctx is not None:
+            add_script_run_ctx(ctx=ctx)
+        return func(item)
+
+    with ThreadPoolExecutor(max_workers=min(len(items), MAX_WORKERS), thread_name_prefix="catalogo") as executor:
+        return list(executor.map(_call, items))
+
+
+class Catalog:
+    """
+    Periodos y carga de un dominio.
+
+    Args:
+        domain: nombre del dominio (el de CACHE_DOMAINS)
+        list_files: función que retorna [(periodo, tipo, Path)]; tipo es None salvo en
+            dominios con varios libros por periodo
+        cache_dir: carpeta del caché en disco del dominio
+        processing: {tipo: función process_*}
+        read_kwargs: argumentos de pd.read_excel para los libros del dominio
+        period_columns: (columna año, columna mes) de las filas, para recortar load_range
+        annotate: función Path -> {columna: valor} con columnas constantes por libro
+            (archivo de origen, rango del archivo) que se agregan a sus filas
+        latest: (ruta, está_al_día, cargar) de una tabla consolidada con el último registro
+            de cada llave en todos los libros, para `load_latest`; `cargar` la actualiza
+    """
+
+    def __init__(self, domain, list_files, cache_dir, processing, read_kwargs=None, period_columns=None,
+                 annotate=None, latest=None):
+        self.domain = domain
+        self._list_files = list_files
+        self.cache_dir = cache_dir
+        self.processing = processing
+        self.read_kwargs = read_kwargs or {}
+        self.period_columns = period_columns
+        self.annotate = annotate
+        self.latest = latest
+
+    @property
+    def multipart(self):
+        """Si el dominio tiene varios tipos de libro por periodo (cartera_fiable)."""
+        return list(self.processing) != [None]
+
+    def list_periods(self):
+        """Periodos disponibles, del más reciente al más antiguo."""
+        periods = {period for period, _, _ in self._list_files()}
+        return sorted(periods, key=period_key, reverse=True)
+
+    def latest_period(self):
+        """Periodo más reciente o None si no hay libros."""
+        periods = self.list_periods()
+        return periods[0] if periods else None
+
+    def files(self, period):
+        """[(tipo, Path)] de un periodo."""
+        return [(part, path) for file_period, part, path in self._list_files() if file_period == period]
+
+    def sources(self, period=None, start=None, end=None):
+        """Libros de un periodo o, sin periodo, de un rango (para firmas e invalidación)."""
+        if period is not None:
+            return [path for _, path in self.files(period)]
+        return [path for file_period, _, path in self._list_files() if _in_range(file_period, start, end)]
+
+    def _load_file(self, part, path, columns=None, filters=None):
+        """
+        Un libro con proyección y filtros. Con el caché Parquet vigente solo se decodifican
+        las columnas pedidas y los row groups cuyas estadísticas pueden cumplir los filtros;
+        si no, se carga completo (generando el caché) y se filtra en memoria.
+        """
+        if columns is not None or filters:
+            cache_path = get_cache_path(Path(path), self.cache_dir)
+            if is_cache_valid(path, cache_path):
+                start = time.perf_counter()
+                try:
+                    df = read_parquet_cache(cache_path, columns, filters)
+                except Exception:
+                    # Caché ilegible o filtro que Arrow no puede evaluar: ruta completa
+                    pass
+                else:
+                    record_load(self.domain, 'parquet', time.perf_counter() - start, len(df))
+                    return df
+        df = load_excel_with_cache(path, self.cache_dir, processing_func=self.processing[part], **self.read_kwargs)
+        return _project(apply_filters(df, filters), columns)
+
+    def _load_files(self, files, columns=None, filters=None, start=None, end=None):
+        def _load(item):
+            file_period, part, path = item
+            file_filters = list(filters or [])
+            extra = self.annotate(path) if self.annotate else {}
+            if columns is not None:
+                extra = {col: value for col, value in extra.items() if col in columns}
+            read_columns = None if columns is None else [col for col in columns if col not in extra]
+            trim = self._needs_trim(file_period, start, end)
+            if trim:
+                # Libro anual: el rango de años se empuja a la lectura; los meses se recortan después
+                year_col, month_col = self.period_columns
+                if start is not None:
+                    file_filters.append((year_col, '>=', start[0]))
+                if end is not None:
+                    file_filters.append((year_col, '<=', end[0]))
+                if read_columns is not None:
+                    read_columns = read_columns + [col for col in self.period_columns if col not in read_columns]
+            df = self._load_file(part, path, read_columns, file_filters)
+            if df is None:
+                return part, None
+            if trim:
+                df = _project(self._trim_months(df, start, end), columns)
+            if extra:
+                df = df.assign(**extra)
+            return part, df
+
+        frames = {}
+        for part, df in _run_parallel(_load, files):
+            if df is not None:
+                frames.setdefault(part, []).append(df)
+        result = {
+            part: (parts[0] if len(parts) == 1 else pd.concat(parts, ignore_index=True))
+            for part, parts in frames.items()
+        }
+        if self.multipart:
+            return {part: result.get(part) for part in self.processing}
+        return result.get(None)
+
+    @instrumented("Catalog.load", detail=lambda self, period=None, *args, **kwargs: f"{self.domain} {period}")
+    def load(self, period=None, columns=None, filters=None):
+        """
+        Dataset de un periodo (por defecto el más reciente), con solo `columns` si se
+        indican y las filas que cumplen `filters`. None si no hay libros para el periodo.
+        """
+        if period is None:
+            period = self.latest_period()
+        files = [(period, part, path) for part, path in self.files(period)]
+        if not files:
+            return {part: None for part in self.processing} if self.multipart else None
+        return self._load_files(files, columns, filters)
+
+    @instrumented("Catalog.load_range", detail=lambda self, start=None, end=None, *args, **kwargs: f"{self.domain} {start}-{end}")
+    def load_range(self, start=None, end=None, columns=None, filters=None):
+        """
+        Datasets de los periodos entre `start` y `end` (inclusive, (año, mes); None = sin
+        límite) concatenados. Los libros fuera del rango no se abren y los que se
+        cruzan se cargan en paralelo.
+        """
+        files = [item for item in self._list_files() if _in_range(item[0], start, end)]
+        if not files:
+            return {part: None for part in self.processing} if self.multipart else None
+        return self._load_files(files, columns, filters, start, end)
+
+    @instrumented("Catalog.load_latest", detail=lambda self, *args, **kwargs: self.domain)
+    def load_latest(self, columns=None, filters=None):
+        """
+        Último registro de cada llave en todos los libros (la tabla consolidada del
+        dominio), con proyección y filtros empujados a su Parquet. Si la tabla no se
+        pudo persistir se filtra en memoria. None si no hay libros.
+        """
+        if self.latest is None:
+            raise ValueError(f"El dominio {self.domain} no tiene tabla de últimos registros")
+        path, is_current, load_all = self.latest
+        if not is_current():
+            df = load_all()
+            if not is_current():
+                return _project(apply_filters(df, filters), columns)
+        start = time.perf_counter()
+        df = read_parquet_cache(path, columns, filters)
+        record_load(self.domain, 'parquet', time.perf_counter() - start, len(df))
+        return df
+
+    def _needs_trim(self, period, start, end):
+        """Si hay que recortar al rango las filas de un libro anual (por sus columnas de año y mes)."""
+        return (
+            self.period_columns is not None and period is not None and period[1] is None
+            and (start is not None or end is not None)
+        )
+
+    def _trim_months(self, df, start, end):
+        year_col, month_col = self.period_columns
+        if year_col not in df.columns or month_col not in df.columns:
+            return df
+        month_index = pd.to_numeric(df[year_col], errors='coerce') * 12 + pd.to_numeric(df[month_col], errors='coerce')
+        mask = pd.Series(True, index=df.index)
+        if start is not None:
+            mask &= month_index >= start[0] * 12 + start[1]
+        if end is not None:
+            mask &= month_index <= end[0] * 12 + end[1]
+        return df[mask.fillna(False).astype(bool)]
+
+
+def _period_files(detect):
+    """Adapta un detect_*_files ([(periodo_str, año, mes, Path)]) a [(periodo, tipo, Path)]."""
+    return lambda: [((año, mes), None, path) for _, año, mes, path in detect()]
+
+
+def _colocacion_files():
+    files = []
+    for path in detect_colocacion_fiable_files():
+        period = _pipeline_period(path)
+        files.append(((period[1], period[2]) if period else None, None, path))
+    return files
+
+
+def _pipeline_file_columns(path):
+    """Origen de cada fila del historial de pipeline (igual que en pipeline_latest)."""
+    periodo_str, año, mes = _pipeline_period(path)
+    return {'ARCHIVO_ORIGEN': path.name, 'PERIODO_ARCHIVO': periodo_str, 'RANGO_ARCHIVO': pipeline_file_rank(año, mes)}
+
+
+def _cartera_fiable_files():
+    index = index_cartera_fiable_files()
+    return [
+        (period, tipo, index[period][tipo])
+        for period in sorted_fiable_periods(index)
+        for tipo in CARTERA_FIABLE_TYPES
+        if tipo in index[period]
+    ]
+
+
+CATALOGS = {
+    'cartera': Catalog(
+        'cartera',
+        _period_files(detect_cartera_files),
+        CARTERA_CACHE_DIR,
+        # Sin deduplicación para mantener los totales del informe
+        {None: lambda df: process_cartera_data(df, deduplicate=False)},
+        read_kwargs={'header': 7},
+    ),
+    'recaudo': Catalog(
+        'recaudo',
+        _period_files(detect_recaudo_files),
+        RECAUDO_CACHE_DIR,
+        {None: process_recaudo_data},
+    ),
+    'pipeline': Catalog(
+        'pipeline',
+        _period_files(detect_fiable_pipeline_files),
+        PIPELINE_CACHE_DIR,
+        {None: process_fiable_pipeline_data},
+        period_columns=('AÑO', 'MES'),
+        annotate=_pipeline_file_columns,
+        latest=(PIPELINE_LATEST_PATH, pipeline_latest_is_current, load_all_fiable_pipeline),
+    ),
+    'colocacion': Catalog(
+        'colocacion',
+        _colocacion_files,
+        COLOCACION_CACHE_DIR,
+        {None: process_colocacion_fiable_data},
+        period_columns=('ANIO', 'MES'),
+        annotate=lambda path: {'ARCHIVO_ORIGEN': path.name},
+    ),
+    'cartera_fiable': Catalog(
+        'cartera_fiable',
+        _cartera_fiable_files,
+        CARTERA_FIABLE_CACHE_DIR,
+        {tipo: processing_func for tipo, (_, processing_func, _) in CARTERA_FIABLE_TYPES.items()},
+    ),
+}
+
+
+def get_catalog(domain):
+    """Catálogo de un dominio: 'cartera', 'recaudo', 'pipeline', 'colocacion' o 'cartera_fiable'."""
+    return CATALOGS[domain]
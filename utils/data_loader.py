@@ -1,20 +1,21 @@
 import pandas as pd
-import streamlit as st
 from pathlib import Path
-from datetime import datetime
+from datetime import date, datetime
 import os
 import re
-import locale
-import shutil
+import json
+import threading
+import time
+import tempfile
 
-# Configurar locale para español (meses en español)
-try:
-    locale.setlocale(locale.LC_TIME, 'es_ES.UTF-8')
-except:
-    try:
-        locale.setlocale(locale.LC_TIME, 'Spanish_Spain.1252')
-    except:
-        pass  # Si no se puede configurar, usar inglés
+# streamlit y pyarrow se importan dentro de las funciones que los usan: importar este
+# módulo (app.py, scripts, benchmarks) no paga su carga ni toca el sistema de archivos.
+from cache_metrics import record_load
+from instrumentation import instrumented, timed
+
+# Nombres de mes en español (sin depender de locale.setlocale, que es global al proceso)
+MESES_ES = ['Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio',
+            'Julio', 'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre']
 
 # Configuración de directorios
 DATA_DIR = Path("data")
@@ -29,35 +30,69 @@ COLOCACION_CACHE_DIR = DATA_DIR / "colocacion" / "cache"
 CARTERA_FIABLE_RAW_DIR = DATA_DIR / "cartera_fiable" / "raw"
 CARTERA_FIABLE_CACHE_DIR = DATA_DIR / "cartera_fiable" / "cache"
 
-CACHE_DIRS = [
-    CARTERA_CACHE_DIR,
-    RECAUDO_CACHE_DIR,
-    PIPELINE_CACHE_DIR,
-    COLOCACION_CACHE_DIR,
-    CARTERA_FIABLE_CACHE_DIR,
-]
-
-# Crear directorios si no existen
-for dir_path in [
-    CARTERA_RAW_DIR,
-    CARTERA_CACHE_DIR,
-    RECAUDO_RAW_DIR,
-    RECAUDO_CACHE_DIR,
-    PIPELINE_RAW_DIR,
-    PIPELINE_CACHE_DIR,
-    COLOCACION_RAW_DIR,
-    COLOCACION_CACHE_DIR,
-    CARTERA_FIABLE_RAW_DIR,
-    CARTERA_FIABLE_CACHE_DIR,
-]:
-    dir_path.mkdir(parents=True, exist_ok=True)
+# Caché caliente en Feather (Arrow IPC) además del Parquet. Desactivar con DASHBOARD_FEATHER_CACHE=0
+USE_FEATHER_CACHE = os.environ.get("DASHBOARD_FEATHER_CACHE", "1").strip().lower() not in ("0", "false", "no")
+
+# Versión de la salida de las funciones process_*: los cachés con otra versión se regeneran.
+# Subirla cada vez que cambien las columnas o sus valores (o la disposición del Parquet).
+CACHE_SCHEMA_VERSION = b'5'
+CACHE_SCHEMA_KEY = b'dashboard_schema'
+
+# Dominio de caché en disco -> (carpeta raw, carpeta de caché)
+CACHE_DOMAINS = {
+    'cartera': (CARTERA_RAW_DIR, CARTERA_CACHE_DIR),
+    'recaudo': (RECAUDO_RAW_DIR, RECAUDO_CACHE_DIR),
+    'pipeline': (PIPELINE_RAW_DIR, PIPELINE_CACHE_DIR),
+    'colocacion': (COLOCACION_RAW_DIR, COLOCACION_CACHE_DIR),
+    'cartera_fiable': (CARTERA_FIABLE_RAW_DIR, CARTERA_FIABLE_CACHE_DIR),
+}
+
+CACHE_DIRS = [cache_dir for _, cache_dir in CACHE_DOMAINS.values()]
+
+# Orden de las filas en el caché Parquet: fecha primero y luego las dimensiones que
+# filtran las páginas, para que las estadísticas min/max de cada row group descarten
+# bloques completos al leer con filtros (read_parquet_cache)
+CACHE_SORT_COLUMNS = {
+    'cartera': ['Vencimiento', 'Cuenta'],
+    'recaudo': ['FECHA_RECAUDO', 'FUENTE', 'ZONA', 'CLIENTE'],
+    'pipeline': ['FECHA', 'ESTADO_NORMALIZADO', 'ASESOR', 'ESTACION', 'PRODUCTO'],
+    'colocacion': ['FECHA_DOCUMENTO', 'CENTRO_COSTO', 'VENDEDOR', 'BODEGA'],
+}
+# Filas por row group del Parquet: la unidad mínima que se lee (o se salta) con un filtro
+PARQUET_ROW_GROUP_SIZE = 32_768
+# Posición original de cada fila; el Parquet se guarda ordenado y al leerlo se restaura
+# el orden del Excel (las deduplicaciones con keep='last' dependen de él)
+ROW_ORDER_COLUMN = '__fila'
+
+_data_dirs_ready = False
+
+
+def ensure_data_dirs():
+    """
+    Crea las carpetas raw/ y cache/ de todos los dominios la primera vez que se
+    recorre el árbol de datos (no al importar el módulo).
+    """
+    global _data_dirs_ready
+    if _data_dirs_ready:
+        return
+    for raw_dir, cache_dir in CACHE_DOMAINS.values():
+        for dir_path in (raw_dir, cache_dir):
+            try:
+                dir_path.mkdir(parents=True, exist_ok=True)
+            except OSError:
+                pass
+    _data_dirs_ready = True
 
 
 def clear_all_cache_dirs():
     """
     Elimina todos los archivos y subdirectorios dentro de las carpetas de caché.
+    Solo toca el disco: para vaciar también los cachés en memoria usar
+    cache_graph.invalidate_all.
     Retorna (items_eliminados, errores) para mostrar feedback en la UI.
     """
+    import shutil
+
     removed_items = []
     errors = []
 
@@ -76,27 +111,219 @@ def clear_all_cache_dirs():
 
     return removed_items, errors
 
+def cache_domain(cache_dir):
+    """Nombre del dominio de una carpeta de caché (el nombre de la carpeta padre si no es conocida)"""
+    cache_dir = Path(cache_dir)
+    for domain, (_, domain_cache_dir) in CACHE_DOMAINS.items():
+        if cache_dir == domain_cache_dir:
+            return domain
+    return cache_dir.parent.name
+
 def get_excel_files(directory, pattern="*.xlsx"):
     """Obtiene lista de archivos Excel en un directorio"""
+    ensure_data_dirs()
     if not directory.exists():
         return []
     return sorted(directory.glob(pattern), key=lambda x: x.stat().st_mtime, reverse=True)
 
+
+# Catálogo de archivos: el resultado de cada detect_* se guarda con el mtime de los
+# directorios que recorre y se reutiliza mientras no cambien. Agregar, borrar o
+# renombrar un libro cambia el mtime del directorio; reescribirlo en el mismo lugar
+# no (la ruta no cambia y cache_graph.sync_raw_files detecta el contenido nuevo).
+_file_catalog = {}  # nombre -> (firma de directorios, resultado)
+_file_catalog_lock = threading.Lock()
+
+
+def _directories_signature(directories):
+    signature = [os.getcwd()]
+    for directory in directories:
+        try:
+            signature.append(directory.stat().st_mtime_ns)
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def cached_file_scan(name, directories, scan):
+    """
+    Resultado de `scan()` compartido entre sesiones y reruns; se recalcula solo
+    cuando cambia el mtime de alguno de `directories` (o el directorio de trabajo).
+    El resultado es compartido: los llamadores no deben modificarlo.
+    """
+    ensure_data_dirs()
+    signature = _directories_signature(directories)
+    with _file_catalog_lock:
+        cached = _file_catalog.get(name)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+    result = scan()
+    with _file_catalog_lock:
+        _file_catalog[name] = (signature, result)
+    return result
+
+
+def reset_file_catalog():
+    """Olvida los recorridos guardados (p. ej. tras cambiar de directorio de datos)."""
+    with _file_catalog_lock:
+        _file_catalog.clear()
+
 def get_cache_path(raw_file, cache_dir):
     """Genera la ruta del archivo cacheado (Parquet)"""
     cache_dir.mkdir(parents=True, exist_ok=True)
     cache_name = raw_file.stem + ".parquet"
     return cache_dir / cache_name
 
+def get_feather_cache_path(raw_file, cache_dir):
+    """Genera la ruta del caché caliente (Arrow IPC / Feather v2 sin compresión)"""
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir / (raw_file.stem + ".feather")
+
+def with_schema_version(table):
+    """Agrega CACHE_SCHEMA_VERSION a los metadatos de una tabla Arrow antes de persistirla"""
+    metadata = dict(table.schema.metadata or {})
+    metadata[CACHE_SCHEMA_KEY] = CACHE_SCHEMA_VERSION
+    return table.replace_schema_metadata(metadata)
+
+def read_cache_metadata(cache_file):
+    """Metadatos del esquema de un caché Parquet o Feather, sin leer los datos"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    try:
+        if cache_file.suffix == '.feather':
+            with pa.memory_map(str(cache_file)) as source:
+                return pa.ipc.open_file(source).schema.metadata or {}
+        return pq.read_schema(cache_file).metadata or {}
+    except Exception:
+        return {}
+
 def is_cache_valid(raw_file, cache_file):
-    """Verifica si el caché es válido (más reciente que el archivo original)"""
+    """Verifica si el caché es válido (más reciente que el archivo original y de la versión actual)"""
     if not cache_file.exists():
         return False
-    return cache_file.stat().st_mtime >= raw_file.stat().st_mtime
+    if cache_file.stat().st_mtime < raw_file.stat().st_mtime:
+        return False
+    return read_cache_metadata(cache_file).get(CACHE_SCHEMA_KEY) == CACHE_SCHEMA_VERSION
 
+def read_feather_cache(feather_path):
+    """
+    Lee el caché Feather con memory_map=True: no hay descompresión ni decodificación,
+    y las páginas del archivo se comparten vía caché del sistema operativo entre procesos.
+    """
+    import pyarrow.feather as feather
+
+    table = feather.read_table(feather_path, memory_map=True)
+    return table.to_pandas()
+
+def write_feather_cache(df_for_cache, feather_path):
+    """
+    Escribe el caché Feather de forma atómica (archivo temporal + replace) para que
+    otro proceso que lo tenga mapeado nunca lea un archivo a medio escribir.
+    El Feather es solo una aceleración: si falla se sigue usando el Parquet.
+    """
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    tmp_path = None
+    try:
+        # Temporal único: el prefetch, los loaders en paralelo y otras sesiones pueden escribir el mismo caché
+        fd, tmp_name = tempfile.mkstemp(dir=feather_path.parent, prefix=feather_path.name + ".", suffix=".tmp")
+        os.close(fd)
+        tmp_path = Path(tmp_name)
+        table = with_schema_version(pa.Table.from_pandas(df_for_cache, preserve_index=False))
+        feather.write_feather(table, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, feather_path)
+    except Exception:
+        if tmp_path is not None:
+            tmp_path.unlink(missing_ok=True)
+
+def write_parquet_cache(df_for_cache, cache_path, sort_columns=None, metadata=None):
+    """
+    Escribe el caché Parquet (snappy) con la versión de esquema en sus metadatos.
+    Con `sort_columns` las filas se guardan ordenadas por esas columnas (las que
+    existan) en row groups de PARQUET_ROW_GROUP_SIZE filas, junto con su posición original.
+    `metadata` ({bytes: bytes}) se agrega a los metadatos del esquema.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sort_columns = [col for col in sort_columns or [] if col in df_for_cache.columns]
+    if sort_columns:
+        df_for_cache = (
+            df_for_cache
+            .assign(**{ROW_ORDER_COLUMN: pd.RangeIndex(len(df_for_cache))})
+            .sort_values(sort_columns, kind='stable', na_position='last')
+        )
+    table = with_schema_version(pa.Table.from_pandas(df_for_cache, preserve_index=False))
+    if metadata:
+        table = table.replace_schema_metadata({**table.schema.metadata, **metadata})
+    pq.write_table(table, cache_path, compression='snappy', row_group_size=PARQUET_ROW_GROUP_SIZE)
+
+
+def normalize_filters(filters):
+    """
+    Filtros [(columna, operador, valor)] con las fechas (datetime.date, como las de
+    st.date_input) convertidas a Timestamp para compararlas con columnas datetime.
+    """
+    def _value(value):
+        if isinstance(value, date) and not isinstance(value, datetime):
+            return pd.Timestamp(value)
+        return value
+
+    normalized = []
+    for column, op, value in filters or []:
+        if isinstance(value, (list, tuple, set)):
+            value = [_value(item) for item in value]
+        normalized.append((column, op, _value(value)))
+    return normalized
+
+
+def read_parquet_cache(cache_path, columns=None, filters=None):
+    """
+    Lee el caché Parquet con pyarrow.dataset. `columns` limita las columnas que se
+    decodifican (las que no existan en el caché se omiten) y `filters`
+    ([(columna, operador, valor)], todos deben cumplirse) se evalúa contra las
+    estadísticas de cada row group: solo se leen los bloques que pueden tener filas
+    que cumplan. Las filas vuelven en el orden del Excel.
+    """
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    dataset = ds.dataset(cache_path, format='parquet')
+    names = dataset.schema.names
+    read_columns = None
+    if columns is not None:
+        read_columns = [col for col in columns if col in names]
+        if ROW_ORDER_COLUMN in names:
+            read_columns.append(ROW_ORDER_COLUMN)
+    expression = pq.filters_to_expression(normalize_filters(filters)) if filters else None
+    return restore_row_order(dataset.to_table(columns=read_columns, filter=expression).to_pandas())
+
+
+def restore_row_order(df):
+    """Devuelve las filas de un Parquet ordenado (write_parquet_cache) a su orden original."""
+    if ROW_ORDER_COLUMN not in df.columns:
+        return df
+    return df.sort_values(ROW_ORDER_COLUMN, kind='stable').drop(columns=ROW_ORDER_COLUMN).reset_index(drop=True)
+
+
+def _prepare_for_cache(df):
+    """Convierte columnas object a StringDtype para que Parquet/Arrow las serialicen sin ambigüedad"""
+    df_for_cache = df.copy()
+    for col in df_for_cache.columns:
+        if df_for_cache[col].dtype == 'object':
+            # Convertir a string explícitamente, manteniendo NaN como NaN
+            # Usar convert_dtypes para preservar tipos pero asegurar que object sea string
+            df_for_cache[col] = df_for_cache[col].astype('string')  # StringDtype de pandas
+    return df_for_cache
+
+@instrumented(detail=lambda excel_path, *args, **kwargs: Path(excel_path).name)
 def load_excel_with_cache(excel_path, cache_dir, processing_func=None, **read_excel_kwargs):
     """
-    Carga un archivo Excel usando caché Parquet si está disponible y es válido.
+    Carga un archivo Excel usando caché en dos niveles:
+    - Caliente: Feather sin compresión abierto con memory_map (si USE_FEATHER_CACHE)
+    - Frío/durable: Parquet con compresión snappy
     
     Args:
         excel_path: Ruta al archivo Excel
@@ -109,43 +336,53 @@ def load_excel_with_cache(excel_path, cache_dir, processing_func=None, **read_ex
     """
     excel_path = Path(excel_path)
     cache_path = get_cache_path(excel_path, cache_dir)
+    feather_path = get_feather_cache_path(excel_path, cache_dir)
+    domain = cache_domain(cache_dir)
+    start = time.perf_counter()
+    
+    # Nivel caliente: Feather mapeado en memoria
+    if USE_FEATHER_CACHE and is_cache_valid(excel_path, feather_path):
+        try:
+            df = read_feather_cache(feather_path)
+            record_load(domain, 'feather', time.perf_counter() - start, len(df))
+            return df
+        except Exception:
+            # Feather corrupto o incompatible: se reconstruye desde Parquet/Excel
+            pass
     
     # Si el caché existe y es válido, cargar desde Parquet
     if is_cache_valid(excel_path, cache_path):
         try:
-            df = pd.read_parquet(cache_path)
+            df = read_parquet_cache(cache_path)
             # El caché ya contiene datos procesados, no aplicar processing_func nuevamente
             # para evitar procesamiento doble que podría corromper los datos
+            if USE_FEATHER_CACHE:
+                write_feather_cache(df, feather_path)
+            record_load(domain, 'parquet', time.perf_counter() - start, len(df))
             return df
         except Exception as e:
+            import streamlit as st
             st.warning(f"Error al cargar caché, recargando desde Excel: {e}")
     
     # Cargar desde Excel
     try:
-        df = pd.read_excel(excel_path, **read_excel_kwargs)
+        with timed("read_excel", detail=excel_path.name) as step:
+            df = pd.read_excel(excel_path, **read_excel_kwargs)
+            step.rows_out = len(df)
         
         # Aplicar función de procesamiento si existe
         if processing_func:
             df = processing_func(df)
         
         # Guardar en caché
+        df_for_cache = None
         try:
             # Asegurar que las columnas de tipo object (strings) se mantengan como strings
             # Parquet puede tener problemas con columnas object que pandas intenta convertir
-            df_for_cache = df.copy()
-            for col in df_for_cache.columns:
-                if df_for_cache[col].dtype == 'object':
-                    # Convertir a string explícitamente, manteniendo NaN como NaN
-                    # Usar convert_dtypes para preservar tipos pero asegurar que object sea string
-                    df_for_cache[col] = df_for_cache[col].astype('string')  # StringDtype de pandas
+            df_for_cache = _prepare_for_cache(df)
             
             # Guardar en Parquet con pyarrow que maneja mejor los tipos de datos
-            df_for_cache.to_parquet(
-                cache_path, 
-                index=False, 
-                compression='snappy',
-                engine='pyarrow'
-            )
+            write_parquet_cache(df_for_cache, cache_path, CACHE_SORT_COLUMNS.get(domain))
         except Exception as e:
             # Si falla con string dtype, intentar con conversión más simple
             try:
@@ -155,17 +392,19 @@ def load_excel_with_cache(excel_path, cache_dir, processing_func=None, **read_ex
                         # Convertir a string, reemplazando NaN con string vacío
                         df_for_cache[col] = df_for_cache[col].fillna('').astype(str)
                 
-                df_for_cache.to_parquet(
-                    cache_path, 
-                    index=False, 
-                    compression='snappy',
-                    engine='pyarrow'
-                )
+                write_parquet_cache(df_for_cache, cache_path, CACHE_SORT_COLUMNS.get(domain))
             except Exception as e2:
+                import streamlit as st
+                df_for_cache = None
                 st.warning(f"No se pudo guardar el caché: {e2}")
         
+        if USE_FEATHER_CACHE and df_for_cache is not None:
+            write_feather_cache(df_for_cache, feather_path)
+        
+        record_load(domain, 'excel', time.perf_counter() - start, len(df) if df is not None else None)
         return df
     except Exception as e:
+        import streamlit as st
         st.error(f"Error al cargar el archivo Excel: {e}")
         return None
 
@@ -185,46 +424,47 @@ def parse_filename_date(filename):
             return (año, mes)
     return None
 
+def _scan_period_files(raw_dir, pattern, parse_period):
+    """
+    Recorre raw_dir y, por compatibilidad, la raíz del proyecto.
+    `parse_period(file)` retorna (periodo_str, año, mes) o None para ignorar el archivo.
+    Retorna lista de tuplas (periodo_str, año, mes, archivo_path) sin duplicados.
+    """
+    files = []
+    seen = set()
+    for directory in (raw_dir, Path(".")):
+        for file in get_excel_files(directory, pattern):
+            if file in seen:
+                continue
+            period = parse_period(file)
+            if period:
+                files.append((*period, file))
+                seen.add(file)
+    return files
+
+
+def _monthly_period(file):
+    date_info = parse_filename_date(file)
+    if date_info is None:
+        return None
+    año, mes = date_info
+    return f"{MESES_ES[mes-1]} {año}", año, mes
+
+
 def detect_cartera_files():
     """
     Detecta archivos de cartera disponibles.
     Busca archivos con patrón: cartera-YYYY-MM.xlsx
     Retorna lista de tuplas (mes_str, año, mes_num, archivo_path)
     """
-    files = []
-    meses_es = ['Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio',
-               'Julio', 'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre']
-    
-    # Buscar en el directorio de cartera/raw
-    if CARTERA_RAW_DIR.exists():
-        pattern_files = get_excel_files(CARTERA_RAW_DIR, "cartera-*.xlsx")
-        for file in pattern_files:
-            date_info = parse_filename_date(file)
-            if date_info:
-                año, mes = date_info
-                # Formatear mes en español
-                mes_str = f"{meses_es[mes-1]} {año}"
-                files.append((mes_str, año, mes, file))
-    else:
-        # Si el directorio no existe, intentar crearlo
-        try:
-            CARTERA_RAW_DIR.mkdir(parents=True, exist_ok=True)
-        except:
-            pass
-    
-    # Buscar en el directorio raíz (compatibilidad hacia atrás)
-    root_files = get_excel_files(Path("."), "cartera-*.xlsx")
-    for file in root_files:
-        date_info = parse_filename_date(file)
-        if date_info:
-            año, mes = date_info
-            # Formatear mes en español (consistente con el resto)
-            mes_str = f"{meses_es[mes-1]} {año}"
-            # Evitar duplicados
-            if not any(f[3] == file for f in files):
-                files.append((mes_str, año, mes, file))
-    
-    return sorted(files, key=lambda x: (x[1], x[2]), reverse=True)
+    return cached_file_scan(
+        'cartera',
+        (CARTERA_RAW_DIR, Path(".")),
+        lambda: sorted(
+            _scan_period_files(CARTERA_RAW_DIR, "cartera-*.xlsx", _monthly_period),
+            key=lambda x: (x[1], x[2]), reverse=True
+        ),
+    )
 
 def detect_recaudo_files():
     """
@@ -232,33 +472,25 @@ def detect_recaudo_files():
     Busca archivos con patrón: recaudo-YYYY-MM.xlsx
     Retorna lista de tuplas (mes_str, año, mes_num, archivo_path)
     """
-    files = []
-    meses_es = ['Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio',
-               'Julio', 'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre']
-    
-    # Buscar en el directorio de recaudo/raw
-    pattern_files = get_excel_files(RECAUDO_RAW_DIR, "recaudo-*.xlsx")
-    for file in pattern_files:
-        date_info = parse_filename_date(file)
-        if date_info:
-            año, mes = date_info
-            # Formatear mes en español
-            mes_str = f"{meses_es[mes-1]} {año}"
-            files.append((mes_str, año, mes, file))
-    
-    # Buscar en el directorio raíz (compatibilidad hacia atrás)
-    root_files = get_excel_files(Path("."), "recaudo-*.xlsx")
-    for file in root_files:
-        date_info = parse_filename_date(file)
-        if date_info:
-            año, mes = date_info
-            # Formatear mes en español (consistente con el resto)
-            mes_str = f"{meses_es[mes-1]} {año}"
-            # Evitar duplicados
-            if not any(f[3] == file for f in files):
-                files.append((mes_str, año, mes, file))
-    
-    return sorted(files, key=lambda x: (x[1], x[2]), reverse=True)
+    return cached_file_scan(
+        'recaudo',
+        (RECAUDO_RAW_DIR, Path(".")),
+        lambda: sorted(
+            _scan_period_files(RECAUDO_RAW_DIR, "recaudo-*.xlsx", _monthly_period),
+            key=lambda x: (x[1], x[2]), reverse=True
+        ),
+    )
+
+
+def _pipeline_period(file):
+    match = re.search(r'(\d{4})(?:-(\d{1,2}))?', file.stem)
+    if not match:
+        return None
+    año = int(match.group(1))
+    mes = int(match.group(2)) if match.group(2) else None
+    if mes and 1 <= mes <= 12:
+        return f"{MESES_ES[mes-1]} {año}", año, mes
+    return f"Año {año}", año, mes
 
 
 def detect_fiable_pipeline_files():
@@ -267,37 +499,14 @@ def detect_fiable_pipeline_files():
     Busca archivos con patrón: fiable-creditos-YYYY.xlsx o fiable-creditos-YYYY-MM.xlsx
     Retorna lista de tuplas (periodo_str, año, mes, archivo_path)
     """
-    files = []
-    meses_es = ['Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio',
-                'Julio', 'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre']
-
-    pattern_files = get_excel_files(PIPELINE_RAW_DIR, "fiable-creditos-*.xls")
-    for file in pattern_files:
-        match = re.search(r'(\d{4})(?:-(\d{1,2}))?', file.stem)
-        if match:
-            año = int(match.group(1))
-            mes = int(match.group(2)) if match.group(2) else None
-            if mes and 1 <= mes <= 12:
-                periodo_str = f"{meses_es[mes-1]} {año}"
-            else:
-                periodo_str = f"Año {año}"
-            files.append((periodo_str, año, mes, file))
-
-    # Compatibilidad: buscar en raíz
-    root_files = get_excel_files(Path("."), "fiable-creditos-*.xls")
-    for file in root_files:
-        match = re.search(r'(\d{4})(?:-(\d{1,2}))?', file.stem)
-        if match:
-            año = int(match.group(1))
-            mes = int(match.group(2)) if match.group(2) else None
-            if mes and 1 <= mes <= 12:
-                periodo_str = f"{meses_es[mes-1]} {año}"
-            else:
-                periodo_str = f"Año {año}"
-            if not any(existing[3] == file for existing in files):
-                files.append((periodo_str, año, mes, file))
-
-    return sorted(files, key=lambda x: (x[1], x[2] if x[2] is not None else 0), reverse=True)
+    return cached_file_scan(
+        'pipeline',
+        (PIPELINE_RAW_DIR, Path(".")),
+        lambda: sorted(
+            _scan_period_files(PIPELINE_RAW_DIR, "fiable-creditos-*.xls", _pipeline_period),
+            key=lambda x: (x[1], x[2] if x[2] is not None else 0), reverse=True
+        ),
+    )
 
 
 def detect_colocacion_fiable_files():
@@ -306,6 +515,10 @@ def detect_colocacion_fiable_files():
     Se esperan Excel ubicados en data/colocacion/raw (extensiones .xlsx o .xls).
     Retorna lista de Path ordenada por fecha de modificación (reciente primero).
     """
+    return cached_file_scan('colocacion', (COLOCACION_RAW_DIR,), _scan_colocacion_files)
+
+
+def _scan_colocacion_files():
     files = []
     if not COLOCACION_RAW_DIR.exists():
         return files
@@ -320,6 +533,7 @@ def detect_colocacion_fiable_files():
     return sorted(files, key=lambda x: x.stat().st_mtime, reverse=True)
 
 # Funciones de procesamiento específicas
+@instrumented()
 def process_cartera_data(df, deduplicate=True):
     """
     Procesa los datos de cartera después de cargar.
@@ -328,6 +542,8 @@ def process_cartera_data(df, deduplicate=True):
         df: DataFrame con los datos de cartera
         deduplicate: Si True, elimina duplicados basados en Razón Social + Placa + Vencimiento
     """
+    import streamlit as st
+
     # Limpiar nombres de columnas
     df.columns = df.columns.str.strip()
     
@@ -438,6 +654,7 @@ def process_cartera_data(df, deduplicate=True):
     
     return df
 
+@instrumented()
 def process_recaudo_data(df):
     """Procesa los datos de recaudo después de cargar"""
     # Convertir columnas de fecha
@@ -457,10 +674,93 @@ def process_recaudo_data(df):
     return df
 
 
+ESTADOS_REFERENCIA = {
+    'creado': 'CREADO',
+    'aprobado': 'APROBADO',
+    'en analisis': 'EN ANALISIS',
+    'en análisis': 'EN ANALISIS',
+    'excepcionado': 'EXCEPCIONADO',
+    'legalizado': 'LEGALIZADO',
+    'pre-legalizado': 'PRE-LEGALIZADO',
+    'pre legalizado': 'PRE-LEGALIZADO',
+    'rechazado': 'RECHAZADO',
+    'reproceso': 'REPROCESO',
+    'solicitado': 'SOLICITADO',
+}
+
+
+def map_unique_values(series, func):
+    """
+    Aplica `func` solo a los valores distintos de `series` y lleva el resultado a
+    cada fila por su código (factorize + take), sin operaciones de texto por fila.
+    
+    Args:
+        series: Serie original (los nulos se tratan como un valor más)
+        func: Recibe una Serie con los valores distintos y retorna otra del mismo largo
+    """
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    mapped = func(pd.Series(uniques))
+    return mapped.take(codes).set_axis(series.index)
+
+
+def normalize_credit_keys(values):
+    """
+    Texto canónico de CONSECUTIVO/IDENTIFICACION. Con una sola celda vacía pandas lee
+    la columna como float y la llave queda '1.0'; se lleva a '1' para que coincida
+    con la del mismo crédito en otros archivos.
+    """
+    text = values.astype(str).str.strip()
+    return text.str.replace(r'^(-?\d+)\.0+$', r'\1', regex=True)
+
+
+def normalize_estados(estados):
+    """Lleva los estados de crédito a su forma canónica (sin tildes, en mayúsculas)."""
+    estados_limpios = (
+        estados
+        .str.lower()
+        .str.replace('á', 'a', regex=False)
+        .str.replace('é', 'e', regex=False)
+        .str.replace('í', 'i', regex=False)
+        .str.replace('ó', 'o', regex=False)
+        .str.replace('ú', 'u', regex=False)
+    )
+    return estados_limpios.map(ESTADOS_REFERENCIA).fillna(estados.str.upper())
+
+
+def periodo_label(periodo):
+    """Etiqueta 'Mes Año' en español para un Period/Timestamp (p. ej. 'Octubre 2025')"""
+    return f"{MESES_ES[periodo.month - 1]} {periodo.year}"
+
+
+def period_labels(periods, formatter):
+    """
+    Etiquetas de periodo como categórica: se formatean solo los periodos distintos
+    (ordenados cronológicamente) y cada fila queda con el código de su periodo.
+    Los periodos nulos quedan como NaN.
+    """
+    codes, uniques = pd.factorize(periods, sort=True)
+    labels = [formatter(periodo) for periodo in uniques]
+    return pd.Series(pd.Categorical.from_codes(codes, categories=labels), index=periods.index)
+
+
+def month_name_labels(months):
+    """Nombre del mes en español como categórica ordenada Enero..Diciembre (NaN si no es 1-12)"""
+    months = pd.to_numeric(months, errors='coerce')
+    valid = months.between(1, 12)
+    codes = months.where(valid, 0).fillna(0).astype('int64') - 1
+    return pd.Series(
+        pd.Categorical.from_codes(codes.to_numpy(), categories=MESES_ES),
+        index=months.index,
+    )
+
+
+@instrumented()
 def process_fiable_pipeline_data(df):
     """
     Procesa los datos del pipeline Fiable para estandarizar columnas y tipos.
     """
+    import streamlit as st
+
     if df is None or df.empty:
         return df
 
@@ -492,37 +792,17 @@ def process_fiable_pipeline_data(df):
         if fecha_col in df.columns:
             df[fecha_col] = pd.to_datetime(df[fecha_col], errors='coerce')
 
-    # Normalizar textos
+    # Normalizar textos sobre los valores distintos (el costo crece con la cardinalidad, no con las filas)
     text_cols = ['ASESOR', 'CONSECUTIVO', 'IDENTIFICACION', 'CLIENTE', 'ESTACION', 'PRODUCTO', 'ESTADO']
     for col in text_cols:
         if col in df.columns:
-            df[col] = df[col].astype(str).str.strip()
-
-    estados_referencia = {
-        'creado': 'CREADO',
-        'aprobado': 'APROBADO',
-        'en analisis': 'EN ANALISIS',
-        'en análisis': 'EN ANALISIS',
-        'excepcionado': 'EXCEPCIONADO',
-        'legalizado': 'LEGALIZADO',
-        'pre-legalizado': 'PRE-LEGALIZADO',
-        'pre legalizado': 'PRE-LEGALIZADO',
-        'rechazado': 'RECHAZADO',
-        'reproceso': 'REPROCESO',
-        'solicitado': 'SOLICITADO',
-    }
+            if col in PIPELINE_DEDUP_KEYS:
+                df[col] = map_unique_values(df[col], normalize_credit_keys)
+            else:
+                df[col] = map_unique_values(df[col], lambda values: values.astype(str).str.strip())
 
     if 'ESTADO' in df.columns:
-        estados_limpios = (
-            df['ESTADO']
-            .str.lower()
-            .str.replace('á', 'a', regex=False)
-            .str.replace('é', 'e', regex=False)
-            .str.replace('í', 'i', regex=False)
-            .str.replace('ó', 'o', regex=False)
-            .str.replace('ú', 'u', regex=False)
-        )
-        df['ESTADO_NORMALIZADO'] = estados_limpios.map(estados_referencia).fillna(df['ESTADO'].str.upper())
+        df['ESTADO_NORMALIZADO'] = map_unique_values(df['ESTADO'], normalize_estados)
     else:
         df['ESTADO_NORMALIZADO'] = 'SIN ESTADO'
 
@@ -535,11 +815,12 @@ def process_fiable_pipeline_data(df):
         df['MES'] = None
         df['MES_PERIODO'] = None
 
-    df['MES_LABEL'] = df['FECHA'].dt.strftime('%B %Y') if 'FECHA' in df.columns else None
+    df['MES_LABEL'] = period_labels(df['MES_PERIODO'], periodo_label) if 'FECHA' in df.columns else None
 
     return df
 
 
+@instrumented()
 def process_colocacion_fiable_data(df):
     """
     Limpia y estandariza la data de colocación Fiable.
@@ -628,76 +909,85 @@ def process_colocacion_fiable_data(df):
 
     if 'FECHA_DOCUMENTO' in df.columns:
         df['PERIODO'] = df['FECHA_DOCUMENTO'].dt.to_period('M')
-        df['PERIODO_LABEL'] = df['FECHA_DOCUMENTO'].dt.strftime('%Y-%m')
+        df['PERIODO_LABEL'] = period_labels(df['PERIODO'], str)
     elif {'ANIO', 'MES'}.issubset(df.columns):
         df['PERIODO'] = pd.PeriodIndex(
             year=df['ANIO'].fillna(0).astype(int),
             month=df['MES'].fillna(1).astype(int),
             freq='M',
         )
-        df['PERIODO_LABEL'] = df['PERIODO'].astype(str)
+        df['PERIODO_LABEL'] = period_labels(df['PERIODO'], str)
     else:
         df['PERIODO'] = None
         df['PERIODO_LABEL'] = None
 
-    month_names = {
-        1: "Enero",
-        2: "Febrero",
-        3: "Marzo",
-        4: "Abril",
-        5: "Mayo",
-        6: "Junio",
-        7: "Julio",
-        8: "Agosto",
-        9: "Septiembre",
-        10: "Octubre",
-        11: "Noviembre",
-        12: "Diciembre",
-    }
     if 'MES' in df.columns:
-        df['MES_NOMBRE'] = df['MES'].apply(lambda x: month_names.get(int(x), None) if pd.notna(x) else None)
+        df['MES_NOMBRE'] = month_name_labels(df['MES'])
     else:
         df['MES_NOMBRE'] = None
 
     return df
 
 
-def load_all_colocacion_fiable():
-    """
-    Carga todos los archivos ubicados en data/colocacion/raw,
-    aplicando caché por archivo y concatenando la información.
-    """
-    files = detect_colocacion_fiable_files()
-    if not files:
-        return None
-
-    dataframes = []
-    for file_path in files:
-        df = load_excel_with_cache(
-            file_path,
-            COLOCACION_CACHE_DIR,
-            processing_func=process_colocacion_fiable_data
-        )
-        if df is not None and not df.empty:
-            df = df.copy()
-            df['ARCHIVO_ORIGEN'] = file_path.name
-            dataframes.append(df)
-
-    if not dataframes:
-        return None
-
-    return pd.concat(dataframes, ignore_index=True)
+# Dimensiones de la tabla agregada de colocación (además de ANIO y MES)
+COLOCACION_AGG_DIMENSIONS = [
+    'CENTRO_COSTO',
+    'VENDEDOR',
+    'BODEGA',
+    'MODALIDAD_VENTA',
+    'PRODUCTO',
+    'TIPO_PRODUCTO',
+]
+# Etiquetas derivadas del periodo: no agregan cardinalidad pero permiten agrupar por ellas
+COLOCACION_AGG_LABELS = ['MES_NOMBRE', 'PERIODO_LABEL']
 
 
-def load_all_fiable_pipeline():
+@instrumented()
+def build_colocacion_aggregates(df):
     """
-    Carga y combina todos los archivos de pipeline Fiable disponibles.
+    Construye la tabla materializada de colocación por
+    (ANIO, MES, CENTRO_COSTO, VENDEDOR, BODEGA, MODALIDAD_VENTA, PRODUCTO, TIPO_PRODUCTO).
+    
+    Columnas de medida:
+    - REGISTROS: número de facturas
+    - DEVOLUCIONES: facturas con TOTALFAC negativo
+    - TOTALFAC: suma del valor facturado (las devoluciones ya restan)
+    - UNIDADES: REGISTROS - 2 * DEVOLUCIONES (la devolución no cuenta y anula su venta)
+    
+    Las filas sin FECHA_DOCUMENTO no se agregan, igual que las descarta el filtro
+    de rango de fechas de la página.
     """
-    files = detect_fiable_pipeline_files()
-    if not files:
+    if df is None or df.empty or 'TOTALFAC' not in df.columns:
         return None
+    
+    if 'FECHA_DOCUMENTO' in df.columns and df['FECHA_DOCUMENTO'].notna().any():
+        df = df[df['FECHA_DOCUMENTO'].notna()]
+    
+    keys = [
+        col for col in ['ANIO', 'MES'] + COLOCACION_AGG_DIMENSIONS + COLOCACION_AGG_LABELS
+        if col in df.columns
+    ]
+    totalfac = pd.to_numeric(df['TOTALFAC'], errors='coerce')
+    base = df[keys].copy()
+    base['REGISTROS'] = 1
+    base['DEVOLUCIONES'] = (totalfac < 0).astype('int64')
+    base['TOTALFAC'] = totalfac
+    
+    aggregates = (
+        base.groupby(keys, dropna=False, sort=False, observed=True)
+        .agg(
+            REGISTROS=('REGISTROS', 'sum'),
+            DEVOLUCIONES=('DEVOLUCIONES', 'sum'),
+            TOTALFAC=('TOTALFAC', 'sum'),
+        )
+        .reset_index()
+    )
+    aggregates['UNIDADES'] = aggregates['REGISTROS'] - 2 * aggregates['DEVOLUCIONES']
+    return aggregates
+
 
-    dataframes = []
+def _pipeline_file_frames(files):
+    """Genera (ruta, DataFrame) por archivo de pipeline, leyendo desde el caché por archivo."""
     for periodo_str, año, mes, file_path in files:
         df = load_excel_with_cache(
             file_path,
@@ -708,57 +998,291 @@ def load_all_fiable_pipeline():
             df = df.copy()
             df['ARCHIVO_ORIGEN'] = file_path.name
             df['PERIODO_ARCHIVO'] = periodo_str
-            dataframes.append(df)
+            df['RANGO_ARCHIVO'] = pipeline_file_rank(año, mes)
+            yield file_path, df
 
-    if not dataframes:
-        return None
 
-    return pd.concat(dataframes, ignore_index=True)
+def load_all_fiable_pipeline():
+    """
+    Carga los créditos del pipeline Fiable resueltos a su último registro
+    (un registro por CONSECUTIVO/IDENTIFICACION aunque figuren en archivos solapados).
+    """
+    latest, _ = update_pipeline_latest()
+    return latest
 
 
-def load_cartera_for_comparison(año1, mes1, año2, mes2):
-    """
-    Carga dos períodos de cartera para comparación.
-    Retorna (df1, df2, periodo1_str, periodo2_str)
+# Llave de un crédito y orden para decidir cuál registro es el último
+PIPELINE_DEDUP_KEYS = ['CONSECUTIVO', 'IDENTIFICACION']
+PIPELINE_LATEST_PATH = PIPELINE_CACHE_DIR / "pipeline_latest.parquet"
+
+# Dimensiones de la tabla de conteos por estado del pipeline (además del periodo)
+PIPELINE_COUNT_DIMENSIONS = ['ESTADO_NORMALIZADO', 'ASESOR', 'ESTACION', 'PRODUCTO']
+PIPELINE_COUNTS_PATH = PIPELINE_CACHE_DIR / "pipeline_state_counts.parquet"
+# Clave de metadatos Parquet con los archivos (tamaño, mtime) ya incorporados a una tabla
+TRACKED_FILES_KEY = b'dashboard_files'
+
+
+def pipeline_file_rank(año, mes):
+    """Orden de un archivo de pipeline: el anual cuenta como anterior a los mensuales del mismo año."""
+    return año * 100 + (mes or 0)
+
+
+def valid_credit_keys(df):
+    """Filas con CONSECUTIVO informado; las demás no se pueden deduplicar y se conservan tal cual."""
+    consecutivo = df['CONSECUTIVO'].astype('string').str.strip()
+    return consecutivo.notna() & ~consecutivo.str.lower().isin(['', 'nan', 'none', '<na>'])
+
+
+def _record_order(df):
+    """(rango de archivo, FECHA_ANALISIS) para comparar registros de un mismo crédito."""
+    if 'FECHA_ANALISIS' in df.columns:
+        fecha = pd.to_datetime(df['FECHA_ANALISIS'], errors='coerce').fillna(pd.Timestamp.min)
+    else:
+        fecha = pd.Series(pd.Timestamp.min, index=df.index)
+    return df['RANGO_ARCHIVO'].astype('int64'), fecha
+
+
+def _in_file_order(parts):
+    """Une partes de un mismo archivo respetando el orden original de sus filas."""
+    return pd.concat(parts).sort_index(kind='stable').reset_index(drop=True)
+
+
+def _newest_file_first(latest):
+    """Archivo más reciente primero y, dentro de cada archivo, el orden del Excel."""
+    if latest is None or 'RANGO_ARCHIVO' not in latest.columns:
+        return latest
+    return latest.sort_values('RANGO_ARCHIVO', ascending=False, kind='stable', ignore_index=True)
+
+
+@instrumented()
+def upsert_latest_records(latest, rows):
     """
-    available_files = detect_cartera_files()
-    
-    # Buscar archivos
-    file1 = None
-    file2 = None
+    Incorpora las filas de un archivo a la tabla de últimos registros.
     
-    for mes_str, año, mes, file_path in available_files:
-        if año == año1 and mes == mes1:
-            file1 = file_path
-        if año == año2 and mes == mes2:
-            file2 = file_path
+    Gana el registro del archivo más reciente y, dentro del mismo archivo, el de
+    FECHA_ANALISIS mayor. Las filas nuevas se deduplican entre sí y se cruzan con
+    la tabla existente por llave (join hash de pandas); el historial no se re-ordena.
     
-    if file1 is None:
-        st.error(f"No se encontró archivo para {datetime(año1, mes1, 1).strftime('%B %Y')}")
-        return None, None, None, None
-    if file2 is None:
-        st.error(f"No se encontró archivo para {datetime(año2, mes2, 1).strftime('%B %Y')}")
-        return None, None, None, None
-    
-    # Cargar ambos archivos (sin deduplicación para mantener totales como antes)
-    df1 = load_excel_with_cache(
-        file1, CARTERA_CACHE_DIR,
-        processing_func=lambda df: process_cartera_data(df, deduplicate=False),
-        header=7
+    Returns:
+        (tabla actualizada, filas insertadas, filas reemplazadas)
+    """
+    keys = [col for col in PIPELINE_DEDUP_KEYS if col in rows.columns]
+    if 'CONSECUTIVO' not in keys:
+        inserted = rows
+        latest = rows if latest is None else pd.concat([latest, rows], ignore_index=True)
+        return latest, inserted, rows.iloc[0:0]
+
+    valid = valid_credit_keys(rows)
+    rank, fecha = _record_order(rows)
+    candidates = (
+        rows[valid]
+        .assign(_RANGO=rank[valid], _FECHA=fecha[valid])
+        .sort_values(['_RANGO', '_FECHA'], kind='stable')
+        .drop_duplicates(subset=keys, keep='last')
     )
-    
-    df2 = load_excel_with_cache(
-        file2, CARTERA_CACHE_DIR,
-        processing_func=lambda df: process_cartera_data(df, deduplicate=False),
-        header=7
+    passthrough = rows[~valid]
+
+    if latest is None or latest.empty:
+        inserted = _in_file_order([candidates.drop(columns=['_RANGO', '_FECHA']), passthrough])
+        return inserted, inserted, rows.iloc[0:0]
+
+    latest_valid = valid_credit_keys(latest)
+    latest_rank, latest_fecha = _record_order(latest)
+    existing = latest.loc[latest_valid, keys].assign(
+        _POS=latest.index[latest_valid], _RANGO_OLD=latest_rank[latest_valid], _FECHA_OLD=latest_fecha[latest_valid]
     )
+    matched = (
+        candidates[keys + ['_RANGO', '_FECHA']]
+        .assign(_NEW=candidates.index)
+        .merge(existing, on=keys, how='inner')
+    )
+    newer = (matched['_RANGO'] > matched['_RANGO_OLD']) | (
+        (matched['_RANGO'] == matched['_RANGO_OLD']) & (matched['_FECHA'] >= matched['_FECHA_OLD'])
+    )
+    replaced_pos = matched.loc[newer, '_POS']
+    stale_new = matched.loc[~newer, '_NEW']
+
+    inserted = _in_file_order(
+        [candidates.drop(index=stale_new).drop(columns=['_RANGO', '_FECHA']), passthrough]
+    )
+    removed = latest.loc[replaced_pos]
+    latest = pd.concat([latest.drop(index=replaced_pos), inserted], ignore_index=True)
+    return latest, inserted, removed
+
+
+@instrumented()
+def count_pipeline_states(df):
+    """
+    Cuenta registros por (MES_PERIODO, AÑO, MES, ESTADO_NORMALIZADO, ASESOR, ESTACION, PRODUCTO).
+    Los registros sin periodo no se cuentan (no entran en ningún mes).
+    """
+    keys = ['MES_PERIODO', 'AÑO', 'MES'] + PIPELINE_COUNT_DIMENSIONS
+    if df is None or df.empty:
+        return pd.DataFrame(columns=keys + ['REGISTROS'])
+    keys = [col for col in keys if col in df.columns]
+    return (
+        df.dropna(subset=['MES_PERIODO'])
+        .groupby(keys, dropna=False, sort=False)
+        .size()
+        .reset_index(name='REGISTROS')
+    )
+
+
+def merge_state_counts(tables):
+    """Suma varias tablas de conteo (las de filas reemplazadas llegan con REGISTROS negativo)."""
+    tables = [table for table in tables if table is not None and not table.empty]
+    if not tables:
+        return count_pipeline_states(None)
+    if len(tables) == 1:
+        return tables[0]
+    combined = pd.concat(tables, ignore_index=True)
+    keys = [col for col in combined.columns if col != 'REGISTROS']
+    merged = (
+        combined.groupby(keys, dropna=False, sort=False)['REGISTROS']
+        .sum()
+        .reset_index()
+    )
+    return merged[merged['REGISTROS'] != 0].reset_index(drop=True)
+
+
+def _pipeline_files_signature(files):
+    signature = {}
+    for _, _, _, file_path in files:
+        stat = file_path.stat()
+        signature[str(file_path)] = [stat.st_size, stat.st_mtime_ns]
+    return signature
+
+
+def _read_tracked_files(path):
+    """Archivos registrados en los metadatos de un Parquet, sin leer sus datos."""
+    import pyarrow.parquet as pq
+
+    try:
+        metadata = pq.read_schema(path).metadata or {}
+        if metadata.get(CACHE_SCHEMA_KEY) != CACHE_SCHEMA_VERSION:
+            return None
+        return json.loads(metadata.get(TRACKED_FILES_KEY, b'{}'))
+    except Exception:
+        return None
+
+
+def _read_tracked_table(path):
+    """Retorna (tabla, {ruta: [tamaño, mtime_ns]}) persistidos, o (None, {}) si no hay."""
+    if not path.exists():
+        return None, {}
+    import pyarrow.parquet as pq
+
+    try:
+        table = pq.read_table(path)
+        metadata = table.schema.metadata or {}
+        if metadata.get(CACHE_SCHEMA_KEY) != CACHE_SCHEMA_VERSION:
+            return None, {}
+        files = json.loads(metadata.get(TRACKED_FILES_KEY, b'{}'))
+        return restore_row_order(table.to_pandas()), files
+    except Exception:
+        return None, {}
+
+
+def _write_tracked_table(df, files, path, sort_columns=None):
+    """
+    Persiste una tabla junto con los archivos que incorpora, en un solo Parquet y de forma atómica.
+    Con `sort_columns` se guarda ordenada como los cachés por archivo, para leerla con filtros.
+    """
+    tmp_path = None
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Temporal único: varias sesiones o procesos pueden escribir la misma tabla
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".", suffix=".tmp")
+        os.close(fd)
+        tmp_path = Path(tmp_name)
+        write_parquet_cache(
+            _prepare_for_cache(df), tmp_path, sort_columns,
+            metadata={TRACKED_FILES_KEY: json.dumps(files).encode('utf-8')},
+        )
+        os.replace(tmp_path, path)
+    except Exception:
+        if tmp_path is not None:
+            tmp_path.unlink(missing_ok=True)
+
+
+@instrumented()
+def update_pipeline_latest():
+    """
+    Mantiene de forma incremental la tabla de últimos registros del pipeline y sus conteos.
     
-    periodo1_str = datetime(año1, mes1, 1).strftime('%B %Y')
-    periodo2_str = datetime(año2, mes2, 1).strftime('%B %Y')
+    Ambas tablas recuerdan qué archivos (tamaño, mtime) ya incorporaron. Un archivo
+    nuevo se inserta con `upsert_latest_records` y los conteos se actualizan con el
+    delta (+ filas insertadas, − filas reemplazadas). Si un archivo conocido cambió
+    o desapareció, ambas se reconstruyen desde los cachés por archivo.
     
-    return df1, df2, periodo1_str, periodo2_str
+    Returns:
+        (últimos registros, conteos por estado) o (None, None) si no hay archivos
+    """
+    files = detect_fiable_pipeline_files()
+    if not files:
+        return None, None
+    current = _pipeline_files_signature(files)
+
+    latest, tracked = _read_tracked_table(PIPELINE_LATEST_PATH)
+    if latest is None or any(current.get(path) != signature for path, signature in tracked.items()):
+        latest, tracked = None, {}
+
+    counts = None
+    if latest is not None and _read_tracked_files(PIPELINE_COUNTS_PATH) == tracked:
+        counts, _ = _read_tracked_table(PIPELINE_COUNTS_PATH)
+    if counts is None:
+        counts = count_pipeline_states(latest)
+
+    # Del más antiguo al más reciente, para que los reemplazos sigan el orden de los archivos
+    new_files = sorted(
+        [entry for entry in files if str(entry[3]) not in tracked],
+        key=lambda entry: pipeline_file_rank(entry[1], entry[2]),
+    )
+    if not new_files and _read_tracked_files(PIPELINE_COUNTS_PATH) == tracked:
+        return _newest_file_first(latest), counts
+
+    for file_path, rows in _pipeline_file_frames(new_files):
+        latest, inserted, removed = upsert_latest_records(latest, rows)
+        removed_counts = count_pipeline_states(removed)
+        removed_counts['REGISTROS'] = -removed_counts['REGISTROS']
+        counts = merge_state_counts([counts, count_pipeline_states(inserted), removed_counts])
+    for _, _, _, file_path in new_files:
+        tracked[str(file_path)] = current[str(file_path)]
+
+    latest = _newest_file_first(latest)
+    if latest is not None:
+        _write_tracked_table(latest, tracked, PIPELINE_LATEST_PATH, CACHE_SORT_COLUMNS['pipeline'])
+    _write_tracked_table(counts, tracked, PIPELINE_COUNTS_PATH)
+    return latest, counts
+
+
+def pipeline_latest_is_current():
+    """Si la tabla de últimos registros en disco incorpora exactamente los archivos de pipeline presentes."""
+    files = detect_fiable_pipeline_files()
+    return bool(files) and _read_tracked_files(PIPELINE_LATEST_PATH) == _pipeline_files_signature(files)
 
 
+@instrumented()
+def load_pipeline_state_counts():
+    """
+    Tabla de conteos por estado sobre los últimos registros del pipeline.
+    Si ya está al día con los archivos presentes se lee sin tocar el detalle.
+    """
+    files = detect_fiable_pipeline_files()
+    if not files:
+        return None
+    current = _pipeline_files_signature(files)
+    if (
+        _read_tracked_files(PIPELINE_LATEST_PATH) == current
+        and _read_tracked_files(PIPELINE_COUNTS_PATH) == current
+    ):
+        counts, _ = _read_tracked_table(PIPELINE_COUNTS_PATH)
+        if counts is not None:
+            return counts
+    return update_pipeline_latest()[1]
+
+
+@instrumented()
 def compare_cartera_periods(df1, df2, periodo1_str, periodo2_str, clasificar_empresa_func=None):
     """
     Compara dos períodos de cartera y retorna métricas comparativas.
@@ -847,6 +1371,7 @@ def compare_cartera_periods(df1, df2, periodo1_str, periodo2_str, clasificar_emp
     return pd.DataFrame(comparison_data)
 
 
+@instrumented()
 def process_cartera_colocada_fiable(df):
     """Procesa los datos de Cartera Colocada FIABLE"""
     if df is None or df.empty:
@@ -855,6 +1380,53 @@ def process_cartera_colocada_fiable(df):
     df.columns = df.columns.str.strip()
     return df
 
+
+# Rangos de edad de vencimiento en su orden natural
+EDADES_ORDEN = ['PorVencer', '30', '60', '90', 'Mas90']
+
+
+def normalize_edades(edades):
+    """
+    Lleva las variantes de EDADES ('Por Vencer', '30 Días', 'Más de 90', ...) a los
+    rangos de EDADES_ORDEN; los valores no reconocidos se conservan sin espacios.
+    Recibe y retorna una Serie (se usa sobre los valores distintos).
+    """
+    texto = edades.astype(str).str.strip()
+    plano = (
+        texto.str.lower()
+        .str.replace('á', 'a', regex=False)
+        .str.replace('í', 'i', regex=False)
+        .str.replace(' ', '', regex=False)
+    )
+    rango = texto.copy()
+    pendiente = pd.Series(True, index=texto.index)
+    reglas = [
+        ('PorVencer', plano.str.contains('porvencer')),
+        ('Mas90', plano.str.contains('mas') & plano.str.contains('90')),
+        ('30', plano.str.contains('30')),
+        ('60', plano.str.contains('60')),
+        ('90', plano.str.contains('90')),
+    ]
+    for valor, coincide in reglas:
+        rango[pendiente & coincide] = valor
+        pendiente &= ~coincide
+    return rango
+
+
+def edades_categorical(edades):
+    """
+    Categórica ordenada de rangos de edad: se normalizan solo los valores distintos
+    y las categorías quedan PorVencer < 30 < 60 < 90 < Mas90 < otros (alfabético).
+    """
+    normalizadas = map_unique_values(edades, normalize_edades)
+    otros = sorted(set(normalizadas.dropna().unique()) - set(EDADES_ORDEN))
+    return pd.Series(
+        pd.Categorical(normalizadas, categories=EDADES_ORDEN + otros, ordered=True),
+        index=edades.index,
+    )
+
+
+@instrumented()
 def process_cartera_financiero_fiable(df):
     """Procesa los datos de Cartera Financiero X edades FIABLE"""
     if df is None or df.empty:
@@ -864,6 +1436,9 @@ def process_cartera_financiero_fiable(df):
     # Convertir fechas
     if 'Vencimiento' in df.columns:
         df['Vencimiento'] = pd.to_datetime(df['Vencimiento'], errors='coerce')
+    # Rango de edad normalizado y ordenado (una sola vez al ingerir)
+    if 'EDADES' in df.columns:
+        df['EDADES_NORM'] = edades_categorical(df['EDADES'])
     # Convertir columnas numéricas
     numeric_cols = ['Capital', 'Cuota', 'Interes', 'Fianza', 'abonofianza']
     for col in numeric_cols:
@@ -876,6 +1451,7 @@ def process_cartera_financiero_fiable(df):
                 ).fillna(0)
     return df
 
+@instrumented()
 def process_cartera_proyectadas_fiable(df):
     """Procesa los datos de Cartera Proyectadas FIABLE"""
     if df is None or df.empty:
@@ -900,90 +1476,110 @@ def process_cartera_proyectadas_fiable(df):
                 ).fillna(0)
     return df
 
-def load_cartera_fiable_files():
-    """
-    Carga los 3 archivos de cartera FIABLE usando caché en disco:
-    - Cartera Colocada FIABLE
-    - Cartera Financiero X edades FIABLE
-    - Cartera Proyectadas FIABLE
-    
-    Los archivos se buscan en: data/cartera_fiable/raw/
-    Los archivos se cachean en: data/cartera_fiable/cache/
-    
-    Retorna tupla (df_colocada, df_financiero, df_proyectadas) o (None, None, None) si hay error
-    """
-    # Buscar archivos en el directorio de cartera_fiable/raw
-    file_colocada = None
-    file_financiero = None
-    file_proyectadas = None
-    
-    # Buscar archivos en el directorio específico
-    if CARTERA_FIABLE_RAW_DIR.exists():
-        for file in CARTERA_FIABLE_RAW_DIR.glob("*.xlsx"):
-            name_lower = file.name.lower()
-            if "colocada" in name_lower and "fiable" in name_lower:
-                file_colocada = file
-            elif "financiero" in name_lower and "edades" in name_lower and "fiable" in name_lower:
-                file_financiero = file
-            elif "proyectadas" in name_lower and "fiable" in name_lower:
-                file_proyectadas = file
-    
-    # Si no se encuentran en el directorio específico, buscar en el directorio raíz (compatibilidad)
-    root_dir = Path(".")
-    if not file_colocada:
-        for file in root_dir.glob("*.xlsx"):
-            name_lower = file.name.lower()
-            if "colocada" in name_lower and "fiable" in name_lower:
-                file_colocada = file
-                break
+# Tipos de archivo de cartera FIABLE: (palabras requeridas en el nombre, procesamiento, etiqueta)
+CARTERA_FIABLE_TYPES = {
+    'colocada': (('colocada',), process_cartera_colocada_fiable, "Cartera Colocada"),
+    'financiero': (('financiero', 'edades'), process_cartera_financiero_fiable, "Cartera Financiero X edades"),
+    'proyectadas': (('proyectadas',), process_cartera_proyectadas_fiable, "Cartera Proyectadas"),
+}
+
+_MES_EN_NOMBRE = re.compile(
+    r'(' + '|'.join(mes.upper() for mes in MESES_ES) + r'|SETIEMBRE)\s+(?:DE\s+)?(\d{4})',
+    re.IGNORECASE,
+)
+
+
+def parse_fiable_period(filename):
+    """
+    Extrae (año, mes) de nombres como 'Cartera Colocada FIABLE OCTUBRE 2025.xlsx'.
+    Retorna None si el nombre no trae un mes en español seguido del año.
+    """
+    match = _MES_EN_NOMBRE.search(filename)
+    if not match:
+        return None
+    nombre_mes = match.group(1).upper()
+    mes = 9 if nombre_mes == 'SETIEMBRE' else [m.upper() for m in MESES_ES].index(nombre_mes) + 1
+    return int(match.group(2)), mes
+
+
+def cartera_fiable_file_type(filename):
+    """Tipo de archivo FIABLE ('colocada', 'financiero', 'proyectadas') o None"""
+    name_lower = filename.lower()
+    if 'fiable' not in name_lower:
+        return None
+    for tipo, (keywords, _, _) in CARTERA_FIABLE_TYPES.items():
+        if all(keyword in name_lower for keyword in keywords):
+            return tipo
+    return None
+
+
+def index_cartera_fiable_files():
+    """
+    Indexa en un solo recorrido todos los archivos de cartera FIABLE por periodo y tipo.
     
-    if not file_financiero:
-        for file in root_dir.glob("*.xlsx"):
-            name_lower = file.name.lower()
-            if "financiero" in name_lower and "edades" in name_lower and "fiable" in name_lower:
-                file_financiero = file
-                break
+    Se recorre data/cartera_fiable/raw/ y, por compatibilidad, la raíz del proyecto
+    (solo para los periodo/tipo que no estén en raw). Si hay varios archivos para el
+    mismo periodo y tipo se usa el modificado más recientemente.
     
-    if not file_proyectadas:
-        for file in root_dir.glob("*.xlsx"):
-            name_lower = file.name.lower()
-            if "proyectadas" in name_lower and "fiable" in name_lower:
-                file_proyectadas = file
-                break
+    Returns:
+        dict {(año, mes) o None: {tipo: Path}}; None agrupa archivos sin mes en el nombre
+    """
+    return cached_file_scan('cartera_fiable', (CARTERA_FIABLE_RAW_DIR, Path(".")), _scan_cartera_fiable_files)
+
+
+def _scan_cartera_fiable_files():
+    index = {}
+    for directory in [CARTERA_FIABLE_RAW_DIR, Path(".")]:
+        found = {}
+        for file in get_excel_files(directory, "*.xlsx"):
+            tipo = cartera_fiable_file_type(file.name)
+            if tipo is None:
+                continue
+            # get_excel_files ordena por mtime descendente: el primero es el más reciente
+            found.setdefault(parse_fiable_period(file.name), {}).setdefault(tipo, file)
+        for periodo, files in found.items():
+            for tipo, file in files.items():
+                index.setdefault(periodo, {}).setdefault(tipo, file)
+    return index
+
+
+def sorted_fiable_periods(index):
+    """Periodos del índice, del más reciente al más antiguo (los archivos sin mes al final)"""
+    return sorted(index, key=lambda periodo: periodo or (0, 0), reverse=True)
+
+
+@instrumented()
+def load_cartera_fiable_period(files):
+    """
+    Carga en paralelo los archivos de un periodo de cartera FIABLE usando caché en disco.
     
-    # Cargar archivos usando caché
-    df_colocada = None
-    df_financiero = None
-    df_proyectadas = None
+    Args:
+        files: dict {tipo: Path} como los de index_cartera_fiable_files()
     
-    if file_colocada:
-        try:
-            df_colocada = load_excel_with_cache(
-                file_colocada,
-                CARTERA_FIABLE_CACHE_DIR,
-                processing_func=process_cartera_colocada_fiable
-            )
-        except Exception as e:
-            st.warning(f"Error al cargar Cartera Colocada: {e}")
+    Returns:
+        Tupla (df_colocada, df_financiero, df_proyectadas); None para los tipos que falten
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    import streamlit as st
+    from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
     
-    if file_financiero:
-        try:
-            df_financiero = load_excel_with_cache(
-                file_financiero,
-                CARTERA_FIABLE_CACHE_DIR,
-                processing_func=process_cartera_financiero_fiable
-            )
-        except Exception as e:
-            st.warning(f"Error al cargar Cartera Financiero X edades: {e}")
+    # Los hilos heredan el contexto de la sesión para que los avisos de load_excel_with_cache se muestren
+    ctx = get_script_run_ctx(suppress_warning=True)
     
-    if file_proyectadas:
-        try:
-            df_proyectadas = load_excel_with_cache(
-                file_proyectadas,
-                CARTERA_FIABLE_CACHE_DIR,
-                processing_func=process_cartera_proyectadas_fiable
-            )
-        except Exception as e:
-            st.warning(f"Error al cargar Cartera Proyectadas: {e}")
+    def _load(tipo):
+        if ctx is not None:
+            add_script_run_ctx(ctx=ctx)
+        _, processing_func, _ = CARTERA_FIABLE_TYPES[tipo]
+        return load_excel_with_cache(files[tipo], CARTERA_FIABLE_CACHE_DIR, processing_func=processing_func)
+    
+    tipos = [tipo for tipo in CARTERA_FIABLE_TYPES if tipo in files]
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(len(tipos), 1), thread_name_prefix="fiable") as executor:
+        futures = {tipo: executor.submit(_load, tipo) for tipo in tipos}
+        for tipo, future in futures.items():
+            try:
+                results[tipo] = future.result()
+            except Exception as e:
+                st.warning(f"Error al cargar {CARTERA_FIABLE_TYPES[tipo][2]}: {e}")
     
-    return df_colocada, df_financiero, df_proyectadas
+    return tuple(results.get(tipo) for tipo in CARTERA_FIABLE_TYPES)
@@ -0,0 +1,355 @@
+"""
+Almacén de datasets compartido entre sesiones de Streamlit.
+
+`st.cache_data` serializa (pickle) el resultado y entrega una copia nueva a
+cada sesión, por lo que con varios analistas conectados el mismo DataFrame
+vive N veces en memoria. Este módulo mantiene una única instancia por proceso
+(vía `st.cache_resource`) y entrega vistas superficiales de solo lectura.
+
+- Cada sesión "sostiene" los datasets que está usando (conteo de referencias
+  por sesión y ranura), de modo que no se expulsan mientras están en uso.
+- Cada entrada se mide con `memory_usage(deep=True)`. Cuando se supera el
+  presupuesto global (o el del dominio) se expulsa la menos usada
+  recientemente (LRU), saltando las que tienen referencias activas.
+- Las entradas caducan tras un TTL y se recargan (desde el caché Feather).
+- Se llevan estadísticas de aciertos/fallos/expulsiones por dominio.
+- Cada entrada recuerda los archivos fuente de los que se construyó, para que
+  al reemplazar un libro se expulsen solo los datasets que dependen de él
+  (ver `cache_graph.py`).
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+import streamlit as st
+
+# Presupuesto de memoria para todos los dominios (MB), configurable por entorno
+DEFAULT_MAX_BYTES = int(float(os.environ.get("DASHBOARD_STORE_MAX_MB", "1024")) * 1024 * 1024)
+# Tiempo de vida de una entrada desde su carga (minutos)
+DEFAULT_TTL_SECONDS = int(float(os.environ.get("DASHBOARD_STORE_TTL_MIN", "240")) * 60)
+# Presupuestos opcionales por dominio (bytes); los no listados solo usan el global
+DOMAIN_MAX_BYTES = {}
+# Una sesión que no renueva su referencia en este tiempo se considera cerrada
+LEASE_TTL_SECONDS = 30 * 60
+
+
+def _current_session_id():
+    """Retorna el id de la sesión de Streamlit actual o None fuera de una ejecución."""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx(suppress_warning=True)
+    except Exception:
+        return None
+    return ctx.session_id if ctx is not None else None
+
+
+def files_signature(paths):
+    """
+    Firma liviana de un conjunto de archivos (ruta, tamaño, mtime).
+    Sirve como parte de la clave para que un archivo reemplazado genere otra entrada.
+    """
+    signature = []
+    for path in paths:
+        try:
+            stat = path.stat()
+            signature.append((str(path), stat.st_size, stat.st_mtime_ns))
+        except OSError:
+            signature.append((str(path), None, None))
+    return tuple(sorted(signature))
+
+
+# (ruta, tamaño, mtime) -> digest, para no releer archivos que no cambiaron
+_DIGEST_MEMO = {}
+_DIGEST_LOCK = threading.Lock()
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """
+    Digest BLAKE2 del contenido de un archivo, memorizado por (ruta, tamaño, mtime).
+    Solo se lee el archivo cuando cambia, así que calcularlo en cada rerun es O(1).
+    """
+    stat = path.stat()
+    memo_key = (str(path), stat.st_size, stat.st_mtime_ns)
+    with _DIGEST_LOCK:
+        digest = _DIGEST_MEMO.get(memo_key)
+    if digest is not None:
+        return digest
+    hasher = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b""):
+            hasher.update(chunk)
+    digest = hasher.hexdigest()
+    with _DIGEST_LOCK:
+        _DIGEST_MEMO[memo_key] = digest
+    return digest
+
+
+def estimate_nbytes(value):
+    """Bytes ocupados por un DataFrame (o tupla de DataFrames) incluyendo strings, u objeto con `nbytes`."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (tuple, list)):
+        return sum(estimate_nbytes(item) for item in value)
+    # Objetos derivados (motores, índices) que informan su propio tamaño
+    return int(getattr(value, "nbytes", 0) or 0)
+
+
+def _enable_copy_on_write():
+    """
+    Las vistas superficiales solo protegen la entrada compartida con Copy-on-Write,
+    que es el comportamiento fijo desde pandas 3. En pandas 2 se activa para todo el
+    proceso; sin él, un `.loc[...] =` o `fillna(inplace=True)` de una página
+    modificaría el dataset que ven las demás sesiones.
+    """
+    if int(pd.__version__.split(".")[0]) < 3:
+        pd.set_option("mode.copy_on_write", True)
+
+
+def _readonly_view(value):
+    """
+    Entrega una copia superficial: comparte los datos pero no el contenedor.
+    Con Copy-on-Write (ver `_enable_copy_on_write`) escribir en ella copia los datos
+    en lugar de modificar la entrada.
+    """
+    if isinstance(value, pd.DataFrame):
+        return value.copy(deep=False)
+    if isinstance(value, tuple):
+        return tuple(_readonly_view(item) for item in value)
+    return value
+
+
+def _source_names(paths):
+    return frozenset(str(path) for path in paths or ())
+
+
+class _Entry:
+    __slots__ = ("value", "nbytes", "sources", "holders", "loaded_at", "last_access")
+
+    def __init__(self, value, sources=frozenset()):
+        now = time.time()
+        self.value = value
+        self.nbytes = estimate_nbytes(value)
+        self.sources = sources
+        self.holders = {}  # holder_id -> último acceso
+        self.loaded_at = now
+        self.last_access = now
+
+
+def _empty_stats():
+    return {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+
+class DatasetStore:
+    """
+    Diccionario LRU de datasets compartido por todo el proceso.
+
+    Las claves son (dominio, clave). El valor se construye una sola vez con el
+    `loader` recibido, incluso si varias sesiones lo piden al mismo tiempo.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL_SECONDS,
+                 domain_max_bytes=None, lease_ttl=LEASE_TTL_SECONDS):
+        _enable_copy_on_write()
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.domain_max_bytes = dict(DOMAIN_MAX_BYTES if domain_max_bytes is None else domain_max_bytes)
+        self.lease_ttl = lease_ttl
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()
+        self._key_locks = {}
+        self._stats = {}
+        # (holder, ranura) -> (dominio, clave) para soltar el dataset anterior
+        self._slots = {}
+
+    def acquire(self, domain, key, loader, slot=None, sources=None):
+        """
+        Retorna una vista del dataset (dominio, clave), cargándolo con `loader` si no existe.
+
+        Args:
+            domain: Área de datos (cartera, recaudo, pipeline, ...)
+            key: Clave hashable dentro del dominio (p. ej. año/mes + firma de archivos)
+            loader: Función sin argumentos que construye el valor
+            slot: Ranura de la sesión; al pedir otra clave en la misma ranura se
+                suelta la anterior. Por defecto el propio dominio.
+            sources: Archivos fuente del valor (rutas); `invalidate_sources` expulsa
+                las entradas que dependen de alguno de ellos.
+
+        Returns:
+            Vista de solo lectura del valor, o None si el loader no produjo datos
+        """
+        entry_key = (domain, key)
+        holder = _current_session_id()
+
+        with self._lock:
+            entry = self._get_fresh(entry_key)
+            if entry is not None:
+                self._domain_stats(domain)["hits"] += 1
+                self._touch(entry_key, entry, holder, slot or domain)
+                return _readonly_view(entry.value)
+            key_lock = self._key_locks.setdefault(entry_key, threading.Lock())
+
+        # Cargar fuera del lock global para no bloquear otras áreas
+        with key_lock:
+            try:
+                with self._lock:
+                    entry = self._entries.get(entry_key)
+                    if entry is not None:
+                        # Otra sesión lo cargó mientras esperábamos
+                        self._key_locks.pop(entry_key, None)
+                        self._touch(entry_key, entry, holder, slot or domain)
+                        self._evict(domain)
+                        return _readonly_view(entry.value)
+                    self._domain_stats(domain)["misses"] += 1
+                value = loader()
+                # Insertar, referenciar y expulsar en un solo bloque: si no, otra
+                # sesión podría expulsar o invalidar la entrada recién creada
+                with self._lock:
+                    self._key_locks.pop(entry_key, None)
+                    if value is None:
+                        return None
+                    entry = _Entry(value, _source_names(sources))
+                    self._entries[entry_key] = entry
+                    self._touch(entry_key, entry, holder, slot or domain)
+                    self._evict(domain)
+                    return _readonly_view(entry.value)
+            finally:
+                # Si el loader falla, no dejar su lock huérfano
+                with self._lock:
+                    self._key_locks.pop(entry_key, None)
+
+    def release(self, domain, key, holder=None):
+        """Suelta la referencia de una sesión sobre un dataset."""
+        holder = holder or _current_session_id()
+        with self._lock:
+            entry = self._entries.get((domain, key))
+            if entry is not None:
+                entry.holders.pop(holder, None)
+
+    def invalidate(self, domain, key=None):
+        """Elimina una entrada, o todas las de un dominio si no se indica clave."""
+        with self._lock:
+            for entry_key in list(self._entries):
+                if entry_key[0] == domain and (key is None or entry_key[1] == key):
+                    del self._entries[entry_key]
+
+    def invalidate_sources(self, paths, domains=None):
+        """
+        Elimina las entradas construidas a partir de alguno de los archivos dados
+        (opcionalmente solo en `domains`). Retorna la lista de (dominio, clave) expulsadas.
+        """
+        names = _source_names(paths)
+        removed = []
+        with self._lock:
+            for entry_key, entry in list(self._entries.items()):
+                if domains is not None and entry_key[0] not in domains:
+                    continue
+                if entry.sources & names:
+                    del self._entries[entry_key]
+                    removed.append(entry_key)
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._slots.clear()
+
+    def contains(self, domain, key):
+        """Indica si (dominio, clave) está residente y vigente, sin contar acierto."""
+        with self._lock:
+            return self._get_fresh((domain, key), count=False) is not None
+
+    def entries(self):
+        """Lista (dominio, clave, bytes, n_referencias, cargado_en, último_acceso, fuentes) para inspección."""
+        with self._lock:
+            self._drop_stale_holders()
+            return [
+                (domain, key, entry.nbytes, len(entry.holders), entry.loaded_at, entry.last_access, entry.sources)
+                for (domain, key), entry in self._entries.items()
+            ]
+
+    def stats(self):
+        """Aciertos, fallos, expulsiones, expiraciones, entradas y bytes por dominio."""
+        with self._lock:
+            result = {domain: dict(values) for domain, values in self._stats.items()}
+            for (domain, _), entry in self._entries.items():
+                domain_result = result.setdefault(domain, _empty_stats())
+                domain_result["entries"] = domain_result.get("entries", 0) + 1
+                domain_result["bytes"] = domain_result.get("bytes", 0) + entry.nbytes
+            for domain_result in result.values():
+                domain_result.setdefault("entries", 0)
+                domain_result.setdefault("bytes", 0)
+            return result
+
+    def total_bytes(self, domain=None):
+        with self._lock:
+            return sum(
+                entry.nbytes for (entry_domain, _), entry in self._entries.items()
+                if domain is None or entry_domain == domain
+            )
+
+    def _domain_stats(self, domain):
+        return self._stats.setdefault(domain, _empty_stats())
+
+    def _get_fresh(self, entry_key, count=True):
+        entry = self._entries.get(entry_key)
+        if entry is None:
+            return None
+        if self.ttl and time.time() - entry.loaded_at > self.ttl:
+            del self._entries[entry_key]
+            if count:
+                self._domain_stats(entry_key[0])["expirations"] += 1
+            return None
+        return entry
+
+    def _touch(self, entry_key, entry, holder, slot):
+        now = time.time()
+        entry.last_access = now
+        self._entries.move_to_end(entry_key)
+        if holder is None:
+            return
+        previous = self._slots.get((holder, slot))
+        if previous is not None and previous != entry_key:
+            self.release(*previous, holder=holder)
+        self._slots[(holder, slot)] = entry_key
+        entry.holders[holder] = now
+
+    def _drop_stale_holders(self):
+        limit = time.time() - self.lease_ttl
+        for entry in self._entries.values():
+            for holder, seen in list(entry.holders.items()):
+                if seen < limit:
+                    del entry.holders[holder]
+
+    def _evict(self, domain):
+        """
+        Expulsa entradas LRU sin referencias hasta cumplir el presupuesto del dominio
+        y luego el global. Las entradas en uso nunca se expulsan, por lo que el
+        consumo puede superar el presupuesto mientras todas estén referenciadas.
+        """
+        domain_budget = self.domain_max_bytes.get(domain)
+        over_domain = domain_budget is not None and self.total_bytes(domain) > domain_budget
+        if not over_domain and self.total_bytes() <= self.max_bytes:
+            return
+        self._drop_stale_holders()
+        if over_domain:
+            self._evict_until(lambda: self.total_bytes(domain) <= domain_budget, domain)
+        self._evict_until(lambda: self.total_bytes() <= self.max_bytes)
+
+    def _evict_until(self, satisfied, domain=None):
+        for entry_key in list(self._entries):
+            if satisfied():
+                return
+            if domain is not None and entry_key[0] != domain:
+                continue
+            if not self._entries[entry_key].holders:
+                del self._entries[entry_key]
+                self._domain_stats(entry_key[0])["evictions"] += 1
+
+
+@st.cache_resource
+def get_dataset_store():
+    """Instancia única del almacén para todo el proceso del servidor."""
+    return DatasetStore()
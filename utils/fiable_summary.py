@@ -0,0 +1,201 @@
+"""
+Resumen ejecutivo del Informe de Cartera FIABLE, persistido por conjunto de archivos.
+
+El informe solo muestra totales y agrupaciones pequeñas (por edad, calificación,
+producto y cuenta), pero los recalculaba sobre las filas de detalle en cada rerun.
+Aquí se calculan una sola vez por combinación de digests de los libros colocada,
+financiero y proyectadas, y se guardan como un JSON pequeño junto al caché de
+cartera FIABLE. Reabrir el informe lee ese JSON sin cargar el detalle.
+Cada JSON guarda también las rutas de sus libros para que el grafo de
+invalidación (cache_graph.py) pueda borrar los resúmenes de un libro reemplazado.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+from data_loader import (
+    CACHE_SCHEMA_VERSION,
+    CARTERA_FIABLE_CACHE_DIR,
+    CARTERA_FIABLE_TYPES,
+    load_cartera_fiable_period,
+)
+from dataset_store import file_digest
+from instrumentation import instrumented
+
+SUMMARY_DIR = CARTERA_FIABLE_CACHE_DIR / "resumen"
+# Versión de los campos del resumen; subirla cada vez que cambie lo que se calcula
+SUMMARY_VERSION = 2
+
+FINANCIERO_TOTALS = ['Capital', 'Cuota', 'Interes', 'Fianza']
+FINANCIERO_EDADES_MEASURES = ['Capital', 'Cuota', 'Interes']
+PROYECTADAS_BUCKETS = ['Total', 'PorVencer', 'Treinta_Dias', 'Sesenta_Dias', 'Noventa_Dias', 'Mas_de_Noventa']
+COLOCADA_TOTALS = ['ValorCuota', 'SaldoCapital', 'ValorPrestamo']
+
+
+def _sum_columns(df, columns):
+    return {col: float(df[col].sum()) for col in columns if col in df.columns}
+
+
+def _to_table(df):
+    """DataFrame -> dict serializable en JSON ({columns, data})."""
+    return json.loads(df.to_json(orient='split', index=False, force_ascii=False))
+
+
+def summary_table(table):
+    """Reconstruye un DataFrame guardado en el resumen (None si la sección no existe)."""
+    if table is None:
+        return None
+    return pd.DataFrame(table['data'], columns=table['columns'])
+
+
+def summarize_financiero(df):
+    """Totales y capital/cuota/interés por rango de edad normalizado."""
+    section = {'registros': len(df), 'totales': _sum_columns(df, FINANCIERO_TOTALS), 'edades': None}
+    if 'EDADES_NORM' in df.columns:
+        edades = (
+            df.groupby('EDADES_NORM', observed=True)[FINANCIERO_EDADES_MEASURES]
+            .sum()
+            .rename_axis('EDADES')
+            .reset_index()
+        )
+        edades['EDADES'] = edades['EDADES'].astype(str)
+        section['edades'] = _to_table(edades)
+    return section
+
+
+def summarize_proyectadas(df):
+    """Totales por rango de edad y tabla por calificación."""
+    section = {'registros': len(df), 'totales': _sum_columns(df, PROYECTADAS_BUCKETS), 'calificacion': None}
+    if 'Calificacion' in df.columns:
+        calificacion = df.groupby('Calificacion').agg({col: 'sum' for col in PROYECTADAS_BUCKETS}).reset_index()
+        section['calificacion'] = _to_table(calificacion)
+    return section
+
+
+def summarize_colocada(df):
+    """Totales, número de créditos y tablas por producto y por cuenta."""
+    totales = _sum_columns(df, COLOCADA_TOTALS)
+    if 'NumeroFactura' in df.columns:
+        totales['NumeroCreditos'] = int(df['NumeroFactura'].nunique())
+    section = {'registros': len(df), 'totales': totales, 'producto': None, 'cuenta': None}
+    if 'Producto' in df.columns:
+        producto = df.groupby('Producto').agg({
+            'ValorCuota': 'sum',
+            'SaldoCapital': 'sum',
+            'ValorPrestamo': 'sum',
+            'NumeroFactura': 'nunique'
+        }).reset_index()
+        section['producto'] = _to_table(producto)
+    if 'NombreCuentaCartera' in df.columns:
+        cuenta = df.groupby('NombreCuentaCartera').agg({
+            'ValorCuota': 'sum',
+            'SaldoCapital': 'sum',
+            'NumeroFactura': 'nunique'
+        }).reset_index()
+        section['cuenta'] = _to_table(cuenta.sort_values('ValorCuota', ascending=False))
+    return section
+
+
+SECTION_BUILDERS = {
+    'colocada': summarize_colocada,
+    'financiero': summarize_financiero,
+    'proyectadas': summarize_proyectadas,
+}
+
+
+@instrumented()
+def build_fiable_summary(frames):
+    """
+    Calcula todas las cifras del informe.
+
+    Args:
+        frames: dict {tipo: DataFrame o None} con los tipos de CARTERA_FIABLE_TYPES
+
+    Returns:
+        dict {tipo: sección o None}
+    """
+    return {
+        tipo: SECTION_BUILDERS[tipo](frames[tipo]) if frames.get(tipo) is not None else None
+        for tipo in CARTERA_FIABLE_TYPES
+    }
+
+
+def summary_key(files):
+    """Clave del resumen: digests del contenido de los libros más las versiones de esquema."""
+    payload = {
+        'resumen': SUMMARY_VERSION,
+        'esquema': CACHE_SCHEMA_VERSION.decode(),
+        'archivos': {tipo: file_digest(path) for tipo, path in sorted(files.items())},
+    }
+    return hashlib.blake2b(json.dumps(payload, sort_keys=True).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def summary_path(files):
+    return SUMMARY_DIR / f"resumen_{summary_key(files)}.json"
+
+
+def _write_summary(summary, files, path):
+    """Escritura atómica (temporal + replace); el resumen es solo una aceleración."""
+    tmp_path = None
+    payload = {'archivos': sorted(str(file_path) for file_path in files.values()), 'resumen': summary}
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Temporal único: dos sesiones pueden calcular el mismo resumen a la vez
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".", suffix=".tmp")
+        tmp_path = Path(tmp_name)
+        with os.fdopen(fd, 'w', encoding='utf-8') as handle:
+            json.dump(payload, handle, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except OSError:
+        if tmp_path is not None:
+            tmp_path.unlink(missing_ok=True)
+
+
+@instrumented()
+def load_fiable_summary(files):
+    """
+    Retorna el resumen de un periodo, leyéndolo del JSON si ya existe para estos
+    mismos archivos; si no, carga el detalle, lo calcula y lo persiste.
+
+    Args:
+        files: dict {tipo: Path} como los de index_cartera_fiable_files()
+
+    Returns:
+        dict {tipo: sección o None}, o None si no se pudo cargar ningún libro
+    """
+    path = summary_path(files)
+    try:
+        with open(path, encoding='utf-8') as handle:
+            return json.load(handle)['resumen']
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    frames = dict(zip(CARTERA_FIABLE_TYPES, load_cartera_fiable_period(files)))
+    summary = build_fiable_summary(frames)
+    if all(section is None for section in summary.values()):
+        return None
+    # Solo se persiste si cargaron todos los libros disponibles (un fallo no queda fijado)
+    if all(summary[tipo] is not None for tipo in files):
+        _write_summary(summary, files, path)
+    return summary
+
+
+def summaries_for_source(raw_file):
+    """Resúmenes persistidos que se calcularon a partir del libro `raw_file`."""
+    if not SUMMARY_DIR.exists():
+        return []
+    raw_name = str(raw_file)
+    paths = []
+    for path in SUMMARY_DIR.glob("resumen_*.json"):
+        try:
+            with open(path, encoding='utf-8') as handle:
+                archivos = json.load(handle).get('archivos', [])
+        except (OSError, ValueError, AttributeError):
+            continue
+        if raw_name in archivos:
+            paths.append(path)
+    return paths
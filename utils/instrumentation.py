@@ -0,0 +1,306 @@
+"""
+Instrumentación de los pasos costosos de cada ejecución de página.
+
+Cada paso medido (cargas, process_*, agregaciones, secciones de la página y
+exportaciones) registra tiempo de reloj, filas de entrada/salida y variación de
+memoria residente del proceso. Los pasos se agrupan por ejecución del script y
+por sesión:
+
+- `instrumented` decora funciones; `timed` es el administrador de contexto
+  equivalente para bloques; `section` parte el script de una página en etapas
+  sin tener que reindentar su código.
+- `app.py` abre la ejecución con `begin_run` y la cierra con `end_run`, que
+  escribe una línea por ejecución en un JSONL rotativo para análisis offline
+  (`DASHBOARD_PERF_LOG`, por defecto `logs/rendimiento.jsonl`; "0" lo desactiva).
+- `render_panel` muestra los pasos de la ejecución en la barra lateral; el
+  panel solo aparece con `?rendimiento=1` en la URL o `DASHBOARD_PERF_PANEL=1`.
+
+La memoria es la del proceso completo, así que con varias sesiones simultáneas
+la variación de un paso puede incluir trabajo de otras sesiones.
+"""
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+import pandas as pd
+
+PERF_LOG_PATH = os.environ.get("DASHBOARD_PERF_LOG", str(Path("logs") / "rendimiento.jsonl"))
+PERF_LOG_MAX_BYTES = 5 * 1024 * 1024
+PERF_LOG_BACKUPS = 3
+PERF_PANEL_PARAM = "rendimiento"
+# Pasos guardados por ejecución (protege la memoria si algo se mide dentro de un bucle)
+MAX_STEPS_PER_RUN = 500
+
+try:
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = 4096
+
+
+def _rss_bytes():
+    """Memoria residente del proceso, o None si la plataforma no la expone."""
+    try:
+        with open("/proc/self/statm", "rb") as handle:
+            return int(handle.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except Exception:
+        return None
+
+
+def _session_id():
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx(suppress_warning=True)
+    except Exception:
+        return None
+    return ctx.session_id if ctx is not None else None
+
+
+def _row_count(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value)
+    return None
+
+
+class _Run:
+    __slots__ = ("page", "started", "start_time", "steps", "section")
+
+    def __init__(self, page=None):
+        self.page = page
+        self.started = datetime.now()
+        self.start_time = time.perf_counter()
+        self.steps = []
+        self.section = None
+
+
+_runs = {}
+_runs_lock = threading.Lock()
+_local = threading.local()
+
+
+def _current_run():
+    session = _session_id()
+    with _runs_lock:
+        run = _runs.get(session)
+        if run is None:
+            # Fuera de app.py (AppTest de una página, scripts): ejecución implícita
+            run = _runs[session] = _Run()
+        return run
+
+
+class Step:
+    """Paso en curso; `rows_out` puede fijarse dentro del bloque `with timed(...)`."""
+
+    __slots__ = ("name", "detail", "rows_in", "rows_out", "depth", "_start", "_rss")
+
+    def __init__(self, name, detail=None, rows_in=None):
+        self.name = name
+        self.detail = detail
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.depth = 0
+
+    def start(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        self.depth = len(stack)
+        stack.append(self)
+        self._rss = _rss_bytes()
+        self._start = time.perf_counter()
+        return self
+
+    def finish(self, error=None):
+        seconds = time.perf_counter() - self._start
+        rss = _rss_bytes()
+        stack = getattr(_local, "stack", [])
+        if stack and stack[-1] is self:
+            stack.pop()
+        run = _current_run()
+        record = {
+            "paso": self.name,
+            "detalle": self.detail,
+            "segundos": round(seconds, 4),
+            "filas_entrada": self.rows_in,
+            "filas_salida": self.rows_out,
+            "memoria_mb": round((rss - self._rss) / (1024 * 1024), 1) if rss is not None and self._rss is not None else None,
+            "nivel": self.depth,
+            "desde_s": round(self._start - run.start_time, 4),
+        }
+        if error is not None:
+            record["error"] = type(error).__name__
+        with _runs_lock:
+            if len(run.steps) < MAX_STEPS_PER_RUN:
+                run.steps.append(record)
+        return record
+
+
+class timed:
+    """
+    Mide un bloque de código como un paso de la ejecución actual.
+
+        with timed("filtros", rows_in=df) as step:
+            df_filtered = ...
+            step.rows_out = len(df_filtered)
+    """
+
+    def __init__(self, name, detail=None, rows_in=None):
+        if not isinstance(rows_in, int) and rows_in is not None:
+            rows_in = _row_count(rows_in)
+        self.step = Step(name, detail, rows_in)
+
+    def __enter__(self):
+        return self.step.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.step.finish(exc)
+        return False
+
+
+def instrumented(name=None, detail=None):
+    """
+    Decorador: mide cada llamada como un paso. Las filas de entrada son las del
+    primer DataFrame posicional y las de salida las del resultado si es un DataFrame.
+    `detail` recibe los mismos argumentos y retorna un texto (p. ej. el archivo).
+    """
+    def decorator(func):
+        step_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            rows_in = next((len(arg) for arg in args if isinstance(arg, pd.DataFrame)), None)
+            step = Step(step_name, detail(*args, **kwargs) if detail else None, rows_in).start()
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as exc:
+                step.finish(exc)
+                raise
+            step.rows_out = _row_count(result)
+            step.finish()
+            return result
+        return wrapper
+    return decorator
+
+
+def section(name):
+    """
+    Inicia una etapa del script de la página y cierra la anterior. Permite medir
+    tramos largos (gráficos, tablas) marcando solo su comienzo.
+    """
+    run = _current_run()
+    _close_section(run)
+    run.section = Step(f"sección: {name}").start()
+
+
+def _close_section(run):
+    if run.section is not None:
+        run.section.finish()
+        run.section = None
+
+
+def begin_run(page=None):
+    """Abre una ejecución para la sesión actual (descarta pasos de la anterior)."""
+    session = _session_id()
+    with _runs_lock:
+        _runs[session] = _Run(page)
+
+
+def end_run():
+    """Cierra la ejecución de la sesión actual, la escribe en el log y la retorna como dict."""
+    session = _session_id()
+    run = _current_run()
+    _close_section(run)
+    with _runs_lock:
+        _runs.pop(session, None)
+        # Orden de inicio (los pasos se registran al terminar, los internos antes que el externo)
+        steps = sorted(run.steps, key=lambda step: step["desde_s"])
+    summary = {
+        "inicio": run.started.isoformat(timespec="seconds"),
+        "sesion": session,
+        "pagina": run.page,
+        "segundos": round(time.perf_counter() - run.start_time, 4),
+        "pasos": steps,
+    }
+    _log_run(summary)
+    return summary
+
+
+_logger = None
+_logger_lock = threading.Lock()
+
+
+def _perf_logger():
+    """Logger con rotación por tamaño, creado una sola vez por proceso."""
+    global _logger
+    if _logger is not None:
+        return _logger
+    with _logger_lock:
+        if _logger is None:
+            logger = logging.getLogger("dashboard.rendimiento")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            if PERF_LOG_PATH.strip().lower() not in ("", "0", "false", "no"):
+                try:
+                    path = Path(PERF_LOG_PATH)
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    handler = RotatingFileHandler(
+                        path, maxBytes=PERF_LOG_MAX_BYTES, backupCount=PERF_LOG_BACKUPS, encoding="utf-8"
+                    )
+                    handler.setFormatter(logging.Formatter("%(message)s"))
+                    logger.addHandler(handler)
+                except OSError:
+                    # Sin permisos de escritura: se sigue midiendo, solo no se guarda
+                    pass
+            _logger = logger
+    return _logger
+
+
+def _log_run(summary):
+    logger = _perf_logger()
+    if logger.handlers:
+        logger.info(json.dumps(summary, ensure_ascii=False, default=str))
+
+
+def panel_enabled():
+    """El panel se muestra con ?rendimiento=1 en la URL o DASHBOARD_PERF_PANEL=1."""
+    if os.environ.get("DASHBOARD_PERF_PANEL", "").strip().lower() in ("1", "true", "si", "sí", "yes"):
+        return True
+    try:
+        import streamlit as st
+        return st.query_params.get(PERF_PANEL_PARAM, "") in ("1", "true", "si")
+    except Exception:
+        return False
+
+
+def render_panel(summary):
+    """Tabla de pasos de la ejecución en un expander de la barra lateral."""
+    import streamlit as st
+
+    with st.sidebar.expander("⏱️ Rendimiento", expanded=False):
+        st.caption(f"Ejecución completa: {summary['segundos']:.3f} s · {len(summary['pasos'])} pasos")
+        if not summary["pasos"]:
+            return
+        pasos = pd.DataFrame(summary["pasos"])
+        pasos["Paso"] = ["· " * nivel + paso for nivel, paso in zip(pasos["nivel"], pasos["paso"])]
+        pasos = pasos.rename(columns={
+            "detalle": "Detalle",
+            "segundos": "Segundos",
+            "filas_entrada": "Filas entrada",
+            "filas_salida": "Filas salida",
+            "memoria_mb": "Δ Memoria (MB)",
+        })
+        st.dataframe(
+            pasos[["Paso", "Detalle", "Segundos", "Filas entrada", "Filas salida", "Δ Memoria (MB)"]],
+            hide_index=True,
+            use_container_width=True,
+        )
@@ -0,0 +1,137 @@
+"""
+Ciclo de vida de los créditos del pipeline Fiable.
+
+Un mismo crédito (CONSECUTIVO/IDENTIFICACION) aparece en varios archivos
+mensuales con el estado que tenía en cada corte. Ordenando el historial por
+crédito, archivo y FECHA_ANALISIS, y comparando cada fila con la siguiente
+(sort + shift, sin bucles por crédito), se obtienen:
+
+- Matriz de transiciones entre estados (conteos y porcentaje por fila).
+- Tiempos por estado: días de FECHA a FECHA_ANALISIS de cada observación.
+- Conversión por cohorte: de los créditos creados en un mes, cuántos llegaron
+  alguna vez a APROBADO, LEGALIZADO o RECHAZADO.
+"""
+import pandas as pd
+
+from data_loader import PIPELINE_DEDUP_KEYS, valid_credit_keys
+from instrumentation import instrumented
+
+# Estados de salida que se siguen en la conversión por cohorte
+COHORT_STATES = ['APROBADO', 'LEGALIZADO', 'RECHAZADO']
+# Columnas del historial que usa el ciclo de vida (para leerlo proyectado)
+LIFECYCLE_COLUMNS = PIPELINE_DEDUP_KEYS + ['ESTADO_NORMALIZADO', 'FECHA', 'FECHA_ANALISIS', 'MES_PERIODO', 'RANGO_ARCHIVO']
+
+
+def credit_sequences(history):
+    """
+    Historial ordenado por crédito con una fila por cambio de estado.
+    Las observaciones repetidas del mismo estado en archivos consecutivos se colapsan
+    en la primera, que es cuando el crédito llegó a ese estado.
+    """
+    if history is None or history.empty or 'CONSECUTIVO' not in history.columns:
+        return None
+    keys = [col for col in PIPELINE_DEDUP_KEYS if col in history.columns]
+
+    columns = [col for col in LIFECYCLE_COLUMNS if col in history.columns]
+    order = keys + [col for col in ['RANGO_ARCHIVO', 'FECHA_ANALISIS'] if col in history.columns]
+    seq = history.loc[valid_credit_keys(history), columns].sort_values(order, kind='stable')
+
+    same_as_prev = (seq[keys] == seq[keys].shift()).fillna(False).all(axis=1)
+    repeated = same_as_prev & (seq['ESTADO_NORMALIZADO'] == seq['ESTADO_NORMALIZADO'].shift()).fillna(False)
+    seq = seq[~repeated].reset_index(drop=True)
+    seq['CREDITO'] = seq.groupby(keys, sort=False).ngroup()
+    return seq
+
+
+def transition_table(seq):
+    """Transiciones (desde, hacia) con cantidad y mediana de días entre análisis."""
+    same_next = seq['CREDITO'] == seq['CREDITO'].shift(-1)
+    transitions = pd.DataFrame({
+        'Desde': seq['ESTADO_NORMALIZADO'],
+        'Hacia': seq['ESTADO_NORMALIZADO'].shift(-1),
+    })
+    if 'FECHA_ANALISIS' in seq.columns:
+        transitions['Días'] = (seq['FECHA_ANALISIS'].shift(-1) - seq['FECHA_ANALISIS']).dt.days
+    else:
+        transitions['Días'] = float('nan')
+    transitions = transitions[same_next]
+    return (
+        transitions.groupby(['Desde', 'Hacia'])
+        .agg(Cantidad=('Días', 'size'), Mediana_dias=('Días', 'median'))
+        .reset_index()
+        .sort_values('Cantidad', ascending=False)
+    )
+
+
+def transition_matrix(transitions):
+    """Matriz desde × hacia con conteos y su versión normalizada por fila (%)."""
+    counts = transitions.pivot_table(
+        index='Desde', columns='Hacia', values='Cantidad', aggfunc='sum', fill_value=0
+    )
+    totals = counts.sum(axis=1).replace(0, pd.NA)
+    percentages = (counts.div(totals, axis=0) * 100).astype('float64').round(1)
+    return counts, percentages
+
+
+def time_in_state(seq):
+    """Distribución de días FECHA → FECHA_ANALISIS por estado alcanzado."""
+    if 'FECHA' not in seq.columns or 'FECHA_ANALISIS' not in seq.columns:
+        return pd.DataFrame(columns=['Estado', 'Registros', 'Promedio', 'Mediana', 'P90'])
+    days = (seq['FECHA_ANALISIS'] - seq['FECHA']).dt.days
+    frame = pd.DataFrame({'Estado': seq['ESTADO_NORMALIZADO'], 'Días': days}).dropna(subset=['Días'])
+    grouped = frame.groupby('Estado')['Días']
+    return (
+        pd.DataFrame({
+            'Registros': grouped.size(),
+            'Promedio': grouped.mean().round(1),
+            'Mediana': grouped.median(),
+            'P90': grouped.quantile(0.9),
+        })
+        .reset_index()
+        .sort_values('Registros', ascending=False)
+    )
+
+
+def cohort_conversion(seq):
+    """
+    Conversión por cohorte de creación (mes de la primera FECHA del crédito):
+    créditos de la cohorte y % que alcanzó cada estado de COHORT_STATES.
+    """
+    if 'MES_PERIODO' not in seq.columns:
+        return pd.DataFrame()
+    cohort = seq.groupby('CREDITO')['MES_PERIODO'].transform('min')
+    reached = (
+        pd.DataFrame({'Cohorte': cohort, 'CREDITO': seq['CREDITO'], 'Estado': seq['ESTADO_NORMALIZADO']})
+        .dropna(subset=['Cohorte'])
+        .drop_duplicates(subset=['CREDITO', 'Estado'])
+    )
+    credits = reached.drop_duplicates(subset='CREDITO').groupby('Cohorte').size()
+    by_state = pd.crosstab(reached['Cohorte'], reached['Estado'])
+    result = pd.DataFrame({'Créditos': credits})
+    for estado in COHORT_STATES:
+        reached_count = by_state[estado] if estado in by_state.columns else 0
+        result[f'% {estado.capitalize()}'] = (reached_count / credits * 100).round(1)
+    result = result.reset_index().sort_values('Cohorte')
+    result['Cohorte'] = result['Cohorte'].astype(str)
+    return result
+
+
+@instrumented()
+def compute_lifecycle(history):
+    """
+    Calcula todas las vistas de ciclo de vida a partir del historial sin deduplicar
+    (`get_catalog('pipeline').load_range()`: cada crédito una vez por archivo).
+
+    Returns:
+        Tupla (transiciones, matriz de conteos, matriz %, tiempos por estado, cohortes)
+        o tupla vacía si no hay historial con CONSECUTIVO. La tupla vacía (a diferencia
+        de None) sí queda en el almacén, así que no se relee el historial en cada rerun.
+    """
+    if history is None or history.empty:
+        return ()
+    seq = credit_sequences(history)
+    if seq is None:
+        return ()
+    transitions = transition_table(seq)
+    counts, percentages = transition_matrix(transitions)
+    return transitions, counts, percentages, time_in_state(seq), cohort_conversion(seq)
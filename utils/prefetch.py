@@ -0,0 +1,94 @@
+"""
+Precarga predictiva de periodos para el almacén de datasets.
+
+Casi siempre el usuario compara el mes actual con el anterior o con el mismo
+mes del año pasado. Apenas la página carga el periodo principal, se encolan
+esos periodos y un único hilo de fondo los deja residentes en el almacén,
+de modo que la comparación abre sin parsear el Excel en frío.
+"""
+import queue
+import threading
+
+import streamlit as st
+
+from dataset_store import get_dataset_store
+
+# Máximo de cargas encoladas; las que no caben se descartan (es solo una optimización)
+MAX_PENDING = 8
+
+
+def comparison_periods(año, mes):
+    """
+    Periodos que normalmente se comparan con (año, mes):
+    el mes anterior y el mismo mes del año anterior.
+    """
+    if mes == 1:
+        mes_anterior = (año - 1, 12)
+    else:
+        mes_anterior = (año, mes - 1)
+    return [mes_anterior, (año - 1, mes)]
+
+
+class PrefetchScheduler:
+    """Cola de precargas atendida por un hilo daemon que se crea bajo demanda."""
+
+    def __init__(self, store, max_pending=MAX_PENDING):
+        self.store = store
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def schedule(self, domain, key, loader, sources=None):
+        """
+        Encola la carga de (dominio, clave) si no está residente ni pendiente.
+        `sources` son los archivos fuente, como en DatasetStore.acquire.
+        Retorna True si quedó encolada.
+        """
+        entry_key = (domain, key)
+        if self.store.contains(domain, key):
+            return False
+        with self._lock:
+            if entry_key in self._pending:
+                return False
+            try:
+                self._queue.put_nowait((domain, key, loader, sources))
+            except queue.Full:
+                return False
+            self._pending.add(entry_key)
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="prefetch", daemon=True)
+                self._worker.start()
+        return True
+
+    def pending(self):
+        with self._lock:
+            return sorted(self._pending, key=str)
+
+    def _run(self):
+        while True:
+            try:
+                domain, key, loader, sources = self._queue.get(timeout=30)
+            except queue.Empty:
+                with self._lock:
+                    # Cerrar el hilo si no hay trabajo; schedule() crea otro si hace falta
+                    if self._queue.empty():
+                        self._worker = None
+                        return
+                continue
+            try:
+                self.store.acquire(domain, key, loader, sources=sources)
+            except Exception:
+                # Un fallo en la precarga no debe afectar a ninguna sesión;
+                # la carga normal reportará el error si el usuario abre ese periodo
+                pass
+            finally:
+                with self._lock:
+                    self._pending.discard((domain, key))
+                self._queue.task_done()
+
+
+@st.cache_resource
+def get_prefetch_scheduler():
+    """Planificador único para todo el proceso, ligado al almacén compartido."""
+    return PrefetchScheduler(get_dataset_store())
@@ -0,0 +1,173 @@
+"""
+Perfilado bajo demanda de las ejecuciones de página.
+
+Para reproducir una lentitud reportada en producción:
+
+- `?perfilar=N` en la URL perfila las próximas N ejecuciones de esa sesión
+  (el parámetro se retira de la URL para no reiniciar la cuenta en cada rerun).
+- `DASHBOARD_PROFILE=N` perfila las primeras N ejecuciones de cada sesión.
+
+Con pyinstrument instalado (perfilador por muestreo, opcional) cada traza se
+guarda como HTML interactivo y como JSON de speedscope
+(https://www.speedscope.app); sin él se usa cProfile y se guarda el `.prof`
+(snakeviz, pstats) más un resumen de texto. Junto a cada traza se escribe un
+JSON con la página, los filtros de la sesión y la duración, para adjuntarlo al
+ticket. Los archivos quedan en `profiles/` (`DASHBOARD_PROFILE_DIR`).
+
+Ambos perfiladores observan solo el hilo del script: el trabajo en hilos
+auxiliares (precarga, carga paralela de FIABLE) aparece como espera.
+"""
+import hashlib
+import io
+import json
+import os
+import re
+import time
+import unicodedata
+from contextlib import contextmanager
+from datetime import date, datetime
+from pathlib import Path
+
+import streamlit as st
+
+PROFILES_DIR = Path(os.environ.get("DASHBOARD_PROFILE_DIR", "profiles"))
+PROFILE_PARAM = "perfilar"
+PROFILE_ENV = "DASHBOARD_PROFILE"
+# Intervalo de muestreo de pyinstrument (segundos)
+SAMPLE_INTERVAL = 0.001
+# Claves propias en st.session_state
+_REMAINING_KEY = "_perfil_restantes"
+_LAST_KEY = "_perfil_ultimo"
+
+
+def _parse_count(value):
+    try:
+        return max(int(str(value).strip()), 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def remaining_reruns():
+    """Ejecuciones que quedan por perfilar en la sesión (aplica ?perfilar=N y DASHBOARD_PROFILE)."""
+    requested = st.query_params.get(PROFILE_PARAM)
+    if requested is not None:
+        st.session_state[_REMAINING_KEY] = _parse_count(requested) or 1
+        del st.query_params[PROFILE_PARAM]
+    elif _REMAINING_KEY not in st.session_state:
+        st.session_state[_REMAINING_KEY] = _parse_count(os.environ.get(PROFILE_ENV, 0))
+    return st.session_state[_REMAINING_KEY]
+
+
+_SKIP = object()
+
+
+def _jsonable(value):
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple, set)):
+        items = [_jsonable(item) for item in value]
+        return items if all(item is not _SKIP for item in items) else _SKIP
+    return _SKIP
+
+
+def filter_state():
+    """Valores de los widgets con clave en la sesión (filtros, selecciones), serializables en JSON."""
+    state = {}
+    for key, value in st.session_state.to_dict().items():
+        if str(key).startswith("_"):
+            continue
+        value = _jsonable(value)
+        if value is not _SKIP:
+            state[str(key)] = value
+    return dict(sorted(state.items()))
+
+
+def _slug(text):
+    text = unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-") or "pagina"
+
+
+def _start_profiler():
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return "cprofile", profiler
+    profiler = Profiler(interval=SAMPLE_INTERVAL)
+    profiler.start()
+    return "pyinstrument", profiler
+
+
+def _save_traces(kind, profiler, base):
+    """Detiene el perfilador y escribe sus trazas con el prefijo `base`. Retorna las rutas."""
+    if kind == "pyinstrument":
+        from pyinstrument.renderers import SpeedscopeRenderer
+        profiler.stop()
+        html_path = base.with_suffix(".html")
+        html_path.write_text(profiler.output_html(), encoding="utf-8")
+        speedscope_path = base.with_suffix(".speedscope.json")
+        speedscope_path.write_text(profiler.output(renderer=SpeedscopeRenderer()), encoding="utf-8")
+        return [html_path, speedscope_path]
+
+    import pstats
+    profiler.disable()
+    prof_path = base.with_suffix(".prof")
+    profiler.dump_stats(prof_path)
+    text = io.StringIO()
+    pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(60)
+    text_path = base.with_suffix(".txt")
+    text_path.write_text(text.getvalue(), encoding="utf-8")
+    return [prof_path, text_path]
+
+
+@contextmanager
+def profile_page(page):
+    """
+    Perfila el bloque si la sesión tiene ejecuciones pendientes por perfilar.
+    Los archivos se nombran `<fecha>_<página>_<hash de filtros>`.
+    """
+    remaining = remaining_reruns()
+    if remaining <= 0:
+        yield
+        return
+
+    filters = filter_state()
+    kind, profiler = _start_profiler()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        st.session_state[_REMAINING_KEY] = remaining - 1
+        filters_json = json.dumps(filters, ensure_ascii=False, sort_keys=True)
+        digest = hashlib.blake2b(filters_json.encode("utf-8"), digest_size=4).hexdigest()
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")[:-3]
+        base = PROFILES_DIR / f"{stamp}_{_slug(page)}_{digest}"
+        try:
+            PROFILES_DIR.mkdir(parents=True, exist_ok=True)
+            paths = _save_traces(kind, profiler, base)
+            metadata = {
+                "pagina": page,
+                "inicio": stamp,
+                "segundos": round(seconds, 4),
+                "perfilador": kind,
+                "filtros": filters,
+                "trazas": [path.name for path in paths],
+            }
+            base.with_suffix(".json").write_text(json.dumps(metadata, ensure_ascii=False, indent=2), encoding="utf-8")
+            st.session_state[_LAST_KEY] = (str(paths[0]), remaining - 1)
+        except OSError as exc:
+            st.session_state[_LAST_KEY] = (f"no se pudo guardar la traza: {exc}", remaining - 1)
+
+
+def render_notice():
+    """Aviso en la barra lateral con la última traza guardada y las ejecuciones pendientes."""
+    last = st.session_state.get(_LAST_KEY)
+    if last is None:
+        return
+    path, remaining = last
+    st.sidebar.caption(f"🧪 Perfil: `{path}` · quedan {remaining} ejecuciones por perfilar")
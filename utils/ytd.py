@@ -0,0 +1,141 @@
+"""
+Motor de acumulados (YTD, QTD, últimos 12 meses) sobre agregados mensuales.
+
+Las páginas de Pipeline y Colocación calculaban el año corrido filtrando todo
+el dataset con `AÑO == y & MES <= m` para el año actual y el anterior en cada
+rerun. Aquí se parte de una tabla ya agrupada por (año, mes, dimensiones) y,
+para cada combinación de filtros, se arma una serie mensual densa con sumas
+acumuladas: cualquier ventana de meses se resuelve restando dos filas.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from instrumentation import instrumented
+
+# Combinaciones de filtros cuyas sumas acumuladas se conservan en memoria
+MAX_CACHED_SELECTIONS = 32
+
+
+def _month_index(year, month):
+    return int(year) * 12 + int(month) - 1
+
+
+class PrefixSeries:
+    """Serie mensual densa de medidas con sumas acumuladas (una fila extra en cero)."""
+
+    def __init__(self, measures, first_index, prefix):
+        self.measures = list(measures)
+        self.first_index = first_index
+        self.prefix = prefix
+
+    @property
+    def last_index(self):
+        return self.first_index + len(self.prefix) - 2
+
+    def window(self, first, last):
+        """Suma de cada medida entre dos índices de mes (inclusive), recortando al rango disponible."""
+        first = max(first, self.first_index)
+        last = min(last, self.last_index)
+        if last < first:
+            values = np.zeros(len(self.measures))
+        else:
+            values = self.prefix[last - self.first_index + 1] - self.prefix[first - self.first_index]
+        return dict(zip(self.measures, values.tolist()))
+
+
+class YTDEngine:
+    """
+    Acumulados por corte de mes para una tabla agregada.
+
+    Args:
+        aggregates: DataFrame con una fila por (año, mes, dimensiones...) y columnas de medida
+        year_col, month_col: Columnas de año y mes (1-12)
+        measures: Columnas numéricas a acumular
+        dimensions: Columnas por las que se puede filtrar
+    """
+
+    def __init__(self, aggregates, year_col, month_col, measures, dimensions=()):
+        self.year_col = year_col
+        self.month_col = month_col
+        self.measures = list(measures)
+        self.dimensions = [col for col in dimensions if col in aggregates.columns]
+        keep = [year_col, month_col] + self.dimensions + self.measures
+        frame = aggregates[keep].dropna(subset=[year_col, month_col])
+        self.aggregates = frame.assign(
+            _MES_IDX=frame[year_col].astype('int64') * 12 + frame[month_col].astype('int64') - 1
+        )
+        self._series = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        with self._lock:
+            series_bytes = sum(series.prefix.nbytes for series in self._series.values())
+        return int(self.aggregates.memory_usage(index=True, deep=True).sum()) + series_bytes
+
+    def series(self, filters=None):
+        """
+        Sumas acumuladas para una selección de filtros.
+
+        Args:
+            filters: dict dimensión -> valores permitidos; las listas vacías no filtran
+        """
+        active = {
+            col: frozenset(values) for col, values in (filters or {}).items()
+            if values and col in self.dimensions
+        }
+        cache_key = frozenset(active.items())
+        with self._lock:
+            series = self._series.get(cache_key)
+            if series is not None:
+                self._series.move_to_end(cache_key)
+                return series
+
+        frame = self.aggregates
+        for col, values in active.items():
+            frame = frame[frame[col].isin(values)]
+        series = self._build_series(frame)
+
+        with self._lock:
+            self._series[cache_key] = series
+            while len(self._series) > MAX_CACHED_SELECTIONS:
+                self._series.popitem(last=False)
+        return series
+
+    @instrumented("ytd_series")
+    def _build_series(self, frame):
+        if frame.empty:
+            return PrefixSeries(self.measures, 0, np.zeros((1, len(self.measures))))
+        monthly = frame.groupby('_MES_IDX')[self.measures].sum()
+        first_index = int(monthly.index.min())
+        last_index = int(monthly.index.max())
+        dense = monthly.reindex(range(first_index, last_index + 1), fill_value=0)
+        values = dense.to_numpy(dtype='float64')
+        prefix = np.vstack([np.zeros((1, len(self.measures))), values.cumsum(axis=0)])
+        return PrefixSeries(self.measures, first_index, prefix)
+
+    def month(self, year, month, filters=None):
+        """Medidas de un único mes."""
+        index = _month_index(year, month)
+        return self.series(filters).window(index, index)
+
+    def ytd(self, year, month, filters=None):
+        """Acumulado de enero a `month` del año indicado."""
+        return self.series(filters).window(_month_index(year, 1), _month_index(year, month))
+
+    def qtd(self, year, month, filters=None):
+        """Acumulado desde el inicio del trimestre hasta `month`."""
+        quarter_start = (int(month) - 1) // 3 * 3 + 1
+        return self.series(filters).window(_month_index(year, quarter_start), _month_index(year, month))
+
+    def rolling_12(self, year, month, filters=None):
+        """Acumulado de los últimos 12 meses terminando en `month`."""
+        index = _month_index(year, month)
+        return self.series(filters).window(index - 11, index)
+
+
+def ytd_comparison(engine, year, month, filters=None):
+    """Acumulado YTD del año indicado y del mismo corte del año anterior."""
+    return engine.ytd(year, month, filters), engine.ytd(year - 1, month, filters)